@@ -0,0 +1,143 @@
+"""Local Objaverse annotation store
+
+Imports the Objaverse annotations once into a memory-mapped store with an
+inverted index from tags and categories to uids (see
+metadata_scripts/annotation_store.py), so choosing objects by tag or category
+takes milliseconds and works offline:
+    - import: reads the {uid: annotation} json(.gz) files of --source, a file or
+      a directory like the metadata directory of objaverse, or without --source
+      loads them with objaverse.load_annotations(), and writes --store_dir,
+    - query: prints the number of objects with every --tag and --category and
+      writes them as an id file with --output, like query_objects.py,
+    - terms: prints the most frequent tags or categories (--kind) starting with
+      --prefix.
+ui_backend.py serves the same queries from /annotations with --annotations_dir.
+
+Usage:
+    python3 scripts/annotations.py --source ~/.objaverse/hf-objaverse-v1/metadata --store_dir annotations/ import
+    python3 scripts/annotations.py --store_dir annotations/ --tag chair --category furniture-home \
+        --output src/ids/chairs.json query
+    python3 scripts/annotations.py --store_dir annotations/ --kind tag --prefix car terms
+"""
+
+import argparse
+import time
+
+from group_store import write_json_atomic
+from metadata_scripts.annotation_store import AnnotationStore, import_annotations, iter_annotations
+from query_objects import id_file, make_groups
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--store_dir
+        "--store_dir",
+        type=str,
+        default="annotations",
+        help="Directory of the annotation store")
+    parser.add_argument( #--source
+        "--source",
+        type=str,
+        default=None,
+        help="Annotation json(.gz) file or directory to import, defaults to objaverse.load_annotations()")
+    parser.add_argument( #--tag
+        "--tag",
+        type=str,
+        action="append",
+        default=[],
+        help="Tag the objects must have, can be repeated")
+    parser.add_argument( #--category
+        "--category",
+        type=str,
+        action="append",
+        default=[],
+        help="Category the objects must have, can be repeated")
+    parser.add_argument( #--kind
+        "--kind",
+        type=str,
+        default="tag",
+        choices=["tag", "category"],
+        help="Terms listed by terms")
+    parser.add_argument( #--prefix
+        "--prefix",
+        type=str,
+        default="",
+        help="Prefix of the terms listed by terms")
+    parser.add_argument( #--limit
+        "--limit",
+        type=int,
+        default=20,
+        help="Number of terms listed by terms")
+    parser.add_argument( #--output
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the id file of the query matches")
+    parser.add_argument( #--group_size
+        "--group_size",
+        type=int,
+        default=None,
+        help="Objects per group of the id file, see query_objects.py")
+    parser.add_argument( #--num_groups
+        "--num_groups",
+        type=int,
+        default=None,
+        help="Number of groups of --group_size objects")
+    parser.add_argument( #--separate
+        "--separate",
+        type=int,
+        default=1,
+        choices=[0, 1],
+        help="Separate flag of the groups of the id file")
+    parser.add_argument( #--group_prefix
+        "--group_prefix",
+        type=str,
+        default="annotations",
+        help="Names of the groups are <group_prefix>_<n>")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the shuffle of the matches")
+    parser.add_argument( #command
+        "command",
+        choices=["import", "query", "terms"])
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    if args.command == "import":
+        if args.source:
+            annotations = iter_annotations(args.source)
+        else:
+            # only the import needs the objaverse package, and only without --source
+            import objaverse
+            annotations = objaverse.load_annotations().items()
+        manifest = import_annotations(annotations, args.store_dir)
+        print(f"Imported {manifest['objects']} objects with {manifest['tag_terms']} tags and "
+              f"{manifest['category_terms']} categories in {time.perf_counter() - start:.1f}s")
+        return
+
+    store = AnnotationStore(args.store_dir)
+    if args.command == "terms":
+        for term, count in store.term_counts(args.kind, args.prefix, args.limit):
+            print(f"{count:8d}  {term}")
+        return
+
+    ordinals = store.select(args.tag, args.category)
+    uids = store.uids[ordinals].astype(str)
+    print(f"{len(uids)} of {len(store)} objects match ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    try:
+        groups = make_groups(uids, args.group_size, args.num_groups, args.seed)
+    except ValueError as error:
+        print(error)
+        exit(1)
+    if args.output:
+        write_json_atomic(args.output, id_file(groups, args.separate, args.group_prefix))
+        print(f"Wrote {len(groups)} groups of {sum(len(group) for group in groups)} objects to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
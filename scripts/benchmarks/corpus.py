@@ -0,0 +1,121 @@
+"""Specification of the synthetic benchmark corpus.
+
+The corpus stands in for downloaded Objaverse objects without network access.
+Every object is a displaced icosphere, and the objects cycle through the sizes and
+features that drive the cost of the pipeline:
+    - triangles: icosphere subdivisions 3 to 6 (1280 to 82k triangles),
+    - texture: none, or a noise texture of 512 to 2048 px,
+    - armature: a two bone armature skinning the mesh,
+    - animation: a keyframed action, on the bones if there is an armature.
+The uids are 32 hex digits like Objaverse uids, derived from the seed and the
+index, and make_corpus.py seeds the geometry and texture of every object with
+its uid, so the same arguments give the same corpus on every machine.
+
+The objects are stored in the layout of download.py,
+`<corpus_dir>/glbs/000-023/<uid>.glb`, and corpus.json lists their specs.
+
+This module does not import bpy, make_corpus.py in Blender and suite.py
+outside of it share the specs.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+SUBDIVISIONS = (3, 4, 5, 6)
+TEXTURE_SIZES = (0, 512, 1024, 2048)
+MANIFEST_NAME = "corpus.json"
+
+
+@dataclass(frozen=True)
+class CorpusObject:
+    """An object of the benchmark corpus.
+
+    Args:
+        uid (str): Uid of the object, the name of its GLB file.
+        index (int): Position in the corpus.
+        subdivisions (int): Icosphere subdivisions.
+        texture_size (int): Side of the texture, 0 for an untextured material.
+        armature (bool): Whether the mesh is skinned to an armature.
+        animation (bool): Whether the object has an action.
+    """
+
+    uid: str
+    index: int
+    subdivisions: int
+    texture_size: int
+    armature: bool
+    animation: bool
+
+    @property
+    def triangles(self) -> int:
+        return 20 * 4**self.subdivisions
+
+    @property
+    def seed(self) -> int:
+        """Seed of the geometry and texture, stable for a uid."""
+        return int(hashlib.md5(self.uid.encode()).hexdigest()[:8], 16)
+
+
+def corpus_uid(seed: int, index: int) -> str:
+    return hashlib.md5(f"benchmark-{seed}-{index}".encode()).hexdigest()
+
+
+def corpus_specs(num_objects: int, seed: int = 0) -> List[CorpusObject]:
+    """Returns the objects of a corpus.
+
+    Every combination of subdivisions and texture size appears in a corpus of
+    16 objects. A third of the objects have an armature and a third are
+    animated, half of them with an armature.
+    """
+    specs = []
+    for i in range(num_objects):
+        specs.append(
+            CorpusObject(
+                uid=corpus_uid(seed, i),
+                index=i,
+                subdivisions=SUBDIVISIONS[i % len(SUBDIVISIONS)],
+                texture_size=TEXTURE_SIZES[(i // len(SUBDIVISIONS)) % len(TEXTURE_SIZES)],
+                armature=i % 3 == 1,
+                animation=i % 3 != 0 and i % 2 == 1,
+            )
+        )
+    return specs
+
+
+def object_path(corpus_dir: str, spec: CorpusObject) -> str:
+    return os.path.join(corpus_dir, "glbs", "000-023", f"{spec.uid}.glb")
+
+
+def expected_metadata(spec: CorpusObject) -> Dict[str, int]:
+    """Returns the metadata_multiproc.py values an object must get."""
+    return {
+        "poly_count": spec.triangles,
+        "armature_count": int(spec.armature),
+        "animation_count": int(spec.animation),
+    }
+
+
+def write_manifest(corpus_dir: str, specs: List[CorpusObject], seed: int) -> None:
+    path = os.path.join(corpus_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"seed": seed, "objects": [asdict(spec) for spec in specs]}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def read_manifest(corpus_dir: str) -> Dict:
+    """Returns the manifest of a corpus, {} if it was not generated."""
+    path = os.path.join(corpus_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def corpus_complete(corpus_dir: str, specs: List[CorpusObject]) -> bool:
+    """Returns whether every object of specs exists in corpus_dir."""
+    manifest = read_manifest(corpus_dir)
+    listed = {spec["uid"] for spec in manifest.get("objects", [])}
+    return all(spec.uid in listed and os.path.exists(object_path(corpus_dir, spec)) for spec in specs)
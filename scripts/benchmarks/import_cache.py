@@ -0,0 +1,119 @@
+"""Blender script to benchmark the import cache against importing the source files.
+
+Generates a synthetic corpus of GLB files (the displaced icospheres with a noise
+texture of make_corpus.py, the texture size and mesh density set like typical
+Objaverse objects),
+then loads every object three times into an empty scene:
+    - import: the glTF importer, as without --import_cache_dir,
+    - convert: the importer plus writing the .blend of the cache (first load),
+    - append: appending the cached .blend (every later load).
+The timings per object and their medians are printed and written as json.
+
+    blender --background --python scripts/benchmarks/import_cache.py -- \
+        --corpus_dir /tmp/import_corpus --cache_dir /tmp/import_cache --num_objects 20
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import bpy
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusObject
+from benchmarks.make_corpus import make_object
+from blender_render import configure_import_cache, import_object_file, import_source_file, reset_scene
+
+
+def make_corpus(corpus_dir: str, num_objects: int, subdivisions: int, texture_size: int) -> List[str]:
+    """Returns the paths of the corpus, writing the objects that do not exist yet."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for i in range(num_objects):
+        spec = CorpusObject(f"synthetic_{subdivisions}_{texture_size}_{i:04d}", i, subdivisions, texture_size, False, False)
+        path = os.path.join(corpus_dir, f"{spec.uid}.glb")
+        if not os.path.exists(path):
+            make_object(path, spec)
+        paths.append(path)
+    return paths
+
+
+def time_load(load, path: str) -> float:
+    reset_scene()
+    start = time.perf_counter()
+    load(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--corpus_dir
+        "--corpus_dir",
+        type=str,
+        required=True,
+        help="Directory of the synthetic GLB files, reused by later runs")
+    parser.add_argument( #--cache_dir
+        "--cache_dir",
+        type=str,
+        required=True,
+        help="Directory of the import cache, emptied before the run")
+    parser.add_argument( #--num_objects
+        "--num_objects",
+        type=int,
+        default=20,
+        help="Number of synthetic objects")
+    parser.add_argument( #--subdivisions
+        "--subdivisions",
+        type=int,
+        default=6,
+        help="Icosphere subdivisions, 6 gives 82k triangles")
+    parser.add_argument( #--texture_size
+        "--texture_size",
+        type=int,
+        default=2048,
+        help="Side of the texture of every object")
+    parser.add_argument( #--output_path
+        "--output_path",
+        type=str,
+        default=None,
+        help="Path of the json results")
+    argv = sys.argv[sys.argv.index("--") + 1 :]
+    args = parser.parse_args(argv)
+
+    paths = make_corpus(args.corpus_dir, args.num_objects, args.subdivisions, args.texture_size)
+    shutil.rmtree(args.cache_dir, ignore_errors=True)
+    configure_import_cache(args.cache_dir)
+
+    timings: Dict[str, List[float]] = {"import": [], "convert": [], "append": []}
+    for path in paths:
+        timings["import"].append(time_load(import_source_file, path))
+        timings["convert"].append(time_load(import_object_file, path))
+        timings["append"].append(time_load(import_object_file, path))
+    configure_import_cache(None)
+
+    medians = {name: statistics.median(seconds) for name, seconds in timings.items()}
+    results = {
+        "blender_version": bpy.app.version_string,
+        "num_objects": len(paths),
+        "subdivisions": args.subdivisions,
+        "texture_size": args.texture_size,
+        "corpus_bytes": sum(os.path.getsize(path) for path in paths),
+        "median_seconds": medians,
+        "total_seconds": {name: sum(seconds) for name, seconds in timings.items()},
+        "speedup": medians["import"] / max(medians["append"], 1e-9),
+        "seconds": {name: seconds for name, seconds in timings.items()},
+    }
+    print(json.dumps({key: value for key, value in results.items() if key != "seconds"}, indent=2))
+    if args.output_path:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
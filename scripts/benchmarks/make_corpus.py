@@ -0,0 +1,141 @@
+"""Blender script to generate the synthetic benchmark corpus of corpus.py.
+
+Writes the GLB files of the objects that do not exist yet and corpus.json, so a
+corpus is generated once and reused by every benchmark run.
+
+    blender --background --python scripts/benchmarks/make_corpus.py -- \
+        --corpus_dir /tmp/benchmark_corpus --num_objects 24
+"""
+
+import argparse
+import os
+import sys
+
+import bpy
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusObject, corpus_specs, object_path, write_manifest
+from blender_render import reset_scene
+
+ANIMATION_FRAMES = 24
+
+
+def add_texture(material: bpy.types.Material, rng: np.random.Generator, size: int) -> None:
+    """Adds a packed noise texture as the base color of a material."""
+    image = bpy.data.images.new(f"{material.name}_texture", size, size)
+    image.pixels.foreach_set(rng.random(size * size * 4, dtype=np.float32))
+    image.pack()
+    texture = material.node_tree.nodes.new("ShaderNodeTexImage")
+    texture.image = image
+    principled = material.node_tree.nodes["Principled BSDF"]
+    material.node_tree.links.new(texture.outputs["Color"], principled.inputs["Base Color"])
+
+
+def add_armature(obj: bpy.types.Object) -> bpy.types.Object:
+    """Skins a mesh centered at the origin to a two bone armature, the lower half
+    to the root bone and the upper half to the tip bone."""
+    bpy.ops.object.armature_add(enter_editmode=True, location=(0.0, 0.0, 0.0))
+    armature = bpy.context.active_object
+    root = armature.data.edit_bones[0]
+    root.name = "root"
+    root.head, root.tail = (0.0, 0.0, -1.0), (0.0, 0.0, 0.0)
+    tip = armature.data.edit_bones.new("tip")
+    tip.head, tip.tail = (0.0, 0.0, 0.0), (0.0, 0.0, 1.0)
+    tip.parent = root
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    coords = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+    obj.data.vertices.foreach_get("co", coords)
+    upper = coords.reshape(-1, 3)[:, 2] >= 0.0
+    obj.vertex_groups.new(name="root").add(np.flatnonzero(~upper).tolist(), 1.0, "REPLACE")
+    obj.vertex_groups.new(name="tip").add(np.flatnonzero(upper).tolist(), 1.0, "REPLACE")
+    obj.modifiers.new("armature", "ARMATURE").object = armature
+    obj.parent = armature
+    return armature
+
+
+def add_animation(target: bpy.types.Object, armature: bool) -> None:
+    """Keyframes a swing of the tip bone of an armature, or a turn of an object."""
+    scene = bpy.context.scene
+    scene.frame_start, scene.frame_end = 1, ANIMATION_FRAMES
+    animated = target.pose.bones["tip"] if armature else target
+    animated.rotation_mode = "XYZ"
+    for frame, angle in ((1, 0.0), (ANIMATION_FRAMES // 2, 0.6), (ANIMATION_FRAMES, 0.0)):
+        animated.rotation_euler = (angle, 0.0, angle if not armature else 0.0)
+        animated.keyframe_insert("rotation_euler", frame=frame)
+
+
+def make_object(path: str, spec: CorpusObject) -> None:
+    """Writes an object of the corpus as a GLB file."""
+    reset_scene()
+    for action in bpy.data.actions:
+        bpy.data.actions.remove(action)
+    rng = np.random.default_rng(spec.seed)
+
+    bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=spec.subdivisions, radius=1.0)
+    obj = bpy.context.active_object
+    mesh = obj.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)
+    coords *= rng.uniform(0.8, 1.2, (len(coords), 1)).astype(np.float32)
+    mesh.vertices.foreach_set("co", coords.ravel())
+    mesh.update()
+    bpy.ops.object.shade_smooth()
+
+    material = bpy.data.materials.new(f"{spec.uid}_material")
+    material.use_nodes = True
+    material.node_tree.nodes["Principled BSDF"].inputs["Base Color"].default_value = (*rng.random(3), 1.0)
+    if spec.texture_size:
+        add_texture(material, rng, spec.texture_size)
+    mesh.materials.append(material)
+
+    target = add_armature(obj) if spec.armature else obj
+    if spec.animation:
+        add_animation(target, spec.armature)
+
+    # an interrupted export must not pass for a finished object
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{os.path.splitext(path)[0]}.tmp.glb"
+    bpy.ops.export_scene.gltf(
+        filepath=tmp_path,
+        export_format="GLB",
+        export_skins=spec.armature,
+        export_animations=spec.animation,
+    )
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--corpus_dir
+        "--corpus_dir",
+        type=str,
+        required=True,
+        help="Directory of the corpus, objects that exist already are kept")
+    parser.add_argument( #--num_objects
+        "--num_objects",
+        type=int,
+        default=24,
+        help="Number of objects")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the uids, other seeds give other corpora")
+    argv = sys.argv[sys.argv.index("--") + 1 :]
+    args = parser.parse_args(argv)
+
+    specs = corpus_specs(args.num_objects, args.seed)
+    for spec in specs:
+        path = object_path(args.corpus_dir, spec)
+        if not os.path.exists(path):
+            make_object(path, spec)
+    write_manifest(args.corpus_dir, specs, args.seed)
+    print(f"Corpus of {len(specs)} objects in {args.corpus_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Benchmark suite of the catalog, metadata and render stages.
+
+Runs the pipeline end to end on the synthetic corpus of corpus.py, without
+network access and with CPU rendering, so runs on different commits of the same
+machine are comparable:
+    - corpus: make_corpus.py generates the corpus once, later runs reuse it,
+    - catalog: ObjectLocator scans the corpus and finds every uid, as the UI
+      backend and render.py do for downloaded objects,
+    - metadata: metadata_multiproc.py extracts the metadata of the corpus, then
+      MetadataTable builds its column store from the text files and loads it
+      from its cache,
+    - render: blender_render.py imports, normalizes and renders every object on
+      the CPU with the benchmark render profile, its timing spans give the
+      seconds of every stage.
+The metrics are seconds, lower is better, and are written as json with the git
+commit. With --baseline the metrics are compared to the results of an earlier
+run, and the run fails if one is slower than the baseline by more than
+--threshold. The run also fails if the extracted metadata differs from the
+values of the corpus specs, the differences are saved with the results.
+
+    python3 scripts/benchmarks/suite.py --work_dir /tmp/benchmark \
+        --output_path benchmark_$(git rev-parse --short HEAD).json \
+        --baseline benchmark_main.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import corpus_complete, corpus_specs, expected_metadata, object_path
+from metadata_scripts.metadata_table import MetadataTable
+from render_scripts.object_locator import ObjectLocator
+from timings_report import load_records, stage_percentiles
+
+STAGES = ("catalog", "metadata", "render")
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# blender_render.py spans reported per object
+RENDER_SPANS = ("import", "normalize_scene", "render", "write_png")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--work_dir
+        "--work_dir",
+        type=str,
+        required=True,
+        help="Directory of the corpus and of the stage outputs, the corpus is kept between runs")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default="scripts/blender-3.2.2-linux-x64/blender",
+        help="Path of the Blender binary")
+    parser.add_argument( #--num_objects
+        "--num_objects",
+        type=int,
+        default=24,
+        help="Number of objects of the corpus")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the corpus")
+    parser.add_argument( #--stages
+        "--stages",
+        type=str,
+        default=",".join(STAGES),
+        help=f"Comma separated stages to run, of {','.join(STAGES)}")
+    parser.add_argument( #--cpu_count
+        "--cpu_count",
+        type=int,
+        default=4,
+        help="Worker processes of metadata_multiproc.py")
+    parser.add_argument( #--num_images
+        "--num_images",
+        type=int,
+        default=4,
+        help="Views rendered per object")
+    parser.add_argument( #--repeat
+        "--repeat",
+        type=int,
+        default=5,
+        help="Repetitions of the in-process catalog measurements, the median is kept")
+    parser.add_argument( #--output_path
+        "--output_path",
+        type=str,
+        default=None,
+        help="Path of the json results")
+    parser.add_argument( #--baseline
+        "--baseline",
+        type=str,
+        default=None,
+        help="Json results of an earlier run to compare against")
+    parser.add_argument( #--threshold
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Relative slowdown of a metric over the baseline that fails the run")
+    parser.add_argument( #--min_delta
+        "--min_delta",
+        type=float,
+        default=0.01,
+        help="Slowdowns of fewer seconds are timer noise and never fail the run")
+    return parser.parse_args()
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit of the working tree, None outside of a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_blender(blender: str, script: str, script_args: List[str], log_path: str) -> float:
+    """Runs a Blender script in the background and returns its wall seconds.
+
+    Raises:
+        subprocess.CalledProcessError: If Blender fails, its output is in log_path.
+    """
+    command = [blender, "--background", "--python", os.path.join(SCRIPTS_DIR, script), "--"] + script_args
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, check=True)
+    return time.perf_counter() - start
+
+
+def median_seconds(function, repeat: int) -> float:
+    """Returns the median wall seconds of repeated calls of function."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds)
+
+
+def bench_catalog(corpus_dir: str, uids: List[str], repeat: int) -> Dict[str, float]:
+    locator = ObjectLocator(corpus_dir)
+    missing = [uid for uid in uids if locator.find(uid) is None]
+    if missing:
+        raise FileNotFoundError(f"{len(missing)} corpus objects not found in {corpus_dir}")
+    return {
+        "catalog.scan_seconds": median_seconds(locator.scan, repeat),
+        "catalog.find_seconds": median_seconds(lambda: [locator.find(uid) for uid in uids], repeat),
+    }
+
+
+def bench_metadata(args, specs, stage_dir: str) -> Tuple[Dict[str, float], List[Dict]]:
+    """Runs metadata_multiproc.py on the corpus, returns its metrics and the values
+    that differ from the specs, see metadata_mismatches."""
+    paths_dir = os.path.join(stage_dir, "paths")
+    save_path = os.path.join(stage_dir, "metadata")
+    shutil.rmtree(save_path, ignore_errors=True)
+    os.makedirs(paths_dir, exist_ok=True)
+    with open(os.path.join(paths_dir, "benchmark.json"), "w") as f:
+        json.dump({"1": [object_path(args.corpus_dir, spec) for spec in specs]}, f)
+
+    seconds = run_blender(
+        args.blender,
+        "metadata_multiproc.py",
+        ["--save_path", save_path, "--objects_path", paths_dir, "--cpu_count", str(args.cpu_count)],
+        os.path.join(stage_dir, "metadata.log"),
+    )
+    start = time.perf_counter()
+    table = MetadataTable.load(save_path)
+    build_seconds = time.perf_counter() - start
+    load_seconds = median_seconds(lambda: MetadataTable.load(save_path), args.repeat)
+
+    metrics = {
+        "metadata.seconds_per_object": seconds / len(specs),
+        "metadata.table_build_seconds": build_seconds,
+        "metadata.table_load_seconds": load_seconds,
+    }
+    return metrics, metadata_mismatches(table, specs)
+
+
+def metadata_mismatches(table: MetadataTable, specs) -> List[Dict]:
+    """Returns the metadata values that differ from the values the specs imply."""
+    ordinals = table.ordinals([spec.uid for spec in specs])
+    mismatches = []
+    for spec, ordinal in zip(specs, ordinals):
+        for column, expected in expected_metadata(spec).items():
+            if column not in table.columns:
+                continue
+            value = int(table.column(column)[ordinal]) if ordinal >= 0 else None
+            if value != expected:
+                mismatches.append({"uid": spec.uid, "column": column, "value": value, "expected": expected})
+    return mismatches
+
+
+def bench_render(args, specs, stage_dir: str) -> Dict[str, float]:
+    """Renders every object in its own Blender process, like render.py does."""
+    output_dir = os.path.join(stage_dir, "renders")
+    timings_dir = os.path.join(stage_dir, "timings")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    shutil.rmtree(timings_dir, ignore_errors=True)
+    seconds = []
+    for spec in specs:
+        seconds.append(run_blender(
+            args.blender,
+            "blender_render.py",
+            [
+                "--objects_paths", object_path(args.corpus_dir, spec),
+                "--separate", "1",
+                "--output_dir", os.path.join(output_dir, spec.uid),
+                "--engine", "CYCLES",
+                "--cycles_device", "CPU",
+                "--render_profile", "benchmark",
+                "--num_images", str(args.num_images),
+                "--mode_multi", "1",
+                "--task_key", spec.uid,
+                "--timings_dir", timings_dir,
+            ],
+            os.path.join(stage_dir, f"render_{spec.uid}.log"),
+        ))
+    metrics = {"render.seconds_per_object": statistics.median(seconds)}
+    metrics.update(span_metrics(load_records(timings_dir), "render", RENDER_SPANS))
+    return metrics
+
+
+def span_metrics(records: List[dict], prefix: str, stages) -> Dict[str, float]:
+    """Returns the median seconds of the timing spans of the given stages."""
+    percentiles = stage_percentiles(records)
+    return {f"{prefix}.{stage}_seconds": percentiles[stage]["p50_s"] for stage in stages if stage in percentiles}
+
+
+def compare_results(
+    baseline: Dict[str, float], metrics: Dict[str, float], threshold: float, min_delta: float = 0.01
+) -> List[Dict]:
+    """Returns the metrics that are slower than the baseline.
+
+    Args:
+        baseline (Dict[str, float]): Metrics of the baseline run.
+        metrics (Dict[str, float]): Metrics of this run.
+        threshold (float): Relative slowdown that counts as a regression, e.g.
+            0.15 for 15%.
+        min_delta (float, optional): Smallest slowdown in seconds that counts,
+            below it a metric of a few milliseconds is timer noise. Defaults to
+            0.01.
+
+    Returns:
+        List[Dict]: The regressed metrics with their baseline and current
+        seconds and ratio, metrics missing from either run are skipped.
+    """
+    regressions = []
+    for name in sorted(set(baseline) & set(metrics)):
+        before, after = baseline[name], metrics[name]
+        if after - before > min_delta and after > before * (1 + threshold):
+            regressions.append({"metric": name, "baseline": before, "current": after, "ratio": after / max(before, 1e-9)})
+    return regressions
+
+
+def main():
+    args = parse_arguments()
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        print(f"Unknown stages {unknown}, choose from {list(STAGES)}")
+        exit(1)
+
+    args.corpus_dir = os.path.join(args.work_dir, f"corpus_{args.seed}")
+    specs = corpus_specs(args.num_objects, args.seed)
+    os.makedirs(args.work_dir, exist_ok=True)
+    corpus_seconds = None
+    if not corpus_complete(args.corpus_dir, specs):
+        print(f"Generating the corpus of {len(specs)} objects in {args.corpus_dir}")
+        corpus_seconds = run_blender(
+            args.blender,
+            "benchmarks/make_corpus.py",
+            ["--corpus_dir", args.corpus_dir, "--num_objects", str(args.num_objects), "--seed", str(args.seed)],
+            os.path.join(args.work_dir, "corpus.log"),
+        )
+
+    metrics: Dict[str, float] = {}
+    mismatches: List[Dict] = []
+    if "catalog" in stages:
+        metrics.update(bench_catalog(args.corpus_dir, [spec.uid for spec in specs], args.repeat))
+    if "metadata" in stages:
+        metadata_metrics, mismatches = bench_metadata(args, specs, args.work_dir)
+        metrics.update(metadata_metrics)
+    if "render" in stages:
+        metrics.update(bench_render(args, specs, args.work_dir))
+
+    results = {
+        "commit": git_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "num_objects": len(specs),
+        "seed": args.seed,
+        "corpus_bytes": sum(os.path.getsize(object_path(args.corpus_dir, spec)) for spec in specs),
+        "corpus_seconds": corpus_seconds,
+        "metrics": metrics,
+        "metadata_mismatches": mismatches,
+    }
+    for name, seconds in metrics.items():
+        print(f"{name:<40}{seconds:>12.4f}s")
+
+    if mismatches:
+        # a wrong extractor fails the run like a regression, its timings mean nothing
+        print(f"Metadata differs from the corpus specs for {len(mismatches)} values, e.g. {mismatches[:3]}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline["metrics"], metrics, args.threshold, args.min_delta)
+        results["baseline"] = {"commit": baseline.get("commit"), "threshold": args.threshold, "regressions": regressions}
+        for regression in regressions:
+            print(f"Regression of {regression['metric']}: {regression['baseline']:.4f}s -> "
+                  f"{regression['current']:.4f}s ({regression['ratio']:.2f}x)")
+        if baseline.get("host") != results["host"]:
+            print(f"The baseline was measured on {baseline.get('host')}, timings of other machines are not comparable")
+
+    if args.output_path:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions or mismatches:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Blender script to extract geometry of objects for similarity, dedup and
+point clouds.
+
+In the default descriptors mode, loads every object of --objects_paths in the same Blender process and reads
+the triangles of its evaluated meshes (modifiers applied) in world space with
+foreach_get once, then computes its shape descriptor (see
+render_scripts/shape_descriptors.py) and its MinHash fingerprint (see
+render_scripts/geometry_fingerprint.py) from them. The batch is saved to
+--output_path as an npz file with a `uids`, a `descriptors` and a `signatures`
+array.
+
+In the pointcloud mode, normalizes every object to the unit cube like
+blender_render.py, then samples --num_points surface points with normals from
+the same triangles and, with --voxel_resolution, a voxel occupancy grid. The
+batch is saved as a point cloud shard with --output_path as its prefix, see
+render_scripts/point_clouds.py.
+
+Objects that fail to load or have no surface are reported and skipped. Run by
+similarity.py, dedup.py and pointclouds.py:
+
+    blender --background --python scripts/blender_geometry.py -- \
+        --objects_paths a.glb,b.glb --output_path descriptors/batch_00000.npz
+    blender --background --python scripts/blender_geometry.py -- --mode pointcloud \
+        --objects_paths a.glb,b.glb --output_path pointclouds/batch_00000 --voxel_resolution 32
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+import zlib
+from typing import List, Tuple
+
+import bpy
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from blender_render import get_scene_meshes, load_objects, normalize_scene, reset_scene
+from render_scripts.geometry_fingerprint import NUM_PERM, minhash_signature
+from render_scripts.point_clouds import VOXEL_SAMPLES_PER_CELL, voxel_grid, write_shard
+from render_scripts.shape_descriptors import DESCRIPTOR_SIZE, sample_surface, shape_descriptor
+
+
+def scene_triangles() -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the world space vertices (V, 3) and triangles (T, 3) of all meshes."""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    vertex_arrays, triangle_arrays = [], []
+    offset = 0
+    for obj in get_scene_meshes():
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            mesh.calc_loop_triangles()
+            vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", vertices)
+            triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+            mesh.loop_triangles.foreach_get("vertices", triangles)
+        finally:
+            evaluated.to_mesh_clear()
+        vertices = vertices.reshape(-1, 3)
+        matrix = np.array(obj.matrix_world, dtype=np.float32)
+        vertex_arrays.append(vertices @ matrix[:3, :3].T + matrix[:3, 3])
+        triangle_arrays.append(triangles.reshape(-1, 3) + offset)
+        offset += len(vertices)
+    if not vertex_arrays:
+        return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(vertex_arrays), np.concatenate(triangle_arrays)
+
+
+def write_descriptors(args, object_paths: List[str]) -> None:
+    uids, descriptors, signatures = [], [], []
+    for object_path in object_paths:
+        uid = os.path.splitext(os.path.basename(object_path))[0]
+        start = time.perf_counter()
+        try:
+            reset_scene()
+            load_objects(object_path)
+            vertices, triangles = scene_triangles()
+            descriptor = shape_descriptor(vertices, triangles)
+        except Exception:
+            print(f"Geometry of {uid} failed:\n{traceback.format_exc()}")
+            continue
+        if descriptor is None:
+            print(f"{uid} has no surface, skipped")
+            continue
+        uids.append(uid)
+        descriptors.append(descriptor)
+        signatures.append(minhash_signature(vertices))
+        print(f"Geometry of {uid} processed in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_path)), exist_ok=True)
+    # written to a file object, np.savez would add .npz to the temporary name
+    tmp_path = args.output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            uids=np.array(uids, dtype=str),
+            descriptors=np.array(descriptors, dtype=np.float32).reshape(-1, DESCRIPTOR_SIZE),
+            signatures=np.array(signatures, dtype=np.uint32).reshape(-1, NUM_PERM),
+        )
+    os.replace(tmp_path, args.output_path)
+
+
+def write_point_clouds(args, object_paths: List[str]) -> None:
+    resolution = args.voxel_resolution
+    uids, points, normals, voxels = [], [], [], []
+    for object_path in object_paths:
+        uid = os.path.splitext(os.path.basename(object_path))[0]
+        start = time.perf_counter()
+        # seeded by the uid, the samples of an object do not depend on its batch
+        rng = np.random.default_rng(zlib.crc32(uid.encode()))
+        try:
+            reset_scene()
+            load_objects(object_path)
+            normalize_scene()
+            # the children of the scaled roots get their matrix_world on update
+            bpy.context.view_layer.update()
+            vertices, triangles = scene_triangles()
+            object_points, object_normals = sample_surface(vertices, triangles, args.num_points, rng)
+            if len(object_points) and resolution:
+                surface = sample_surface(vertices, triangles, VOXEL_SAMPLES_PER_CELL * resolution**2, rng)[0]
+                voxels.append(voxel_grid(np.concatenate([surface, object_points]), resolution))
+        except Exception:
+            print(f"Point cloud of {uid} failed:\n{traceback.format_exc()}")
+            continue
+        if len(object_points) == 0:
+            print(f"{uid} has no surface, skipped")
+            continue
+        uids.append(uid)
+        points.append(object_points)
+        normals.append(object_normals)
+        print(f"Point cloud of {uid} processed in {time.perf_counter() - start:.2f}s")
+
+    shape = (len(uids), args.num_points, 3)
+    write_shard(
+        args.output_path,
+        uids,
+        np.array(points, dtype=np.float32).reshape(shape),
+        np.array(normals, dtype=np.float32).reshape(shape),
+        np.array(voxels, dtype=np.uint8).reshape(len(uids), resolution, resolution, resolution // 8) if resolution else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--mode
+        "--mode",
+        type=str,
+        default="descriptors",
+        choices=["descriptors", "pointcloud"],
+        help="Writes shape descriptors and fingerprints, or point clouds")
+    parser.add_argument( #--objects_paths
+        "--objects_paths",
+        type=str,
+        required=True,
+        help="Comma separated paths of the object files")
+    parser.add_argument( #--output_path
+        "--output_path",
+        type=str,
+        required=True,
+        help="Path of the npz file of the batch, the shard prefix in the pointcloud mode")
+    parser.add_argument( #--num_points
+        "--num_points",
+        type=int,
+        default=2048,
+        help="Number of surface points of a point cloud")
+    parser.add_argument( #--voxel_resolution
+        "--voxel_resolution",
+        type=int,
+        default=0,
+        help="Voxel grid cells along every axis, a multiple of 8, 0 writes no voxel grids")
+    argv = sys.argv[sys.argv.index("--") + 1 :]
+    args = parser.parse_args(argv)
+    if args.voxel_resolution % 8:
+        parser.error("--voxel_resolution must be a multiple of 8")
+
+    object_paths = args.objects_paths.split(",")
+    if args.mode == "pointcloud":
+        write_point_clouds(args, object_paths)
+    else:
+        write_descriptors(args, object_paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Blender script to write the level-of-detail (LOD) preview GLB of objects.
+
+Loads every object of --objects_paths in the same Blender process, reduces it
+to the triangle budget with a collapse Decimate modifier on every mesh (the
+ratio is the same for all meshes, so small parts are not removed first) and
+downscales the textures to the texture budget, then exports
+`<output_dir>/<uid>.glb` with the modifiers applied. If the GLB is larger than
+--max_bytes the textures and triangles are halved and the object is exported
+again, up to three times. Shape keys are lost by applying the modifiers, which
+is fine for a preview. `<output_dir>/<uid>.json` records the triangles,
+texture sizes and bytes before and after. Run by lods.py:
+
+    blender --background --python scripts/blender_lod.py -- \
+        --objects_paths a.glb,b.glb --output_dir lods/
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from typing import Any, Dict
+
+import bpy
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from blender_render import get_scene_meshes, load_objects, reset_scene
+
+MAX_ATTEMPTS = 3
+
+
+def count_triangles() -> int:
+    """Returns the number of triangles of the meshes of the scene."""
+    return sum(
+        len(polygon.vertices) - 2
+        for obj in get_scene_meshes()
+        for polygon in obj.data.polygons
+    )
+
+
+def decimate_meshes(ratio: float) -> None:
+    """Sets the ratio of the Decimate modifier of every mesh, adding it if needed."""
+    for obj in get_scene_meshes():
+        modifier = obj.modifiers.get("lod_decimate")
+        if modifier is None:
+            modifier = obj.modifiers.new("lod_decimate", "DECIMATE")
+            modifier.decimate_type = "COLLAPSE"
+        modifier.ratio = ratio
+
+
+def downscale_textures(max_size: int) -> int:
+    """Scales every image larger than max_size down to it, keeps the aspect ratio.
+
+    Returns:
+        int: Number of scaled images.
+    """
+    scaled = 0
+    for image in bpy.data.images:
+        width, height = image.size
+        if max(width, height) <= max_size:
+            continue
+        factor = max_size / max(width, height)
+        image.scale(max(1, round(width * factor)), max(1, round(height * factor)))
+        scaled += 1
+    return scaled
+
+
+def write_lod(object_path: str, output_path: str, max_triangles: int, max_texture_size: int, max_bytes: int) -> Dict[str, Any]:
+    """Writes the preview GLB of an object.
+
+    Args:
+        object_path (str): Path of the source object.
+        output_path (str): Path of the preview GLB.
+        max_triangles (int): Triangle budget.
+        max_texture_size (int): Largest texture side.
+        max_bytes (int): Size budget of the GLB.
+
+    Returns:
+        Dict[str, Any]: Statistics of the preview.
+    """
+    reset_scene()
+    load_objects(object_path)
+    source_triangles = count_triangles()
+    source_texture_size = max((max(image.size) for image in bpy.data.images), default=0)
+
+    triangles, texture_size = max_triangles, max_texture_size
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        ratio = min(1.0, triangles / source_triangles) if source_triangles else 1.0
+        decimate_meshes(ratio)
+        downscale_textures(texture_size)
+        bpy.ops.export_scene.gltf(filepath=output_path, export_format="GLB", export_apply=True)
+        size = os.path.getsize(output_path)
+        if size <= max_bytes:
+            break
+        triangles, texture_size = triangles // 2, max(texture_size // 2, 64)
+
+    return {
+        "source_bytes": os.path.getsize(object_path),
+        "source_triangles": source_triangles,
+        "source_texture_size": source_texture_size,
+        "bytes": size,
+        "triangles": round(source_triangles * ratio),
+        "texture_size": min(texture_size, source_texture_size),
+        "attempts": attempt,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_paths
+        "--objects_paths",
+        type=str,
+        required=True,
+        help="Comma separated paths of the object files")
+    parser.add_argument( #--output_dir
+        "--output_dir",
+        type=str,
+        required=True,
+        help="Directory of the <uid>.glb previews")
+    parser.add_argument( #--max_triangles
+        "--max_triangles",
+        type=int,
+        default=50000,
+        help="Triangle budget of a preview")
+    parser.add_argument( #--max_texture_size
+        "--max_texture_size",
+        type=int,
+        default=1024,
+        help="Largest texture side of a preview")
+    parser.add_argument( #--max_bytes
+        "--max_bytes",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="Size budget of a preview GLB")
+    argv = sys.argv[sys.argv.index("--") + 1 :]
+    args = parser.parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for object_path in args.objects_paths.split(","):
+        uid = os.path.splitext(os.path.basename(object_path))[0]
+        start = time.perf_counter()
+        try:
+            stats = write_lod(
+                object_path,
+                os.path.join(args.output_dir, f"{uid}.glb"),
+                args.max_triangles,
+                args.max_texture_size,
+                args.max_bytes,
+            )
+        except Exception:
+            print(f"LOD of {uid} failed:\n{traceback.format_exc()}")
+            continue
+        stats["duration_s"] = time.perf_counter() - start
+        with open(os.path.join(args.output_dir, f"{uid}.json"), "w") as f:
+            json.dump(stats, f)
+        print(f"LOD of {uid}: {stats['source_bytes']} -> {stats['bytes']} bytes in {stats['duration_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
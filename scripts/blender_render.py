@@ -8,11 +8,13 @@ images of the scene. The images are saved to the output directory.
 """
 
 import argparse
+import hashlib
 import json
 import math
 import os
 import random
 import sys
+import time
 from typing import Any, Callable, Dict, Generator, List, Literal, Optional, Set, Tuple
 from mathutils.noise import random_unit_vector
 import bpy
@@ -22,6 +24,24 @@ import os
 # import imageio
 # from skimage.metrics import structural_similarity as ssim
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from render_scripts.aov_passes import (
+    PASS_FORMATS, PASS_SOCKETS, PNG_ENCODING, PassStats, parse_passes, pass_path, supported_passes
+)
+from render_scripts.bbox_cache import BBoxCache
+from render_scripts.image_header import image_header_size, read_image_header_size
+from render_scripts.import_cache import ImportCache
+from render_scripts.profiling import configure_profiling, profiling_enabled, record, span
+from render_scripts.poly_budget import decimation_ratios, triangle_budget
+from render_scripts.render_output import LooseFileOutput, create_render_output
+from render_scripts.render_profiles import RenderBudget, RenderProfile, get_render_profile
+from render_scripts.scene_layout import LAYOUTS, compute_layout
+from render_scripts.texture_cache import TextureCache, downscale_pixels, scaled_size, texture_size_for_resolution
+from render_scripts.view_plan import (
+    RenderSavings, count_views, link_view_files, links_static_views, view_file_pairs
+)
+
 IMPORT_FUNCTIONS: Dict[str, Callable] = {
     "obj": bpy.ops.import_scene.obj,
     "glb": bpy.ops.import_scene.gltf,
@@ -166,6 +186,36 @@ class MetadataExtractor:
                 total_armature_count += 1
         return total_armature_count
 
+    def get_texture_bytes(self) -> Dict[str, int]:
+        """Returns the packed (file) and decoded (memory) sizes of all images in bytes.
+
+        The dimensions are read from the PNG or JPEG headers, because reading
+        image.size would make Blender decode every image before the render starts.
+        Decoded images are counted as RGBA, 8 bits or float per channel.
+        """
+        packed_bytes = 0
+        decoded_bytes = 0
+        unknown_images = 0
+        for image in self.bdata.images:
+            size = None
+            if image.packed_file is not None:
+                packed_bytes += image.packed_file.size
+                size = image_header_size(image.packed_file.data)
+            elif image.source == "FILE":
+                path = bpy.path.abspath(image.filepath)
+                if os.path.isfile(path):
+                    size = read_image_header_size(path)
+            if size is None:
+                unknown_images += 1
+                continue
+            width, height, bit_depth = size
+            decoded_bytes += width * height * 4 * (4 if bit_depth > 8 else 1)
+        return {
+            "packed_bytes": packed_bytes,
+            "decoded_bytes": decoded_bytes,
+            "unknown_images": unknown_images,
+        }
+
     def read_file_size(self) -> int:
         """Returns the size of the file in bytes."""
         return os.path.getsize(self.object_path)
@@ -410,84 +460,506 @@ def reset_scene() -> None:
     for image in bpy.data.images:
         bpy.data.images.remove(image, do_unlink=True)
 
+    # the next objects can reuse the names and matrices of the deleted ones
+    clear_scene_bbox_cache()
 
-def load_objects(objects_paths: str) -> None:
+
+def load_objects(objects_paths: str, layout: str = "shelf") -> Dict[int, str]:
     """Loads a model with a supported file extension into the scene.
 
+    The files are imported with import_object_file, through the import cache if
+    configure_import_cache was called. Every loaded object gets its own pass index (the objects of a single file all
+    get 1), so the Object Index render pass is the instance mask of a group scene.
+
     Args:
         object_path (str): Path to the model file.
+        layout (str, optional): Layout of the objects of a group scene, "shelf" or
+            "grid", see arrange_objects. Defaults to "shelf".
 
     Raises:
-        ValueError: If the file extension is not supported.
+        ValueError: If the file extension is not supported. Files of a group scene
+            that are not glb or gltf are skipped with a warning.
 
     Returns:
-        None
+        Dict[int, str]: The uid of every pass index.
     """
+    clear_scene_bbox_cache()
     # Convert the objects_paths string into a list  
     objects_path_list = objects_paths.split(',')
 
     #single object
     if len(objects_path_list) == 1: 
         object_path = objects_path_list[0]
-
-        file_extension = object_path.split(".")[-1].lower()
-        if file_extension is None:
-            raise ValueError(f"Unsupported file type: {object_path}")
-
-        if file_extension == "usdz":
-            # install usdz io package
-            dirname = os.path.dirname(os.path.realpath(__file__))
-            usdz_package = os.path.join(dirname, "io_scene_usdz.zip")
-            bpy.ops.preferences.addon_install(filepath=usdz_package)
-            # enable it
-            addon_name = "io_scene_usdz"
-            bpy.ops.preferences.addon_enable(module=addon_name)
-            # import the usdz
-            from io_scene_usdz.import_usdz import import_usdz
-
-            import_usdz(context, filepath=object_path, materials=True, animations=True)
-            return None
-
-        # load from existing import functions
-        import_function = IMPORT_FUNCTIONS[file_extension]
-
-        if file_extension == "blend":
-            import_function(directory=object_path, link=False)
-        elif file_extension in {"glb", "gltf"}:
-            import_function(filepath=object_path, merge_vertices=True)
-        else:
-            import_function(filepath=object_path)
+        roots = import_object_file(object_path)
+        return assign_pass_indices([roots], [object_path])
     #multiple objects
     else: #len(objects_path_list) > 1:
-        spacing = 2.0 
-        for index, object_path in enumerate(objects_path_list):
+        imported_roots = {}
+        object_roots = []
+        loaded_paths = []
+        for object_path in objects_path_list:
 
             file_extension = object_path.split(".")[-1].lower()
-            if file_extension is None:
-                raise ValueError(f"Unsupported file type: {object_path}")
+            if file_extension not in {"glb", "gltf"}: # just this one
+                print(f"Skipping unsupported file type in group scene: {object_path}")
+                continue
+
+            if object_path in imported_roots:
+                # repeated uid, share the imported data instead of importing again
+                roots = duplicate_linked(imported_roots[object_path])
+            else:
+                roots = import_object_file(object_path, merge_vertices=False)
+                imported_roots[object_path] = roots
+            object_roots.append(roots)
+            loaded_paths.append(object_path)
+
+        arrange_objects(object_roots, layout)
+        return assign_pass_indices(object_roots, loaded_paths)
+
+
+# set by configure_import_cache, imports go through the .blend cache when set
+_import_cache: Optional[ImportCache] = None
+_usdz_addon_enabled = False
+# set by configure_texture_cache, imported textures are downscaled when set
+_texture_cache: Optional[TextureCache] = None
+# texture statistics of the imported files by uid, see texture_stats
+_texture_stats: Dict[str, Dict[str, int]] = {}
+
+
+def configure_import_cache(cache_dir: Optional[str]) -> None:
+    """Makes import_object_file convert files to .blend once in cache_dir and
+    append the conversions, None imports every time."""
+    global _import_cache
+    if _import_cache is not None:
+        _import_cache.close()
+    _import_cache = ImportCache(cache_dir, bpy.app.version_string) if cache_dir else None
+
+
+def configure_texture_cache(cache_dir: Optional[str], max_size: int) -> None:
+    """Makes import_object_file replace the textures larger than max_size with
+    downscaled copies cached in cache_dir, None keeps the textures."""
+    global _texture_cache
+    if _texture_cache is not None:
+        _texture_cache.close()
+    _texture_cache = TextureCache(cache_dir, max_size) if cache_dir else None
+
+
+def texture_stats() -> Dict[str, Dict[str, int]]:
+    """Returns the texture statistics of the files imported since the last call,
+    see downscale_textures, and clears them."""
+    stats = dict(_texture_stats)
+    _texture_stats.clear()
+    return stats
+
+
+def _image_source(image: bpy.types.Image) -> Optional[bytes]:
+    """Returns the encoded bytes of an embedded or external image, None if it has none."""
+    if image.packed_file is not None:
+        return image.packed_file.data
+    path = bpy.path.abspath(image.filepath)
+    if image.source != "FILE" or not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_downscaled(image: bpy.types.Image, cache: TextureCache, size: Tuple[int, int]) -> str:
+    """Decodes an image, writes its downscaled copy to a temporary file of the
+    cache and returns its path."""
+    width, height = image.size
+    pixels = np.empty(width * height * image.channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    scaled = downscale_pixels(pixels.reshape(height, width, image.channels), *size)
+    if image.is_float:
+        file_format, extension = "OPEN_EXR", ".exr"
+    elif image.file_format == "JPEG" and image.channels < 4:
+        file_format, extension = "JPEG", ".jpg"
+    else:
+        file_format, extension = "PNG", ".png"
+    copy = bpy.data.images.new(
+        f"{image.name}_scaled", size[0], size[1], alpha=image.channels == 4, float_buffer=image.is_float
+    )
+    try:
+        if image.channels != 4:
+            # new images are RGBA
+            rgba = np.ones((size[1], size[0], 4), dtype=np.float32)
+            rgba[..., : min(image.channels, 3)] = scaled[..., :3]
+            scaled = rgba
+        copy.pixels.foreach_set(scaled.ravel())
+        tmp_path = cache.temporary_path(extension)
+        copy.filepath_raw = tmp_path
+        copy.file_format = file_format
+        copy.save()
+    finally:
+        bpy.data.images.remove(copy)
+    return tmp_path
+
+
+def downscale_textures(images: List[bpy.types.Image], cache: TextureCache) -> Dict[str, int]:
+    """Replaces the images larger than the texture size of the cache with their
+    downscaled copies.
+
+    Images seen before are looked up by the hash of their encoded bytes without
+    decoding them. The copies take over the color space and alpha mode of the
+    images they replace, and identical textures of a group scene share one copy.
+
+    Args:
+        images (List[bpy.types.Image]): Images of an imported file.
+        cache (TextureCache): The texture cache.
+
+    Returns:
+        Dict[str, int]: Number of textures, downscaled textures and cache hits, and
+        the encoded and decoded (RGBA, 8 bits per channel) sizes of the textures
+        before and after.
+    """
+    stats = dict(textures=0, downscaled=0, cache_hits=0, source_bytes=0, bytes=0, source_pixel_bytes=0, pixel_bytes=0)
+    for image in images:
+        source = _image_source(image)
+        if source is None:
+            continue
+        digest = hashlib.sha256(source).hexdigest()
+        entry = cache.get(digest)
+        if entry is not None:
+            stats["cache_hits"] += 1
+        else:
+            width, height = image.size
+            size = scaled_size(width, height, cache.max_size)
+            if size is None:
+                entry = cache.put(digest, width, height, len(source))
+            else:
+                scaled_file = _write_downscaled(image, cache, size)
+                entry = cache.put(digest, width, height, len(source), scaled_file, *size)
+        stats["textures"] += 1
+        stats["source_bytes"] += entry.source_bytes
+        stats["bytes"] += entry.bytes
+        stats["source_pixel_bytes"] += entry.width * entry.height * 4
+        stats["pixel_bytes"] += entry.scaled_width * entry.scaled_height * 4
+        if entry.path is None:
+            continue
+        stats["downscaled"] += 1
+        copy = bpy.data.images.load(entry.path, check_existing=True)
+        copy.colorspace_settings.name = image.colorspace_settings.name
+        copy.alpha_mode = image.alpha_mode
+        image.user_remap(copy)
+        bpy.data.images.remove(image)
+    return stats
+
+
+def enable_usdz_addon() -> None:
+    """Installs and enables the bundled USDZ importer once per Blender process."""
+    global _usdz_addon_enabled
+    if _usdz_addon_enabled:
+        return
+    addon_name = "io_scene_usdz"
+    if addon_name not in bpy.context.preferences.addons:
+        # install usdz io package
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        usdz_package = os.path.join(dirname, "io_scene_usdz.zip")
+        bpy.ops.preferences.addon_install(filepath=usdz_package)
+        bpy.ops.preferences.addon_enable(module=addon_name)
+    _usdz_addon_enabled = True
+
+
+def import_source_file(object_path: str, merge_vertices: bool = True) -> None:
+    """Imports a model file with the importer of its extension.
 
-            elif file_extension in {"glb", "gltf"}: # just this one 
-                bpy.ops.import_scene.gltf(filepath=object_path)
-                imported_object = bpy.context.selected_objects[0]
-                imported_object.location.x = index * spacing
+    Args:
+        object_path (str): Path to the model file.
+        merge_vertices (bool, optional): Whether the glTF importer merges the
+            vertices of the primitives. Defaults to True.
 
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    file_extension = object_path.split(".")[-1].lower()
+    if file_extension == "usdz":
+        enable_usdz_addon()
+        from io_scene_usdz.import_usdz import import_usdz
+
+        import_usdz(bpy.context, filepath=object_path, materials=True, animations=True)
+        return
+    if file_extension not in IMPORT_FUNCTIONS:
+        raise ValueError(f"Unsupported file type: {object_path}")
+
+    # load from existing import functions
+    import_function = IMPORT_FUNCTIONS[file_extension]
+    if file_extension == "blend":
+        import_function(directory=object_path, link=False)
+    elif file_extension in {"glb", "gltf"}:
+        import_function(filepath=object_path, merge_vertices=merge_vertices)
+    else:
+        import_function(filepath=object_path)
+
+
+# bpy.data collections of the data blocks a cached .blend file can hold
+APPENDED_DATA = (
+    "objects", "meshes", "materials", "images", "textures", "node_groups", "actions", "armatures",
+    "shape_keys", "cameras", "lights", "curves",
+)
+
+
+def append_blend(blend_path: str) -> None:
+    """Appends all objects of a .blend file of the import cache to the scene,
+    selected like after an import.
+
+    The cache files are written with fake users on all their data blocks, the
+    appended blocks lose them, so reset_scene and Blender's orphan cleanup free
+    them again in long-running workers.
+    """
+    existing = {name: set(getattr(bpy.data, name)) for name in APPENDED_DATA}
+    with bpy.data.libraries.load(blend_path, link=False) as (data_from, data_to):
+        data_to.objects = data_from.objects
+    for name, blocks in existing.items():
+        for block in getattr(bpy.data, name):
+            if block not in blocks and block.use_fake_user:
+                block.use_fake_user = False
+    for obj in data_to.objects:
+        if obj is None:
+            continue
+        bpy.context.scene.collection.objects.link(obj)
+        obj.select_set(True)
+
+
+def import_object_file(object_path: str, merge_vertices: bool = True) -> List[bpy.types.Object]:
+    """Imports a model file, through the import cache if configured.
+
+    A file missing from the cache is imported and its new objects are written to
+    the cache as a .blend file with their data only, the next loads append it.
+    Then its textures are downscaled if configure_texture_cache was called.
+
+    Args:
+        object_path (str): Path to the model file.
+        merge_vertices (bool, optional): Whether the glTF importer merges the
+            vertices of the primitives, conversions are cached per option.
+            Defaults to True.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+
+    Returns:
+        List[bpy.types.Object]: The new root objects.
+    """
+    existing_objects = set(bpy.context.scene.objects)
+    existing_images = set(bpy.data.images)
+    bpy.ops.object.select_all(action="DESELECT")
+    # .blend files are appended already
+    cache = _import_cache if not object_path.lower().endswith(".blend") else None
+    is_gltf = object_path.lower().endswith((".glb", ".gltf"))
+    options = "merged" if is_gltf and merge_vertices else ""
+    cached_path = cache.get(object_path, options) if cache is not None else None
+    if cached_path is not None:
+        with span("append_cached_import", path=object_path):
+            append_blend(cached_path)
+    else:
+        import_source_file(object_path, merge_vertices)
+    new_objects = [obj for obj in bpy.context.scene.objects if obj not in existing_objects]
+
+    if cache is not None and cached_path is None and new_objects:
+        with span("save_cached_import", path=object_path):
+            tmp_path = cache.temporary_path()
+            # absolute paths keep the external textures of OBJ and FBX files found
+            bpy.data.libraries.write(tmp_path, set(new_objects), path_remap="ABSOLUTE", fake_user=True)
+            cache.put(object_path, tmp_path, options)
+
+    # the conversions keep the original textures, the copies depend on the resolution
+    if _texture_cache is not None:
+        uid = os.path.splitext(os.path.basename(object_path))[0]
+        with span("downscale_textures", uid=uid):
+            stats = downscale_textures([image for image in bpy.data.images if image not in existing_images], _texture_cache)
+        _texture_stats[uid] = stats
+        record("texture_stats", uid=uid, **stats)
+        print(f"Textures of {uid}: {stats['downscaled']} of {stats['textures']} downscaled, "
+              f"{(stats['source_pixel_bytes'] - stats['pixel_bytes']) / 2**20:.1f} MB of pixels saved")
+    return [obj for obj in new_objects if obj.parent is None]
+
+
+def assign_pass_indices(
+    object_roots: List[List[bpy.types.Object]], object_paths: List[str]
+) -> Dict[int, str]:
+    """Gives the objects of every loaded file, with their children, the pass index
+    of the file, starting at 1.
+
+    Args:
+        object_roots (List[List[bpy.types.Object]]): Root objects of every loaded
+            file, in the order of the group.
+        object_paths (List[str]): Paths of the loaded files.
+
+    Returns:
+        Dict[int, str]: The uid of every pass index.
+    """
+    uids = {}
+    for pass_index, (roots, object_path) in enumerate(zip(object_roots, object_paths), start=1):
+        for obj in _object_hierarchy(roots):
+            obj.pass_index = pass_index
+        uids[pass_index] = os.path.splitext(os.path.basename(object_path))[0]
+    return uids
 
-           
+
+def _object_hierarchy(roots: List[bpy.types.Object]) -> List[bpy.types.Object]:
+    """Returns the given root objects and all of their children."""
+    objects = []
+    for root in roots:
+        objects.append(root)
+        objects.extend(root.children_recursive)
+    return objects
+
+
+def duplicate_linked(roots: List[bpy.types.Object]) -> List[bpy.types.Object]:
+    """Creates linked duplicates (like Alt+D) of the given objects and their children.
+
+    The copies share the mesh, material and action data of the originals, so a uid
+    repeated in a group is only imported and held in memory once.
+
+    Args:
+        roots (List[bpy.types.Object]): Root objects of an imported file.
+
+    Returns:
+        List[bpy.types.Object]: The root objects of the copies.
+    """
+    copies = {}
+    for obj in _object_hierarchy(roots):
+        new_obj = obj.copy()
+        for collection in obj.users_collection:
+            collection.objects.link(new_obj)
+        copies[obj] = new_obj
+
+    # point parents, modifiers and constraints to the copies
+    for obj, new_obj in copies.items():
+        if obj.parent in copies:
+            new_obj.parent = copies[obj.parent]
+        for modifier in new_obj.modifiers:
+            if getattr(modifier, "object", None) in copies:
+                modifier.object = copies[modifier.object]
+        for constraint in new_obj.constraints:
+            if getattr(constraint, "target", None) in copies:
+                constraint.target = copies[constraint.target]
+    return [copies[root] for root in roots]
+
+
+def arrange_objects(object_roots: List[List[bpy.types.Object]], layout: str) -> None:
+    """Moves the objects of a group scene into a compact layout based on their bounds.
+
+    Args:
+        object_roots (List[List[bpy.types.Object]]): Root objects of every object of
+            the group, in the order of the group.
+        layout (str): "shelf" or "grid", see render_scripts/scene_layout.py.
+
+    Returns:
+        None
+    """
+    bpy.context.view_layer.update()
+    bounds = []
+    for roots in object_roots:
+        meshes = [
+            obj for obj in _object_hierarchy(roots) if isinstance(obj.data, bpy.types.Mesh)
+        ]
+        bounds.append(objects_bbox(meshes) if meshes else (np.zeros(3), np.zeros(3)))
+    bbox_min = np.array([bbox[0] for bbox in bounds])
+    bbox_max = np.array([bbox[1] for bbox in bounds])
+
+    positions = compute_layout(bbox_max - bbox_min, layout)
+    for roots, offset in zip(object_roots, positions - bbox_min):
+        for root in roots:
+            root.matrix_world.translation += Vector(offset)
+    bpy.context.view_layer.update()
+    clear_scene_bbox_cache()
+
+
+def _mesh_vertices(obj: bpy.types.Object) -> np.ndarray:
+    """Returns the (N, 3) local vertex coordinates of a mesh object."""
+    vertices = obj.data.vertices
+    coords = np.empty(len(vertices) * 3, dtype=np.float32)
+    vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3).astype(np.float64)
+
+
+def objects_bbox(
+    objects: List[bpy.types.Object], ignore_matrix: bool = False, exact: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the world space bounding box of the given mesh objects.
+
+    By default the eight bound_box corners of all objects are stacked and
+    transformed by their world matrices in a single batched matrix multiply. The
+    exact mode transforms every vertex instead, which gives a tight box for rotated
+    objects, but ignores modifiers and deformation.
+
+    Args:
+        objects (List[bpy.types.Object]): Mesh objects, must not be empty.
+        ignore_matrix (bool, optional): Whether to ignore the objects' matrices.
+            Defaults to False.
+        exact (bool, optional): Whether to use the vertices instead of the bound_box
+            corners. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The minimum and maximum coordinates.
+    """
+    if ignore_matrix:
+        matrices = np.broadcast_to(np.eye(4), (len(objects), 4, 4))
+    else:
+        matrices = np.array([obj.matrix_world for obj in objects], dtype=np.float64)
+
+    if exact:
+        points = [
+            vertices @ matrix[:3, :3].T + matrix[:3, 3]
+            for vertices, matrix in zip(map(_mesh_vertices, objects), matrices)
+            if len(vertices)
+        ]
+        if points:
+            world_points = np.concatenate(points)
+            return world_points.min(axis=0), world_points.max(axis=0)
+
+    corners = np.array(
+        [[tuple(corner) for corner in obj.bound_box] for obj in objects], dtype=np.float64
+    )
+    world_corners = (
+        np.einsum("nij,nkj->nki", matrices[:, :3, :3], corners) + matrices[:, None, :3, 3]
+    ).reshape(-1, 3)
+    return world_corners.min(axis=0), world_corners.max(axis=0)
+
+
+def scene_has_animation() -> bool:
+    """Returns whether the scene can change between frames: it has actions,
+    armatures or shape keys."""
+    if len(bpy.data.actions) > 0:
+        return True
+    for obj in bpy.context.scene.objects:
+        if obj.type == "ARMATURE":
+            return True
+        if obj.type == "MESH" and obj.data.shape_keys is not None:
+            return True
+    return False
+
+
+# results of scene_bbox, cleared by clear_scene_bbox_cache wherever the geometry
+# changes: loading, reset, normalize, layout, frame changes and decimation
+_scene_bbox_cache = BBoxCache()
+
+
+def clear_scene_bbox_cache() -> None:
+    """Clears the scene_bbox cache, needed after any change of the scene geometry."""
+    _scene_bbox_cache.invalidate()
 
 
 def scene_bbox(
-    single_obj: Optional[bpy.types.Object] = None, ignore_matrix: bool = False
+    single_obj: Optional[bpy.types.Object] = None,
+    ignore_matrix: bool = False,
+    exact: bool = False,
 ) -> Tuple[Vector, Vector]:
     """Returns the bounding box of the scene.
 
-    Taken from Shap-E rendering script
+    Adapted from Shap-E rendering script
     (https://github.com/openai/shap-e/blob/main/shap_e/rendering/blender/blender_script.py#L68-L82)
+    to use objects_bbox. The result is cached until clear_scene_bbox_cache is
+    called, which every function changing the geometry does, so calling it for
+    every rendered view is cheap.
 
     Args:
         single_obj (Optional[bpy.types.Object], optional): If not None, only computes
             the bounding box for the given object. Defaults to None.
         ignore_matrix (bool, optional): Whether to ignore the object's matrix. Defaults
             to False.
+        exact (bool, optional): Whether to use the vertices instead of the bound_box
+            corners, see objects_bbox. Defaults to False.
 
     Raises:
         RuntimeError: If there are no objects in the scene.
@@ -495,22 +967,17 @@ def scene_bbox(
     Returns:
         Tuple[Vector, Vector]: The minimum and maximum coordinates of the bounding box.
     """
-    bbox_min = (math.inf,) * 3
-    bbox_max = (-math.inf,) * 3
-    found = False
-    for obj in get_scene_meshes() if single_obj is None else [single_obj]:
-        found = True
-        for coord in obj.bound_box:
-            coord = Vector(coord)
-            if not ignore_matrix:
-                coord = obj.matrix_world @ coord
-            bbox_min = tuple(min(x, y) for x, y in zip(bbox_min, coord))
-            bbox_max = tuple(max(x, y) for x, y in zip(bbox_max, coord))
-
-    if not found:
+    objects = list(get_scene_meshes()) if single_obj is None else [single_obj]
+    if not objects:
         raise RuntimeError("no objects in scene to compute bounding box for")
 
-    return Vector(bbox_min), Vector(bbox_max)
+    def compute() -> Tuple[Vector, Vector]:
+        bbox_min, bbox_max = objects_bbox(objects, ignore_matrix, exact)
+        return Vector(bbox_min), Vector(bbox_max)
+
+    key = (None if single_obj is None else single_obj.name, ignore_matrix, exact)
+    bbox_min, bbox_max = _scene_bbox_cache.get(key, compute)
+    return bbox_min.copy(), bbox_max.copy()
 
 
 def get_scene_root_objects() -> Generator[bpy.types.Object, None, None]:
@@ -566,6 +1033,77 @@ def get_3x4_RT_matrix_from_blender(cam: bpy.types.Object) -> Matrix:
     return RT
 
 
+def mesh_triangle_count(mesh: bpy.types.Mesh) -> int:
+    """Returns the number of triangles of a mesh without triangulating it."""
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return int((loop_totals - 2).sum())
+
+
+def apply_triangle_budget(budget: int) -> Dict[str, Any]:
+    """Decimates the meshes of the scene so it has at most budget triangles.
+
+    The ratios come from render_scripts/poly_budget.py. Meshes shared by linked
+    duplicates are counted once, as Cycles instances them, and a static mesh is
+    decimated once into new mesh data for all its objects, so they stay
+    instances. Meshes with shape keys or objects with modifiers (armatures) get a
+    collapse Decimate modifier at the end of their stack instead, evaluated at
+    every frame.
+
+    Args:
+        budget (int): Triangle budget of the scene.
+
+    Returns:
+        Dict[str, Any]: Triangles before and after, number of decimated meshes
+        and the seconds spent decimating.
+    """
+    start = time.perf_counter()
+    users: Dict[bpy.types.Mesh, List[bpy.types.Object]] = {}
+    for obj in get_scene_meshes():
+        users.setdefault(obj.data, []).append(obj)
+    counts = {mesh.name: mesh_triangle_count(mesh) for mesh in users}
+    ratios = decimation_ratios(counts, budget)
+
+    baked = []
+    for mesh, objects in users.items():
+        ratio = ratios[mesh.name]
+        if ratio >= 1.0:
+            continue
+        deformed = mesh.shape_keys is not None or any(len(obj.modifiers) for obj in objects)
+        for obj in objects if deformed else objects[:1]:
+            modifier = obj.modifiers.new("budget_decimate", "DECIMATE")
+            modifier.decimate_type = "COLLAPSE"
+            modifier.ratio = ratio
+        if not deformed:
+            baked.append((mesh, objects))
+
+    triangles = {name: round(count * ratios[name]) for name, count in counts.items()}
+    if baked:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        for mesh, objects in baked:
+            owner = objects[0]
+            decimated = bpy.data.meshes.new_from_object(owner.evaluated_get(depsgraph))
+            owner.modifiers.remove(owner.modifiers["budget_decimate"])
+            for obj in objects:
+                obj.data = decimated
+            triangles[mesh.name] = mesh_triangle_count(decimated)
+            if mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+        bpy.context.view_layer.update()
+    if ratios and min(ratios.values()) < 1.0:
+        # decimated meshes and modifiers change the bounds of the camera metadata
+        clear_scene_bbox_cache()
+
+    return {
+        "budget": budget,
+        "source_triangles": sum(counts.values()),
+        "triangles": sum(triangles.values()),
+        "meshes": len(counts),
+        "decimated_meshes": sum(ratio < 1.0 for ratio in ratios.values()),
+        "decimate_seconds": time.perf_counter() - start,
+    }
+
+
 def delete_invisible_objects() -> None:
     """Deletes all invisible objects in the scene.
 
@@ -585,9 +1123,10 @@ def delete_invisible_objects() -> None:
     invisible_collections = [col for col in bpy.data.collections if col.hide_viewport]
     for col in invisible_collections:
         bpy.data.collections.remove(col)
+    clear_scene_bbox_cache()
 
 
-def normalize_scene() -> None:
+def normalize_scene(exact_bbox: bool = False) -> None:
     """Normalizes the scene by scaling and translating it to fit in a unit cube centered
     at the origin.
 
@@ -596,6 +1135,10 @@ def normalize_scene() -> None:
     but fix for multiple root objects: (see bug report here:
     https://github.com/openai/shap-e/pull/60).
 
+    Args:
+        exact_bbox (bool, optional): Whether to fit the vertices instead of the
+            bound_box corners, see objects_bbox. Defaults to False.
+
     Returns:
         None
     """
@@ -609,17 +1152,20 @@ def normalize_scene() -> None:
             if obj != parent_empty:
                 obj.parent = parent_empty
 
-    bbox_min, bbox_max = scene_bbox()
+    bbox_min, bbox_max = scene_bbox(exact=exact_bbox)
     scale = 1 / max(bbox_max - bbox_min)
     for obj in get_scene_root_objects():
         obj.scale = obj.scale * scale
 
     # Apply scale to matrix_world.
     bpy.context.view_layer.update()
-    bbox_min, bbox_max = scene_bbox()
+    clear_scene_bbox_cache()
+    bbox_min, bbox_max = scene_bbox(exact=exact_bbox)
     offset = -(bbox_min + bbox_max) / 2
     for obj in get_scene_root_objects():
         obj.matrix_world.translation += offset
+    bpy.context.view_layer.update()
+    clear_scene_bbox_cache()
     bpy.ops.object.select_all(action="DESELECT")
 
     # unparent the camera
@@ -807,6 +1353,292 @@ def scene_fov():
     return x_fov, y_fov
 
 
+def apply_render_profile(
+    scene: bpy.types.Scene, profile: RenderProfile, engine: str, resolution: int
+) -> None:
+    """Applies the engine, resolution and sampling settings of a render profile.
+
+    Args:
+        scene (bpy.types.Scene): The scene to configure.
+        profile (RenderProfile): The render profile of the job.
+        engine (str): Engine to use if the profile does not set one.
+        resolution (int): Resolution to use if the profile does not set one.
+
+    Returns:
+        None
+    """
+    render = scene.render
+    render.engine = profile.engine or engine
+    render.resolution_x = profile.resolution or resolution
+    render.resolution_y = profile.resolution or resolution
+
+    scene.cycles.use_adaptive_sampling = profile.use_adaptive_sampling
+    scene.cycles.adaptive_threshold = profile.adaptive_threshold
+    scene.cycles.use_denoising = profile.use_denoising
+    if render.engine == "BLENDER_WORKBENCH":
+        scene.display.shading.light = "STUDIO"
+        scene.display.shading.color_type = "TEXTURE"
+        scene.display.render_aa = "FXAA" if profile.samples <= 1 else "8"
+    set_render_samples(scene, profile.samples)
+
+
+def set_render_samples(scene: bpy.types.Scene, samples: int) -> None:
+    """Sets the number of samples per view for the Cycles and EEVEE engines."""
+    scene.cycles.samples = samples
+    scene.eevee.taa_render_samples = samples
+
+
+class RenderPasses:
+    """Writes the enabled render passes of every view with a compositor File
+    Output node, see render_scripts/aov_passes.py."""
+
+    def __init__(
+        self, scene: bpy.types.Scene, passes: List[str], pass_format: str, output_dir: str
+    ) -> None:
+        """Enables the passes on the view layer and builds the compositor nodes.
+
+        Args:
+            scene (bpy.types.Scene): The scene to render.
+            passes (List[str]): Passes supported by the render engine.
+            pass_format (str): "exr" or "png16".
+            output_dir (str): Directory the pass files are written to.
+        """
+        self.scene = scene
+        self.passes = passes
+        self.pass_format = pass_format
+        self.output_dir = output_dir
+        self.stats = PassStats(passes, pass_format)
+
+        view_layer = scene.view_layers[0]
+        for name in passes:
+            setattr(view_layer, PASS_SOCKETS[name][0], True)
+
+        scene.use_nodes = True
+        tree = scene.node_tree
+        for node in [node for node in tree.nodes if node.name.startswith("pass_")]:
+            tree.nodes.remove(node)
+        render_layers = next((node for node in tree.nodes if node.type == "R_LAYERS"), None)
+        if render_layers is None:
+            render_layers = tree.nodes.new("CompositorNodeRLayers")
+        if not any(node.type == "COMPOSITE" for node in tree.nodes):
+            composite = tree.nodes.new("CompositorNodeComposite")
+            tree.links.new(render_layers.outputs["Image"], composite.inputs["Image"])
+
+        self.file_output = tree.nodes.new("CompositorNodeOutputFile")
+        self.file_output.name = "pass_output"
+        self.file_output.base_path = output_dir
+        self.file_output.file_slots.clear()
+        for name in passes:
+            slot = self.file_output.file_slots.new(name)
+            slot.use_node_format = False
+            image_format = slot.format
+            if pass_format == "exr":
+                image_format.file_format = "OPEN_EXR"
+                image_format.exr_codec = "ZIP"
+            else:
+                image_format.file_format = "PNG"
+                image_format.compression = 15
+            image_format.color_depth = "16"
+            image_format.color_mode = "RGB" if name == "normal" else "BW"
+            socket = render_layers.outputs[PASS_SOCKETS[name][1]]
+            if pass_format == "png16":
+                socket = self._encode(tree, name, socket)
+            tree.links.new(socket, self.file_output.inputs[name])
+
+    @staticmethod
+    def _encode(tree: bpy.types.NodeTree, name: str, socket: bpy.types.NodeSocket) -> bpy.types.NodeSocket:
+        """Adds the nodes mapping a pass to [0, 1] for PNG, returns their output."""
+        encoding = PNG_ENCODING[name]
+        if name != "normal":
+            # (value + offset) * size, clamped to [0, 1]
+            map_value = tree.nodes.new("CompositorNodeMapValue")
+            map_value.name = f"pass_{name}_map"
+            map_value.offset = [-encoding["offset"]]
+            map_value.size = [encoding["scale"]]
+            map_value.use_min = map_value.use_max = True
+            map_value.min = [0.0]
+            map_value.max = [1.0]
+            tree.links.new(socket, map_value.inputs[0])
+            return map_value.outputs[0]
+        output = socket
+        for blend_type, value in (("ADD", -encoding["offset"]), ("MULTIPLY", encoding["scale"])):
+            mix = tree.nodes.new("CompositorNodeMixRGB")
+            mix.name = f"pass_{name}_{blend_type.lower()}"
+            mix.blend_type = blend_type
+            mix.inputs[0].default_value = 1.0
+            mix.inputs[2].default_value = (value, value, value, 1.0)
+            tree.links.new(output, mix.inputs[1])
+            output = mix.outputs[0]
+        return output
+
+    def prepare(self, view_name: str) -> None:
+        """Points the File Output slots to the files of the next view."""
+        for slot, name in zip(self.file_output.file_slots, self.passes):
+            # the File Output node always appends the frame number
+            slot.path = f"{view_name}_{name}_####"
+
+    def collect(self, view_name: str) -> Dict[str, str]:
+        """Renames the pass files of the rendered view to their final names.
+
+        Returns:
+            Dict[str, str]: Paths of the pass files keyed by extension, e.g.
+            {"depth.exr": ".../multi_frame3_depth.exr"}, for the render output.
+        """
+        start = time.perf_counter()
+        frame = self.scene.frame_current
+        paths = {}
+        for name in self.passes:
+            path = pass_path(self.output_dir, view_name, name, self.pass_format)
+            base, extension = os.path.splitext(path)
+            written_path = f"{base}_{frame:04d}{extension}"
+            if not os.path.exists(written_path):
+                print(f"Render pass {name} of {view_name} was not written")
+                continue
+            os.replace(written_path, path)
+            self.stats.add(name, path)
+            paths[f"{name}{extension}"] = path
+        self.stats.seconds += time.perf_counter() - start
+        return paths
+
+
+def render_view(
+    scene: bpy.types.Scene,
+    render_path: str,
+    budget: RenderBudget,
+    passes: Optional[RenderPasses] = None,
+) -> None:
+    """Renders the current view to render_path within the time budget of the scene.
+
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        render_path (str): Path of the output image.
+        budget (RenderBudget): Budget that caps the samples and records the cost.
+        passes (Optional[RenderPasses], optional): Render passes written by the
+            same render. Defaults to None.
+
+    Returns:
+        None
+    """
+    samples = budget.next_samples()
+    set_render_samples(scene, samples)
+    scene.render.filepath = render_path
+    view = os.path.splitext(os.path.basename(render_path))[0]
+    view_settings = scene.view_settings
+    view_transform, look = view_settings.view_transform, view_settings.look
+    if passes is not None:
+        passes.prepare(view)
+        if passes.pass_format == "png16":
+            # the File Output node writes PNG through the view transform, the data
+            # passes must not be tone mapped
+            view_settings.view_transform, view_settings.look = "Raw", "None"
+    with span("render", view=view, samples=samples):
+        start = time.perf_counter()
+        try:
+            bpy.ops.render.render()
+        finally:
+            # the image is saved below through the original view transform
+            view_settings.view_transform, view_settings.look = view_transform, look
+        budget.record(time.perf_counter() - start, samples)
+    with span("write_png", view=view):
+        bpy.data.images["Render Result"].save_render(filepath=render_path)
+
+
+def save_view(
+    scene: bpy.types.Scene,
+    output_dir: str,
+    view_name: str,
+    camera_name: str,
+    budget: RenderBudget,
+    output,
+    passes: Optional[RenderPasses] = None,
+) -> None:
+    """Renders the current view and saves the image with its camera metadata.
+
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        output_dir (str): Directory the image and camera json are written to.
+        view_name (str): Name of the image without extension, e.g. "multi_frame3".
+        camera_name (str): Name of the camera json without extension, e.g. "multi3".
+        budget (RenderBudget): Budget that caps the samples and records the cost.
+        output: Output backend from create_render_output, receives both files.
+        passes (Optional[RenderPasses], optional): Render passes of the view, added
+            to the output with the image. Defaults to None.
+
+    Returns:
+        None
+    """
+    render_path = os.path.join(output_dir, f"{view_name}.png")
+    print("render_path: ", render_path)
+    render_view(scene, render_path, budget, passes)
+    camera_path = os.path.join(output_dir, f"{camera_name}.json")
+    with span("write_outputs", view=view_name):
+        write_camera_metadata(camera_path)
+        paths = {"png": render_path, "json": camera_path}
+        if passes is not None:
+            paths.update(passes.collect(view_name))
+        output.add_view(view_name, paths)
+
+
+def set_scene_frame(scene: bpy.types.Scene, frame: int, animated: bool, savings: RenderSavings) -> None:
+    """Sets the frame of an animated scene, a static scene looks the same at every
+    frame and skips the depsgraph evaluation."""
+    if animated:
+        scene.frame_set(frame)
+        # armatures and shape keys move the vertices of the new frame
+        clear_scene_bbox_cache()
+    else:
+        savings.frame_skipped()
+
+
+def link_view(
+    output_dir: str,
+    view_name: str,
+    camera_name: str,
+    source_view: str,
+    source_camera: str,
+    output,
+    passes: Optional[RenderPasses] = None,
+) -> None:
+    """Saves a view that is identical to an already rendered one without rendering.
+
+    Loose files are hard links to the files of the source view (copies if the
+    file system has no hard links), see render_scripts/view_plan.py. The files
+    of tar shards are not duplicated, the render cost record maps the view to
+    its source.
+
+    Args:
+        output_dir (str): Directory of the images and camera json.
+        view_name (str): Name of the image without extension.
+        camera_name (str): Name of the camera json without extension.
+        source_view (str): Name of the rendered image without extension.
+        source_camera (str): Name of the camera json of the rendered view.
+        output: Output backend from create_render_output.
+        passes (Optional[RenderPasses], optional): Render passes of the views.
+            Defaults to None.
+
+    Returns:
+        None
+    """
+    if not isinstance(output, LooseFileOutput):
+        return
+    pairs = view_file_pairs(
+        view_name, camera_name, source_view, source_camera,
+        passes.passes if passes is not None else (),
+        passes.pass_format if passes is not None else None,
+    )
+    link_view_files(output_dir, pairs)
+
+
+def scene_key(objects_paths: str) -> str:
+    """Returns the uid of a single object, or a key derived from the first uid of a
+    group scene."""
+    objects_path_list = objects_paths.split(',')
+    uid = os.path.splitext(os.path.basename(objects_path_list[0]))[0]
+    if len(objects_path_list) == 1:
+        return uid
+    return f"{uid}_x{len(objects_path_list)}"
+
+
 def render_scene(
     objects_paths: str,
     scene,
@@ -816,6 +1648,8 @@ def render_scene(
     output_dir: str,
     elevation:int,
     azimuth:float,
+    profile: RenderProfile,
+    task_key: str,
 ) -> None:
     """Saves rendered images with its camera matrix and metadata of the object.
 
@@ -828,6 +1662,10 @@ def render_scene(
             holes.
         output_dir (str): Path to the directory where the rendered images and metadata
             will be saved.
+        profile (RenderProfile): Render profile of the job, its time budget caps the
+            samples of every view.
+        task_key (str): Key of the render job, used to name the render cost record
+            and the tar shards.
 
     Returns:
         None
@@ -838,7 +1676,21 @@ def render_scene(
     reset_scene()
     # reset_cameras()
     # delete_invisible_objects()
-    load_objects(objects_paths)
+    with span("import", num_objects=len(objects_paths.split(','))):
+        pass_indices = load_objects(objects_paths, args.layout)
+    if profiling_enabled():
+        with span("object_stats_collect"):
+            stats_extractor = MetadataExtractor(
+                object_path=objects_paths.split(',')[0], scene=scene, bdata=bpy.data
+            )
+            object_stats = dict(
+                poly_count=stats_extractor.get_poly_count(),
+                vert_count=stats_extractor.get_vertex_count(),
+                mesh_count=stats_extractor.get_mesh_count(),
+                texture_bytes=stats_extractor.get_texture_bytes(),
+                file_bytes=sum(os.path.getsize(path) for path in objects_paths.split(',')),
+            )
+        record("object_stats", **object_stats)
 
     # Set up cameras
     # cam = scene.objects["Camera"]
@@ -853,13 +1705,19 @@ def render_scene(
     # scene.collection.objects.link(empty)
     # cam_constraint.target = empty
 
+    output = create_render_output(
+        args.output_format, output_dir, task_key, args.shard_max_bytes
+    )
+
     # Extract the metadata. This must be done before normalizing the scene to get
     # accurate bounding box information.
     for obj_path in objects_paths.split(','):
-        metadata_extractor = MetadataExtractor(
-            object_path=obj_path, scene=scene, bdata=bpy.data
-        )
-        metadata = metadata_extractor.get_metadata()
+        uid = os.path.splitext(os.path.basename(obj_path))[0]
+        with span("metadata", uid=uid):
+            metadata_extractor = MetadataExtractor(
+                object_path=obj_path, scene=scene, bdata=bpy.data
+            )
+            metadata = metadata_extractor.get_metadata()
         #print(metadata)
 
         # delete all objects that are not meshes
@@ -867,7 +1725,8 @@ def render_scene(
             # don't delete missing textures on usdz files, lots of them are embedded
             missing_textures = None
         else:
-            missing_textures = delete_missing_textures()
+            with span("delete_missing_textures", uid=uid):
+                missing_textures = delete_missing_textures()
         metadata["missing_textures"] = missing_textures
 
         # possibly apply a random color to all objects
@@ -877,6 +1736,7 @@ def render_scene(
             metadata["random_color"] = rand_color
         else:
             metadata["random_color"] = None
+        output.add_record(f"metadata_{uid}", "json", metadata)
     """
     # save metadata
     metadata_path = os.path.join(output_dir, "metadata.json")
@@ -885,11 +1745,24 @@ def render_scene(
         json.dump(metadata, f, sort_keys=True, indent=2)"""
 
     # normalize the scene
-    normalize_scene()
+    with span("normalize_scene"):
+        normalize_scene(exact_bbox=bool(args.exact_bbox))
     print("Scene normalized")
 
+    # decimated after normalizing, so the scene is framed like without budget
+    budget_stats = None
+    scene_budget = triangle_budget(args.max_triangles, args.max_scene_memory_mb)
+    if scene_budget is not None:
+        with span("triangle_budget"):
+            budget_stats = apply_triangle_budget(scene_budget)
+        record("triangle_budget", **budget_stats)
+        print(f"Triangle budget {scene_budget}: {budget_stats['source_triangles']} -> {budget_stats['triangles']} "
+              f"triangles, {budget_stats['decimated_meshes']} of {budget_stats['meshes']} meshes decimated "
+              f"in {budget_stats['decimate_seconds']:.2f}s")
+
     # randomize the lighting
-    randomize_lighting()
+    with span("randomize_lighting"):
+        randomize_lighting()
     print("light randomized")
     # camera = bpy.data.objects["Camera"]
     # camera.location = Vector((0.0, -4.0, 0.0))
@@ -905,7 +1778,22 @@ def render_scene(
     angle = azimuth * math.pi * 2
     direction = [math.sin(angle), math.cos(angle), 0]
     direction_az = Vector(direction).normalized()
-    
+
+    passes = None
+    if args.passes:
+        enabled, dropped = supported_passes(parse_passes(args.passes), scene.render.engine)
+        if dropped:
+            print(f"Warning: {scene.render.engine} does not render the passes {dropped}, skipped")
+        if enabled:
+            passes = RenderPasses(scene, enabled, args.pass_format, output_dir)
+
+    # the static views of a scene without animation are the multi views, which
+    # are rendered once and saved under both names
+    animated = scene_has_animation()
+    link_static_views = links_static_views(args, animated)
+    savings = RenderSavings()
+
+    budget = RenderBudget(profile, count_views(args, num_images, animated))
     print("starting render")
     for frame in range(num_images):
         if args.mode_multi:
@@ -920,12 +1808,8 @@ def render_scene(
                 elevation=elevation,
                 azimuth=azimuth
             )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"multi_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            print("render_path: ", render_path)
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"multi{frame}.json"))    
+            set_scene_frame(scene, frame, animated, savings)
+            save_view(scene, output_dir, f"multi_frame{frame}", f"multi{frame}", budget, output, passes)
     
 
         if args.mode_front:
@@ -937,12 +1821,10 @@ def render_scene(
                 Direction_type='az_front',
                 az_front_vector=direction_az
             )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"front_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            bpy.ops.render.render(write_still=True)
-            
-            write_camera_metadata(os.path.join(output_dir, f"front.json"))
+            set_scene_frame(scene, frame, animated, savings)
+            # the front view of mode_four_view has the same name
+            front_name = f"az_front_frame{frame}" if args.mode_four_view else f"front_frame{frame}"
+            save_view(scene, output_dir, front_name, "front", budget, output, passes)
         
         #print('args.mode_four_view:',args.mode_four_view)
         if args.mode_four_view:
@@ -954,11 +1836,8 @@ def render_scene(
                 camera_dist_max=camera_dist_max,
                 Direction_type='front'
                 )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"front_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"front.json"))
+            set_scene_frame(scene, frame, animated, savings)
+            save_view(scene, output_dir, f"front_frame{frame}", "front", budget, output, passes)
             
             place_camera(
                 0,
@@ -967,11 +1846,8 @@ def render_scene(
                 camera_dist_max=camera_dist_max,
                 Direction_type='back'
                 )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"back_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"back.json"))
+            set_scene_frame(scene, frame, animated, savings)
+            save_view(scene, output_dir, f"back_frame{frame}", "back", budget, output, passes)
             
             place_camera(
                 0,
@@ -980,11 +1856,8 @@ def render_scene(
                 camera_dist_max=camera_dist_max,
                 Direction_type='left'
                 )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"left_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"left.json"))
+            set_scene_frame(scene, frame, animated, savings)
+            save_view(scene, output_dir, f"left_frame{frame}", "left", budget, output, passes)
             
             place_camera(
                 0,
@@ -993,15 +1866,18 @@ def render_scene(
                 camera_dist_max=camera_dist_max,
                 Direction_type='right'
                 )
-            bpy.context.scene.frame_set(frame)
-            render_path = os.path.join(output_dir, f"right_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"right.json"))
+            set_scene_frame(scene, frame, animated, savings)
+            save_view(scene, output_dir, f"right_frame{frame}", "right", budget, output, passes)
     
     for frame in range(num_images):
         print(output_dir)
-        if  args.mode_static:
+        if args.mode_static and link_static_views:
+            link_view(
+                output_dir, f"multi_static_frame{frame}", f"static{frame}",
+                f"multi_frame{frame}", f"multi{frame}", output, passes,
+            )
+            savings.view_linked(f"multi_static_frame{frame}", f"multi_frame{frame}")
+        elif args.mode_static:
             t = frame / max(num_images - 1, 1)
             place_camera(
                 t,
@@ -1012,13 +1888,31 @@ def render_scene(
                 elevation=elevation,
                 azimuth=azimuth
             )
-            bpy.context.scene.frame_set(0)
-            render_path = os.path.join(output_dir, f"multi_static_frame{frame}.png")  #view and frame 
-            scene.render.filepath = render_path
-            print("render_path: ", render_path)
-            bpy.ops.render.render(write_still=True)
-            write_camera_metadata(os.path.join(output_dir, f"static{frame}.json"))   
-    
+            set_scene_frame(scene, 0, animated, savings)
+            save_view(scene, output_dir, f"multi_static_frame{frame}", f"static{frame}", budget, output, passes)
+
+    # save the cost of the render profile
+    render_cost = budget.summary()
+    render_cost["task_key"] = task_key
+    render_cost["objects_paths"] = objects_paths.split(',')
+    if passes is not None:
+        render_cost["passes"] = passes.stats.summary()
+        render_cost["passes"]["pass_indices"] = pass_indices
+    render_cost.update(savings.summary())
+    textures = texture_stats()
+    if textures:
+        render_cost["textures"] = textures
+    if budget_stats is not None:
+        render_cost["triangle_budget"] = budget_stats
+    if args.output_format == "files":
+        with open(os.path.join(output_dir, f"{task_key}_render_cost.json"), "w") as f:
+            json.dump(render_cost, f, indent=2)
+    output.add_record("render_cost", "json", render_cost)
+    output.close()
+    print(f"render cost: {render_cost['total_seconds']:.2f}s with profile {profile.name}")
+    if not animated:
+        print(f"static scene: {savings.renders_saved} renders saved, "
+              f"{savings.frame_sets_skipped} frame changes skipped")
 
 
 
@@ -1056,7 +1950,86 @@ def main():
         "--engine", 
         type=str, 
         default="CYCLES", 
-        choices=["CYCLES", "BLENDER_EEVEE"])
+        choices=["CYCLES", "BLENDER_EEVEE", "BLENDER_WORKBENCH"])
+    parser.add_argument( #--cycles_device
+        "--cycles_device",
+        type=str,
+        default="GPU",
+        choices=["GPU", "CPU"],
+        help="Device of Cycles, CPU renders without a GPU, e.g. for the benchmarks")
+    parser.add_argument( #--render_profile
+        "--render_profile",
+        type=str,
+        default="legacy",
+        help="Name of the render profile, see render_scripts/render_profiles.py")
+    parser.add_argument( #--task_key
+        "--task_key",
+        type=str,
+        default=None,
+        help="Key of the render job, defaults to the uid of the (first) object")
+    parser.add_argument( #--output_format
+        "--output_format",
+        type=str,
+        default="files",
+        choices=["files", "tar"],
+        help="Keep loose image and json files, or stream them into tar shards")
+    parser.add_argument( #--shard_max_bytes
+        "--shard_max_bytes",
+        type=int,
+        default=1 << 30,
+        help="Maximum size of a tar shard in bytes")
+    parser.add_argument( #--layout
+        "--layout",
+        type=str,
+        default="shelf",
+        choices=LAYOUTS,
+        help="Layout of the objects of a group scene")
+    parser.add_argument( #--exact_bbox
+        "--exact_bbox",
+        type=int,
+        default=0,
+        help="Normalize the scene with the vertex-exact bounding box instead of the bound_box corners")
+    parser.add_argument( #--timings_dir
+        "--timings_dir",
+        type=str,
+        default=None,
+        help="Directory to write the timing spans of the task to, as <task_key>.jsonl")
+    parser.add_argument( #--import_cache_dir
+        "--import_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the import cache, objects are converted to .blend once and appended afterwards")
+    parser.add_argument( #--texture_cache_dir
+        "--texture_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the texture cache, textures larger than --max_texture_size are replaced by downscaled copies")
+    parser.add_argument( #--max_texture_size
+        "--max_texture_size",
+        type=int,
+        default=0,
+        help="Largest texture side with --texture_cache_dir, 0 derives it from the render resolution")
+    parser.add_argument( #--max_triangles
+        "--max_triangles",
+        type=int,
+        default=0,
+        help="Triangle budget of the scene, larger scenes are decimated, 0 means no budget")
+    parser.add_argument( #--max_scene_memory_mb
+        "--max_scene_memory_mb",
+        type=float,
+        default=0,
+        help="Geometry memory budget of the scene in MB, converted to triangles, 0 means no budget")
+    parser.add_argument( #--passes
+        "--passes",
+        type=str,
+        default="",
+        help="Comma separated render passes written with every view: depth, normal, index")
+    parser.add_argument( #--pass_format
+        "--pass_format",
+        type=str,
+        default="exr",
+        choices=PASS_FORMATS,
+        help="Half float EXR or 16-bit PNG files for the render passes")
     parser.add_argument( #--num_images
         "--num_images",
         type=int, 
@@ -1121,27 +2094,33 @@ def main():
     render = scene.render
     
     # Set render settings
-    render.engine = args.engine
+    profile = get_render_profile(args.render_profile)
     render.image_settings.file_format = "PNG"
     render.image_settings.color_mode = "RGBA"
-    render.resolution_x = args.resolution
-    render.resolution_y = args.resolution
     render.resolution_percentage = 100
 
-    scene.cycles.device = "GPU"
-    scene.cycles.samples = 128
+    scene.cycles.device = args.cycles_device
     scene.cycles.diffuse_bounces = 1
     scene.cycles.glossy_bounces = 1
     scene.cycles.transparent_max_bounces = 3
     scene.cycles.transmission_bounces = 3
     scene.cycles.filter_width = 0.01
-    scene.cycles.use_denoising = True
     scene.render.film_transparent = True
+    apply_render_profile(scene, profile, args.engine, args.resolution)
     bpy.context.preferences.addons["cycles"].preferences.get_devices()
     bpy.context.preferences.addons[
         "cycles"
     ].preferences.compute_device_type = "CUDA"  # or "OPENCL"
 
+    task_key = args.task_key or scene_key(args.objects_paths)
+    configure_import_cache(args.import_cache_dir)
+    max_texture_size = args.max_texture_size or texture_size_for_resolution(
+        max(render.resolution_x, render.resolution_y)
+    )
+    configure_texture_cache(args.texture_cache_dir, max_texture_size)
+    if args.timings_dir:
+        configure_profiling(os.path.join(args.timings_dir, f"{task_key}.jsonl"), task_key)
+
     # print(f"starting render of: {objects_path_list}")
     render_scene(
         objects_paths=args.objects_paths,
@@ -1152,6 +2131,8 @@ def main():
         output_dir=args.output_dir,
         elevation=args.elevation/180,
         azimuth=args.azimuth,
+        profile=profile,
+        task_key=task_key,
     )
 
 
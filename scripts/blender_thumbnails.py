@@ -0,0 +1,89 @@
+"""Blender script to render one small preview image per object.
+
+Renders every object of --objects_paths in the same Blender process with the
+cheapest render profile (preview, Workbench at 128 px), reusing the scene
+reset, import, normalize_scene and lighting of blender_render.py, and saves
+`<output_dir>/<uid>.png`. The lighting is seeded by the uid, so the thumbnail
+of an object is reproducible. Objects that fail to load are reported and
+skipped. Run by thumbnails.py:
+
+    blender --background --python scripts/blender_thumbnails.py -- \
+        --objects_paths a.glb,b.glb --output_dir thumbs/
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+
+import bpy
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from blender_render import (apply_render_profile, load_objects, normalize_scene, pan_camera,
+                            randomize_lighting, reset_scene)
+from render_scripts.render_profiles import get_render_profile
+
+
+def render_thumbnail(object_path: str, output_path: str) -> None:
+    """Renders the thumbnail of one object to output_path."""
+    reset_scene()
+    load_objects(object_path)
+    normalize_scene()
+    uid = os.path.splitext(os.path.basename(object_path))[0]
+    random.seed(uid)
+    randomize_lighting()
+    # three-quarter view from slightly above
+    pan_camera(0.125, axis="Z", camera_dist=2.0, elevation=0.35)
+    bpy.context.scene.render.filepath = output_path
+    bpy.ops.render.render(write_still=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_paths
+        "--objects_paths",
+        type=str,
+        required=True,
+        help="Comma separated paths of the object files")
+    parser.add_argument( #--output_dir
+        "--output_dir",
+        type=str,
+        required=True,
+        help="Directory of the <uid>.png thumbnails")
+    parser.add_argument( #--render_profile
+        "--render_profile",
+        type=str,
+        default="preview",
+        help="Render profile, see render_scripts/render_profiles.py")
+    parser.add_argument( #--resolution
+        "--resolution",
+        type=int,
+        default=128,
+        help="Resolution if the profile does not set one")
+    argv = sys.argv[sys.argv.index("--") + 1 :]
+    args = parser.parse_args(argv)
+
+    scene = bpy.context.scene
+    scene.render.image_settings.file_format = "PNG"
+    scene.render.image_settings.color_mode = "RGBA"
+    scene.render.resolution_percentage = 100
+    scene.render.film_transparent = True
+    apply_render_profile(scene, get_render_profile(args.render_profile), "BLENDER_WORKBENCH", args.resolution)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for object_path in args.objects_paths.split(","):
+        uid = os.path.splitext(os.path.basename(object_path))[0]
+        start = time.perf_counter()
+        try:
+            render_thumbnail(object_path, os.path.join(args.output_dir, f"{uid}.png"))
+        except Exception:
+            print(f"Thumbnail of {uid} failed:\n{traceback.format_exc()}")
+            continue
+        print(f"Thumbnail of {uid} rendered in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
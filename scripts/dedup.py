@@ -0,0 +1,212 @@
+"""Near-duplicate geometry detection
+
+Finds re-uploads of the same mesh in the object database and writes a dedup
+map for download.py and render.py (--dedup_map), see
+render_scripts/geometry_fingerprint.py and render_scripts/dedup_map.py:
+    - fingerprint: computes the MinHash fingerprint of every object (or of the
+      uids of an id file) that changed since the last run. Objects whose file
+      has the same sha256 as an already fingerprinted one reuse its
+      fingerprint, the others are taken from the geometry shards of
+      similarity.py (--descriptor_dir) if they are newer than the object, and
+      only the rest is loaded by Blender (blender_geometry.py, whose shards
+      the similarity index reuses in turn),
+    - map: clusters the fingerprints with LSH and writes the dedup map,
+    - run: fingerprint, then map.
+The fingerprints are cached in --cache_path.
+
+Usage:
+    python3 scripts/dedup.py --objects_dir src/objects_database --dedup_map dedup_map.json run
+    python3 scripts/render.py --id_file_path src/ids/example_id.json --dedup_map dedup_map.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from render_scripts.geometry_fingerprint import NUM_PERM, dedup_map, duplicate_clusters
+from render_scripts.lod_cache import file_sha256
+from render_scripts.object_locator import ObjectLocator
+from similarity import run_geometry_batches, shard_paths
+from thumbnails import BLENDER_PATH, load_id_file_uids
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    uid TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    source_hash TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_hash ON fingerprints (source_hash);
+"""
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--cache_path
+        "--cache_path",
+        type=str,
+        default="fingerprints.sqlite",
+        help="SQLite file of the fingerprint cache")
+    parser.add_argument( #--descriptor_dir
+        "--descriptor_dir",
+        type=str,
+        default="descriptors/",
+        help="Directory of the geometry shards, shared with similarity.py")
+    parser.add_argument( #--dedup_map
+        "--dedup_map",
+        type=str,
+        default="dedup_map.json",
+        help="Path of the dedup map")
+    parser.add_argument( #--threshold
+        "--threshold",
+        type=float,
+        default=0.9,
+        help="Minimum estimated Jaccard similarity of the vertex grid cells of duplicates")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Only fingerprint the uids of this id file, defaults to all objects")
+    parser.add_argument( #--batch_size
+        "--batch_size",
+        type=int,
+        default=64,
+        help="Number of objects processed by one Blender process")
+    parser.add_argument( #--processes
+        "--processes",
+        type=int,
+        default=4,
+        help="Number of Blender processes")
+    parser.add_argument( #command
+        "command",
+        choices=["fingerprint", "map", "run"])
+    return parser.parse_args()
+
+
+def shard_signatures(descriptor_dir: str, uids: set) -> Dict[str, Tuple[np.ndarray, float]]:
+    """Returns the signature and shard mtime of the uids found in the geometry shards,
+    the newest shard wins."""
+    found = {}
+    for path in shard_paths(descriptor_dir):
+        mtime = os.path.getmtime(path)
+        with np.load(path) as data:
+            if "signatures" not in data.files:
+                continue
+            for uid, signature in zip(data["uids"].tolist(), data["signatures"]):
+                if uid in uids and (uid not in found or found[uid][1] <= mtime):
+                    found[uid] = (signature, mtime)
+    return found
+
+
+def fingerprint(args, connection: sqlite3.Connection, locator: ObjectLocator) -> None:
+    uids = load_id_file_uids(args.id_file_path) if args.id_file_path else sorted(locator.paths)
+    cached = {
+        uid: (size, mtime, source_hash)
+        for uid, size, mtime, source_hash in connection.execute("SELECT uid, size, mtime, source_hash FROM fingerprints")
+    }
+    by_hash = dict(connection.execute("SELECT source_hash, signature FROM fingerprints"))
+
+    # the uids whose file is new or changed
+    stale = {}
+    for uid in uids:
+        path = locator.find(uid)
+        if path is None:
+            continue
+        stat = os.stat(path)
+        if uid not in cached or cached[uid][:2] != (stat.st_size, stat.st_mtime):
+            stale[uid] = (path, stat)
+    print(f"{len(uids) - len(stale)} of {len(uids)} fingerprints are up to date, updating {len(stale)}")
+
+    rows, reused = [], 0
+    pending = {}
+    # identical new files are loaded once, the others copy the fingerprint
+    followers = []
+    pending_hashes = set()
+    for uid, (path, stat) in stale.items():
+        source_hash = file_sha256(path)
+        if source_hash in by_hash:
+            rows.append((uid, stat.st_size, stat.st_mtime, source_hash, by_hash[source_hash]))
+            reused += 1
+        elif source_hash in pending_hashes:
+            followers.append((uid, stat, source_hash))
+        else:
+            pending[uid] = (path, stat, source_hash)
+            pending_hashes.add(source_hash)
+
+    def take_from_shards() -> int:
+        taken = 0
+        for uid, (signature, shard_mtime) in shard_signatures(args.descriptor_dir, set(pending)).items():
+            path, stat, source_hash = pending[uid]
+            if shard_mtime >= stat.st_mtime:
+                by_hash[source_hash] = signature.astype(np.uint32).tobytes()
+                rows.append((uid, stat.st_size, stat.st_mtime, source_hash, by_hash[source_hash]))
+                del pending[uid]
+                taken += 1
+        return taken
+
+    from_shards = take_from_shards()
+    print(f"{reused} reused from identical files, {from_shards} from geometry shards, loading {len(pending)} in Blender")
+    computed = 0
+    if pending:
+        run_geometry_batches(args, [path for path, _, _ in pending.values()])
+        computed = take_from_shards()
+    for uid, stat, source_hash in followers:
+        if source_hash in by_hash:
+            rows.append((uid, stat.st_size, stat.st_mtime, source_hash, by_hash[source_hash]))
+            reused += 1
+
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO fingerprints (uid, size, mtime, source_hash, signature) VALUES (?, ?, ?, ?, ?)", rows
+        )
+    print(f"{computed} fingerprints computed, {reused} reused from identical files in total, "
+          f"{len(stale) - len(rows)} objects failed")
+
+
+def write_dedup_map(args, connection: sqlite3.Connection) -> None:
+    start = time.perf_counter()
+    uids, signatures = [], []
+    for uid, signature in connection.execute("SELECT uid, signature FROM fingerprints ORDER BY uid"):
+        uids.append(uid)
+        signatures.append(np.frombuffer(signature, dtype=np.uint32))
+    signatures = np.array(signatures, dtype=np.uint32).reshape(len(uids), NUM_PERM)
+    clusters = duplicate_clusters(uids, signatures, args.threshold)
+    duplicates = dedup_map(clusters)
+
+    tmp_path = f"{args.dedup_map}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"threshold": args.threshold, "objects": len(uids), "clusters": clusters, "duplicates": duplicates}, f)
+    os.replace(tmp_path, args.dedup_map)
+    print(f"{len(duplicates)} duplicates of {len(uids)} objects in {len(clusters)} clusters, "
+          f"found in {time.perf_counter() - start:.1f}s, written to {args.dedup_map}")
+
+
+def main():
+    args = parse_arguments()
+    connection = sqlite3.connect(args.cache_path, timeout=60.0)
+    connection.executescript(SCHEMA)
+    if args.command in ("fingerprint", "run"):
+        fingerprint(args, connection, ObjectLocator(args.objects_dir))
+    if args.command in ("map", "run"):
+        write_dedup_map(args, connection)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,9 @@ For each group of object IDs:
 Parameters:
     --id_file_path: Path to a JSON file containing grouped object IDs.
     --save_path: Directory where downloaded objects will be saved. If not provided, defaults to a path derived from --id_file_path.
+    --dedup_map: Dedup map of dedup.py, duplicates of an object are replaced by the object kept for them.
+    --metrics_port: Serve the progress metrics for Prometheus at http://<host>:<port>/metrics.
+    --metrics_textfile: Rewrite the progress metrics to this .prom file for node_exporter.
 
 Expected Structure of id_file_path JSON:
     The JSON file should be structured with each group containing:
@@ -30,6 +33,10 @@ import multiprocessing
 import os
 import json
 import argparse
+import time
+
+from render_scripts.dedup_map import apply_dedup_map, load_dedup_map
+from render_scripts.metrics import RunMetrics, export_metrics
 
 def search_in_database(folder: str, uids):
     filepaths = []
@@ -70,6 +77,9 @@ parser = argparse.ArgumentParser()
 parser.add_argument("--id_file_path", type=str, required=True)
 parser.add_argument("--save_path", type=str)
 parser.add_argument("--store_in_save_path",type=int, default=0)
+parser.add_argument("--dedup_map", type=str, default=None)
+parser.add_argument("--metrics_port", type=int, default=None)
+parser.add_argument("--metrics_textfile", type=str, default=None)
 args = parser.parse_args()
 
 # Set default for save_path if not provided
@@ -85,9 +95,20 @@ print(objaverse.__version__)
 with open(args.id_file_path, "r") as json_file:
     grouped_ids = json.load(json_file)
 
+duplicates = load_dedup_map(args.dedup_map) if args.dedup_map else {}
+
+metrics = RunMetrics("download", sum(len(ids[1]) for ids in grouped_ids.values()))
+exporter = export_metrics(metrics, args.metrics_port, args.metrics_textfile)
+
 # Process each group of IDs
 for group, ids in grouped_ids.items():
+    group_start = time.perf_counter()
     uids = ids[1]  # Extract list of object UIDs for this group
+    if duplicates:
+        uids, replaced = apply_dedup_map(uids, duplicates, int(ids[0]))
+        if replaced:
+            print(f"Replaced {replaced} duplicate objects in group '{group}', {len(ids[1]) - len(uids)} skipped")
+        metrics.set_total(metrics.total - (len(ids[1]) - len(uids)))
 
     # storing glbs in database
     if not int(args.store_in_save_path):
@@ -124,8 +145,17 @@ for group, ids in grouped_ids.items():
             download_processes=multiprocessing_cpu_count
         )
 
+    # objects objaverse could not download are still missing
+    if ids_to_download:
+        _, ids_to_download = search_in_database(final_save_path, uids)
+    group_seconds = time.perf_counter() - group_start
+    metrics.task_done(group_seconds, completed=len(uids) - len(ids_to_download), failed=len(ids_to_download))
+    metrics.observe("download_group", group_seconds)
+
     # write_to_file
     write_group_to_json(group, filepaths, ids[0])
     
+if exporter is not None:
+    exporter.close()
 
 print('Download finished.')
\ No newline at end of file
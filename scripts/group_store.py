@@ -0,0 +1,346 @@
+"""Persistent object groups that are exported as id files.
+
+The groups of the UI are kept in a SQLite file. Every add and remove is also
+appended to a change log, so export() writes two id files in the
+`{group: [separate_flag, [uids]]}` format of download.py and render.py:
+    - the full id file with all groups,
+    - a changes id file with only what changed since the previous export to the
+      same path: the added uids of separate groups, and the whole group of the
+      group scenes (separate flag 0) that gained or lost objects, as their scene
+      has to be rendered again. A run over the changes id file only downloads
+      and renders the changes.
+The removed uids are listed in the summary returned by export().
+
+Every change runs in its own BEGIN IMMEDIATE transaction, so the CLI and
+ui_backend.py can use the same file.
+
+Usage:
+    python3 scripts/group_store.py --groups_path groups.sqlite --group chairs --uids uid1,uid2 add
+    python3 scripts/group_store.py --groups_path groups.sqlite --output src/ids/groups.json export
+    python3 scripts/download.py --id_file_path src/ids/groups_changes.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Iterable, List, Optional
+
+from render_scripts.shared_sqlite import connect_shared
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    name TEXT PRIMARY KEY,
+    separate INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    group_name TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    added REAL NOT NULL,
+    PRIMARY KEY (group_name, uid)
+);
+CREATE INDEX IF NOT EXISTS members_uid ON members (uid);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_name TEXT NOT NULL,
+    uid TEXT,
+    action TEXT NOT NULL,
+    time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exports (
+    path TEXT PRIMARY KEY,
+    last_change INTEGER NOT NULL,
+    time REAL NOT NULL
+);
+"""
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Writes json to a temporary file and renames it, readers never see a partial file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def changes_path_for(path: str) -> str:
+    """Returns the default path of the changes id file of an export, <name>_changes.json."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_changes{ext or '.json'}"
+
+
+class GroupStore:
+    """Object groups backed by a SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        """Initializes the GroupStore, creating the database if needed.
+
+        Args:
+            path (str): Path of the SQLite file.
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = connect_shared(path, SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Generator[sqlite3.Connection, None, None]:
+        """Runs the enclosed block in a BEGIN IMMEDIATE transaction."""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def _log(self, connection: sqlite3.Connection, group: str, uids: Iterable[Optional[str]], action: str) -> None:
+        now = time.time()
+        connection.executemany(
+            "INSERT INTO changes (group_name, uid, action, time) VALUES (?, ?, ?, ?)",
+            [(group, uid, action, now) for uid in uids],
+        )
+
+    def _require_group(self, connection: sqlite3.Connection, group: str) -> None:
+        if connection.execute("SELECT 1 FROM groups WHERE name = ?", (group,)).fetchone() is None:
+            raise KeyError(f"Unknown group '{group}'")
+
+    def create_group(self, group: str, separate: bool = False) -> bool:
+        """Creates an empty group, returns False if it already exists.
+
+        Args:
+            group (str): Name of the group.
+            separate (bool, optional): Whether its objects are rendered separately
+                (flag 1) or together in one scene (flag 0). Defaults to False.
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO groups (name, separate, created) VALUES (?, ?, ?)",
+                (group, int(separate), time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def delete_group(self, group: str) -> List[str]:
+        """Deletes a group, returns its uids.
+
+        Raises:
+            KeyError: If the group does not exist.
+        """
+        with self._transaction() as connection:
+            self._require_group(connection, group)
+            uids = [row[0] for row in connection.execute(
+                "SELECT uid FROM members WHERE group_name = ? ORDER BY added, uid", (group,)
+            )]
+            connection.execute("DELETE FROM members WHERE group_name = ?", (group,))
+            connection.execute("DELETE FROM groups WHERE name = ?", (group,))
+            self._log(connection, group, uids, "remove")
+        return uids
+
+    def add(self, group: str, uids: Iterable[str]) -> List[str]:
+        """Adds objects to a group, returns the uids that were not members yet.
+
+        Raises:
+            KeyError: If the group does not exist.
+        """
+        added = []
+        now = time.time()
+        with self._transaction() as connection:
+            self._require_group(connection, group)
+            for uid in uids:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO members (group_name, uid, added) VALUES (?, ?, ?)", (group, uid, now)
+                )
+                if cursor.rowcount == 1:
+                    added.append(uid)
+            self._log(connection, group, added, "add")
+        return added
+
+    def remove(self, group: str, uids: Iterable[str]) -> List[str]:
+        """Removes objects from a group, returns the uids that were members.
+
+        Raises:
+            KeyError: If the group does not exist.
+        """
+        removed = []
+        with self._transaction() as connection:
+            self._require_group(connection, group)
+            for uid in uids:
+                cursor = connection.execute("DELETE FROM members WHERE group_name = ? AND uid = ?", (group, uid))
+                if cursor.rowcount == 1:
+                    removed.append(uid)
+            self._log(connection, group, removed, "remove")
+        return removed
+
+    def groups(self) -> Dict[str, list]:
+        """Returns all groups in the id file format, {group: [separate_flag, [uids]]}."""
+        with self.lock:
+            result = {
+                name: [separate, []]
+                for name, separate in self.connection.execute("SELECT name, separate FROM groups ORDER BY created, name")
+            }
+            for group, uid in self.connection.execute("SELECT group_name, uid FROM members ORDER BY added, uid"):
+                result[group][1].append(uid)
+        return result
+
+    def membership(self, uid: str) -> List[str]:
+        """Returns the groups of an object."""
+        with self.lock:
+            return [row[0] for row in self.connection.execute(
+                "SELECT group_name FROM members WHERE uid = ? ORDER BY group_name", (uid,)
+            )]
+
+    def export(self, path: str, changes_path: Optional[str] = None) -> Dict[str, Any]:
+        """Writes the id file of all groups and the id file of the changes since the
+        previous export to the same path.
+
+        Args:
+            path (str): Path of the full id file.
+            changes_path (Optional[str], optional): Path of the changes id file.
+                Defaults to None, <name>_changes.json next to path.
+
+        Returns:
+            Dict[str, Any]: The paths, the number of changed groups and the added
+            and removed uids per group.
+        """
+        changes_path = changes_path or changes_path_for(path)
+        key = os.path.abspath(path)
+        with self._transaction() as connection:
+            row = connection.execute("SELECT last_change FROM exports WHERE path = ?", (key,)).fetchone()
+            since = row[0] if row is not None else 0
+            last_change = connection.execute("SELECT COALESCE(MAX(id), 0) FROM changes").fetchone()[0]
+            added: Dict[str, List[str]] = {}
+            removed: Dict[str, List[str]] = {}
+            # replay the log, an object added and removed again is no change
+            for group, uid, action in connection.execute(
+                "SELECT group_name, uid, action FROM changes WHERE id > ? AND id <= ? ORDER BY id", (since, last_change)
+            ):
+                if action == "add":
+                    if uid in removed.get(group, []):
+                        removed[group].remove(uid)
+                    else:
+                        added.setdefault(group, []).append(uid)
+                else:
+                    if uid in added.get(group, []):
+                        added[group].remove(uid)
+                    else:
+                        removed.setdefault(group, []).append(uid)
+            groups = self.groups()
+            changed = {}
+            for group, (separate, uids) in groups.items():
+                if separate and added.get(group):
+                    changed[group] = [separate, added[group]]
+                elif not separate and (added.get(group) or removed.get(group)) and uids:
+                    changed[group] = [separate, uids]
+            # the files are written before the export is recorded, if a write fails
+            # the transaction rolls back and the next export still has the changes
+            write_json_atomic(path, groups)
+            write_json_atomic(changes_path, changed)
+            connection.execute(
+                "INSERT OR REPLACE INTO exports (path, last_change, time) VALUES (?, ?, ?)", (key, last_change, time.time())
+            )
+        return {
+            "id_file_path": path,
+            "changes_path": changes_path,
+            "groups": len(groups),
+            "changed_groups": len(changed),
+            "added": {group: uids for group, uids in added.items() if uids},
+            "removed": {group: uids for group, uids in removed.items() if uids},
+        }
+
+    def import_id_file(self, id_file_path: str) -> int:
+        """Adds the groups of an id file, returns the number of added uids."""
+        with open(id_file_path, "r") as f:
+            id_groups = json.load(f)
+        count = 0
+        for group, (separate, uids) in id_groups.items():
+            self.create_group(group, bool(int(separate)))
+            count += len(self.add(group, uids))
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the object groups and export them as id files.")
+    parser.add_argument( #--groups_path
+        "--groups_path",
+        type=str,
+        required=True,
+        help="Path of the SQLite groups file")
+    parser.add_argument( #--group
+        "--group",
+        type=str,
+        default=None,
+        help="Name of the group")
+    parser.add_argument( #--uids
+        "--uids",
+        type=str,
+        default="",
+        help="Comma separated uids to add, remove, or look up")
+    parser.add_argument( #--separate
+        "--separate",
+        type=int,
+        default=0,
+        help="Separate flag of a new group, 1 renders its objects separately")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Id file to import")
+    parser.add_argument( #--output
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the exported id file")
+    parser.add_argument( #--changes_path
+        "--changes_path",
+        type=str,
+        default=None,
+        help="Path of the exported changes id file, defaults to <output>_changes.json")
+    parser.add_argument( #command
+        "command",
+        choices=["list", "create", "delete", "add", "remove", "membership", "import", "export"],
+        help="list: print the groups, create/delete: a group, add/remove: --uids of --group,"
+             " membership: the groups of --uids, import: the groups of --id_file_path,"
+             " export: write the id file and the changes id file")
+    args = parser.parse_args()
+    uids = [uid for uid in args.uids.split(",") if uid]
+
+    store = GroupStore(args.groups_path)
+    if args.command in ("create", "delete", "add", "remove") and args.group is None:
+        parser.error(f"{args.command} needs --group")
+    if args.command == "list":
+        for group, (separate, members) in store.groups().items():
+            print(f"{group}: {len(members)} objects, separate={separate}")
+    elif args.command == "create":
+        if not store.create_group(args.group, bool(args.separate)):
+            print(f"Group {args.group} already exists")
+    elif args.command == "delete":
+        print(f"Deleted {args.group} with {len(store.delete_group(args.group))} objects")
+    elif args.command == "add":
+        store.create_group(args.group, bool(args.separate))
+        print(f"Added {len(store.add(args.group, uids))} objects to {args.group}")
+    elif args.command == "remove":
+        print(f"Removed {len(store.remove(args.group, uids))} objects from {args.group}")
+    elif args.command == "membership":
+        for uid in uids:
+            print(f"{uid}: {', '.join(store.membership(uid))}")
+    elif args.command == "import":
+        if args.id_file_path is None:
+            parser.error("import needs --id_file_path")
+        print(f"Imported {store.import_id_file(args.id_file_path)} objects")
+    else:
+        if args.output is None:
+            parser.error("export needs --output")
+        print(json.dumps(store.export(args.output, args.changes_path), indent=2))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Load test of the model endpoint of ui_backend.py
+
+Downloads the models of random uids from several threads, either whole or as
+a stream of Range requests, and prints the throughput, the latency
+percentiles and, with --server_pid, the resident memory of the backend
+sampled during the test (read from /proc, so the backend must run on this
+machine).
+
+Usage:
+    python3 scripts/ui_backend.py --metadata_dir metadata/ --objects_dir src/objects_database &
+    python3 scripts/load_test_models.py --url http://127.0.0.1:8080 --threads 64 --server_pid $!
+"""
+
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+from load_test_ui_backend import percentile
+from render_scripts.object_locator import ObjectLocator
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--url
+        "--url",
+        type=str,
+        default="http://127.0.0.1:8080",
+        help="Address of the backend")
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="The --objects_dir of the backend, the uids are picked from it")
+    parser.add_argument( #--threads
+        "--threads",
+        type=int,
+        default=32,
+        help="Number of concurrent clients")
+    parser.add_argument( #--requests
+        "--requests",
+        type=int,
+        default=256,
+        help="Total number of model downloads")
+    parser.add_argument( #--range_size
+        "--range_size",
+        type=int,
+        default=0,
+        help="Download the models in Range requests of this many bytes, 0 downloads them whole")
+    parser.add_argument( #--lod
+        "--lod",
+        type=str,
+        default="full",
+        choices=["preview", "full"],
+        help="Level of detail to download")
+    parser.add_argument( #--server_pid
+        "--server_pid",
+        type=int,
+        default=None,
+        help="Process id of the backend, to sample its memory")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0)
+    return parser.parse_args()
+
+
+def read_proc_status_kb(pid: int, field: str) -> Optional[int]:
+    """Returns a kB field of /proc/<pid>/status, e.g. VmRSS or VmHWM."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def download(url: str, range_size: int) -> int:
+    """Downloads a model, returns the number of bytes received."""
+    if range_size <= 0:
+        with urllib.request.urlopen(url) as response:
+            return len(response.read())
+    received, size = 0, None
+    while size is None or received < size:
+        request = urllib.request.Request(url, headers={"Range": f"bytes={received}-{received + range_size - 1}"})
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            content_range = response.headers.get("Content-Range")
+        size = int(content_range.rsplit("/", 1)[1]) if content_range else len(body)
+        received += len(body)
+        if not body:
+            break
+    return received
+
+
+def client(args, uids: List[str], count: int, seed: int, latencies: List[float], received: List[int], errors: List[str]) -> None:
+    rng = random.Random(seed)
+    for _ in range(count):
+        url = f"{args.url}/models/{rng.choice(uids)}?lod={args.lod}"
+        start = time.perf_counter()
+        try:
+            received.append(download(url, args.range_size))
+        except (urllib.error.URLError, OSError) as error:
+            errors.append(str(error))
+        latencies.append(time.perf_counter() - start)
+
+
+def sample_memory(pid: int, stop: threading.Event, samples: List[int]) -> None:
+    while not stop.wait(0.05):
+        rss = read_proc_status_kb(pid, "VmRSS")
+        if rss is not None:
+            samples.append(rss)
+
+
+def main():
+    args = parse_arguments()
+    uids = sorted(ObjectLocator(args.objects_dir).paths)
+    if not uids:
+        raise SystemExit(f"No objects in {args.objects_dir}")
+
+    latencies: List[float] = []
+    received: List[int] = []
+    errors: List[str] = []
+    rss_samples: List[int] = []
+    stop = threading.Event()
+    sampler = None
+    if args.server_pid is not None:
+        rss_before = read_proc_status_kb(args.server_pid, "VmRSS")
+        sampler = threading.Thread(target=sample_memory, args=(args.server_pid, stop, rss_samples))
+        sampler.start()
+
+    per_thread = args.requests // args.threads
+    threads = [
+        threading.Thread(target=client, args=(args, uids, per_thread, args.seed + i, latencies, received, errors))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    total = sum(received)
+    latencies.sort()
+    print(f"{len(received)} models, {total / 2**20:.1f} MB in {elapsed:.2f}s: "
+          f"{total / 2**20 / elapsed:.1f} MB/s, {len(errors)} errors")
+    for q in (50, 90, 99):
+        print(f"p{q}: {percentile(latencies, q) * 1000:.1f} ms")
+    if sampler is not None:
+        sampler.join()
+        print(f"backend RSS: {rss_before / 1024:.1f} MB before, peak {max(rss_samples, default=0) / 1024:.1f} MB "
+              f"during the test, high water mark {read_proc_status_kb(args.server_pid, 'VmHWM') / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Load test of ui_backend.py
+
+Sends random listing requests (range filters, sorting, following cursors)
+from several threads and prints the latency percentiles and throughput.
+
+Usage:
+    python3 scripts/ui_backend.py --metadata_dir metadata/ --port 8080 &
+    python3 scripts/load_test_ui_backend.py --url http://127.0.0.1:8080 --threads 16 --requests 2000
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from typing import List
+from urllib.parse import urlencode
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--url
+        "--url",
+        type=str,
+        default="http://127.0.0.1:8080",
+        help="Address of the backend")
+    parser.add_argument( #--threads
+        "--threads",
+        type=int,
+        default=16,
+        help="Number of concurrent clients")
+    parser.add_argument( #--requests
+        "--requests",
+        type=int,
+        default=2000,
+        help="Total number of requests")
+    parser.add_argument( #--pages
+        "--pages",
+        type=int,
+        default=3,
+        help="Number of pages every listing follows with its cursor")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0)
+    return parser.parse_args()
+
+
+def get(url: str) -> dict:
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def random_query(columns: dict, rng: random.Random) -> dict:
+    """Returns the parameters of a listing with up to two random range filters."""
+    filters = []
+    for name in rng.sample(sorted(columns), k=rng.randint(0, 2)):
+        low, high = columns[name]["min"], columns[name]["max"]
+        if low is None:
+            continue
+        bound = rng.randint(low, high)
+        filters.append(f"{name}::{bound}" if rng.random() < 0.5 else f"{name}:{bound}:")
+    sort = rng.choice(["uid"] + [prefix + name for name in columns for prefix in ("", "-")])
+    return {"filter": filters, "sort": sort, "limit": rng.choice([20, 50, 100])}
+
+
+def client(args, columns: dict, count: int, seed: int, latencies: List[float], errors: List[str]) -> None:
+    rng = random.Random(seed)
+    sent = 0
+    while sent < count:
+        params = random_query(columns, rng)
+        cursor = None
+        for _ in range(args.pages):
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            start = time.perf_counter()
+            try:
+                page = get(f"{args.url}/objects?{urlencode(query, doseq=True)}")
+            except Exception as error:
+                errors.append(str(error))
+                break
+            finally:
+                latencies.append(time.perf_counter() - start)
+                sent += 1
+            cursor = page["next_cursor"]
+            if cursor is None or sent >= count:
+                break
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * q / 100), len(sorted_values) - 1)]
+
+
+def main():
+    args = parse_arguments()
+    columns = get(f"{args.url}/columns")["columns"]
+    latencies: List[float] = []
+    errors: List[str] = []
+    per_thread = args.requests // args.threads
+    threads = [
+        threading.Thread(target=client, args=(args, columns, per_thread, args.seed + i, latencies, errors))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} req/s, {len(errors)} errors")
+    for q in (50, 90, 99):
+        print(f"p{q}: {percentile(latencies, q) * 1000:.1f} ms")
+    print(f"max: {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
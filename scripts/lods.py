@@ -0,0 +1,156 @@
+"""Level-of-detail (LOD) preview GLBs
+
+Precomputes a decimated, texture-downscaled preview GLB per object with
+blender_lod.py and stores it in the LOD cache by the hash of the source object
+(see render_scripts/lod_cache.py). ui_backend.py serves the preview from
+/models/<uid> and the original object from /models/<uid>?lod=full.
+    - precompute: writes the previews of all objects (or of the uids of an id
+      file) that are not cached yet, many objects per Blender process,
+    - stats: prints the number and size of the cached previews.
+
+Usage:
+    python3 scripts/lods.py --objects_dir src/objects_database --cache_dir lods/ precompute
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from render_scripts.lod_cache import LodCache
+from render_scripts.object_locator import ObjectLocator
+from thumbnails import BLENDER_PATH, load_id_file_uids
+
+LOD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_lod.py")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--cache_dir
+        "--cache_dir",
+        type=str,
+        default="lods/",
+        help="Directory of the LOD cache")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Only precompute the uids of this id file, defaults to all objects")
+    parser.add_argument( #--max_triangles
+        "--max_triangles",
+        type=int,
+        default=50000,
+        help="Triangle budget of a preview")
+    parser.add_argument( #--max_texture_size
+        "--max_texture_size",
+        type=int,
+        default=1024,
+        help="Largest texture side of a preview")
+    parser.add_argument( #--max_bytes
+        "--max_bytes",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="Size budget of a preview GLB")
+    parser.add_argument( #--batch_size
+        "--batch_size",
+        type=int,
+        default=16,
+        help="Number of objects processed by one Blender process")
+    parser.add_argument( #--processes
+        "--processes",
+        type=int,
+        default=4,
+        help="Number of Blender processes")
+    parser.add_argument( #command
+        "command",
+        choices=["precompute", "stats"])
+    return parser.parse_args()
+
+
+def write_lods(args, cache: LodCache, object_paths: List[str]) -> List[Dict]:
+    """Writes the previews of the objects in one Blender process into the cache.
+
+    Returns:
+        List[Dict]: Statistics of every preview written, see blender_lod.py.
+    """
+    # next to the cache, so the previews are moved and not copied
+    with tempfile.TemporaryDirectory(prefix="lods_", dir=cache.cache_dir) as output_dir:
+        command = [
+            args.blender, "--background", "--python", LOD_SCRIPT, "--",
+            "--objects_paths", ",".join(object_paths),
+            "--output_dir", output_dir,
+            "--max_triangles", str(cache.max_triangles),
+            "--max_texture_size", str(cache.max_texture_size),
+            "--max_bytes", str(args.max_bytes),
+        ]
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        results = []
+        for object_path in object_paths:
+            uid = os.path.splitext(os.path.basename(object_path))[0]
+            stats_path = os.path.join(output_dir, f"{uid}.json")
+            if not os.path.exists(stats_path):
+                continue
+            with open(stats_path, "r") as f:
+                stats = json.load(f)
+            cache.put(object_path, os.path.join(output_dir, f"{uid}.glb"))
+            results.append(stats)
+        return results
+
+
+def precompute(args, cache: LodCache, locator: ObjectLocator) -> None:
+    uids = load_id_file_uids(args.id_file_path) if args.id_file_path else sorted(locator.paths)
+    paths = [path for path in (locator.find(uid) for uid in uids) if path is not None]
+    missing = cache.missing(paths)
+    batches = [missing[i:i + args.batch_size] for i in range(0, len(missing), args.batch_size)]
+    print(f"{len(paths) - len(missing)} of {len(paths)} previews cached, writing {len(missing)} "
+          f"in {len(batches)} batches, {len(uids) - len(paths)} objects not found")
+
+    start = time.perf_counter()
+    written, source_bytes, lod_bytes = 0, 0, 0
+    with ThreadPoolExecutor(max_workers=args.processes) as executor:
+        for results in executor.map(lambda batch: write_lods(args, cache, batch), batches):
+            written += len(results)
+            source_bytes += sum(stats["source_bytes"] for stats in results)
+            lod_bytes += sum(stats["bytes"] for stats in results)
+            print(f"{written}/{len(missing)} previews written, {time.perf_counter() - start:.0f}s")
+    print(f"Failed to write {len(missing) - written} previews, "
+          f"{source_bytes / 2**20:.1f} MB of objects -> {lod_bytes / 2**20:.1f} MB of previews")
+
+
+def cache_stats(cache: LodCache) -> Dict[str, int]:
+    """Returns the number and total size of the previews of the cache budget."""
+    files, size = 0, 0
+    for root, _, names in os.walk(cache.budget_dir):
+        for name in names:
+            if name.endswith(".glb"):
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return {"previews": files, "bytes": size}
+
+
+def main():
+    args = parse_arguments()
+    cache = LodCache(args.cache_dir, args.max_triangles, args.max_texture_size)
+    if args.command == "stats":
+        print(json.dumps(cache_stats(cache), indent=2))
+    else:
+        precompute(args, cache, ObjectLocator(args.objects_dir))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
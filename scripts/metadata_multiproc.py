@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+import math
 import os
 import multiprocessing
+import time
 from typing import List, Dict, Any
 import argparse
 import bpy
@@ -11,11 +13,13 @@ from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from blender_render import configure_import_cache, import_object_file
 from metadata_scripts.metad_vertex import count_vertices
 from metadata_scripts.metad_armature import count_armatures
 from metadata_scripts.metad_mesh import count_meshes
 from metadata_scripts.metad_poly import count_poly
 from metadata_scripts.metad_edge import count_edge
+from render_scripts.metrics import RunMetrics, export_metrics
 # from metadata_scripts.metad_vertex import save_vert_to_file
 
 def parse_args():
@@ -76,6 +80,26 @@ def parse_args():
         action="store_true",
         default=True,
         help="Flag to indicate whether to run the animations metadata extraction.")
+    parser.add_argument( # --import_cache_dir
+        "--import_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the import cache shared with blender_render.py, objects are converted to .blend once and appended afterwards.")
+    parser.add_argument( # --chunk_size
+        "--chunk_size",
+        type=int,
+        default=100,
+        help="Objects per pool task at most, smaller chunks report progress more often.")
+    parser.add_argument( # --metrics_port
+        "--metrics_port",
+        type=int,
+        default=None,
+        help="Serve the progress metrics of the run for Prometheus at http://<host>:<port>/metrics.")
+    parser.add_argument( # --metrics_textfile
+        "--metrics_textfile",
+        type=str,
+        default=None,
+        help="Rewrite the progress metrics to this .prom file for the textfile collector of node_exporter.")
     argv = sys.argv[sys.argv.index("--") + 1 :]
     return parser.parse_args(argv)
 
@@ -109,35 +133,41 @@ def task(object_files_chunk: List[str]):
     material_count = {}
     edge_count = {}
     animation_count = {}
+    failed = []
+    object_seconds = []
+    start = time.perf_counter()
     i = 0
+    # one cache connection per worker process
+    configure_import_cache(args.import_cache_dir)
 
     for object_file in object_files_chunk:
         """Loads a model into the scene."""
-        if object_file.endswith(".glb"):
-            bpy.ops.import_scene.gltf(filepath=object_file)
-        elif object_file.endswith(".fbx"):
-            bpy.ops.import_scene.fbx(filepath=object_file)
-        else:
+        if not object_file.endswith((".glb", ".fbx")):
             raise ValueError(f"Unsupported file type: {object_file}")
-        
         obj_id = os.path.splitext(os.path.basename(object_file))[0]
-
-
-        # saving all metadata to variable
-        if args.run_vertex:
-            vertex_numbers.update({obj_id: count_vertices(bpy.context.scene)})
-        if args.run_armature:
-            armature_count.update({obj_id: count_armatures(bpy.context.scene)})
-        if args.run_mesh:
-            mesh_count.update({obj_id: count_meshes(bpy.context.scene)})
-        if args.run_poly:
-            poly_count.update({obj_id: count_poly(bpy.context.scene)})
-        if args.run_material:
-            material_count.update({obj_id: len(bpy.data.materials)})
-        if args.run_edge:
-            edge_count.update({obj_id: count_edge(bpy.context.scene)})
-        if args.run_animation:
-            animation_count.update({obj_id: len(bpy.data.actions)})
+        object_start = time.perf_counter()
+        try:
+            import_object_file(object_file, merge_vertices=False)
+        except Exception as error:
+            # a broken file must not end a run of days, it is counted as failed
+            print(f"Failed to import {object_file}: {error}")
+            failed.append(obj_id)
+        else:
+            # saving all metadata to variable
+            if args.run_vertex:
+                vertex_numbers.update({obj_id: count_vertices(bpy.context.scene)})
+            if args.run_armature:
+                armature_count.update({obj_id: count_armatures(bpy.context.scene)})
+            if args.run_mesh:
+                mesh_count.update({obj_id: count_meshes(bpy.context.scene)})
+            if args.run_poly:
+                poly_count.update({obj_id: count_poly(bpy.context.scene)})
+            if args.run_material:
+                material_count.update({obj_id: len(bpy.data.materials)})
+            if args.run_edge:
+                edge_count.update({obj_id: count_edge(bpy.context.scene)})
+            if args.run_animation:
+                animation_count.update({obj_id: len(bpy.data.actions)})
         
         for obj in bpy.data.objects:
             if obj.type not in {"CAMERA", "LIGHT"}:
@@ -154,7 +184,7 @@ def task(object_files_chunk: List[str]):
         # delete all the images
         for image in bpy.data.images:
             bpy.data.images.remove(image, do_unlink=True)
-
+        object_seconds.append(time.perf_counter() - object_start)
 
         # # Deleting loaded objects from memory
         # bpy.ops.object.select_all(action='DESELECT')
@@ -169,7 +199,12 @@ def task(object_files_chunk: List[str]):
         "poly_count": poly_count,
         "material_count": material_count,
         "edge_count": edge_count,
-        "animation_count": animation_count
+        "animation_count": animation_count,
+        "failed": failed,
+        "num_objects": len(object_files_chunk),
+        "seconds": time.perf_counter() - start,
+        "object_seconds": object_seconds,
+        "pid": os.getpid(),
     }
     
     
@@ -189,12 +224,29 @@ def main():
             data = json.load(file)
             _, paths = next(iter(data.items()))
             object_files.extend(paths)
-    # Splitting based on cpu count
-    object_chunks = split_list(object_files, args.cpu_count)
+    # Splitting based on cpu count, into chunks of at most --chunk_size objects
+    num_chunks = max(args.cpu_count, math.ceil(len(object_files) / max(args.chunk_size, 1)))
+    object_chunks = [chunk for chunk in split_list(object_files, num_chunks) if chunk]
+
+    # the finished chunks come back to this process, which keeps the metrics
+    metrics = RunMetrics("metadata", len(object_files))
+    exporter = export_metrics(metrics, args.metrics_port, args.metrics_textfile)
 
     # Running multiproc for every cpu
+    results = []
     with multiprocessing.Pool(processes=args.cpu_count) as pool:
-        results = pool.starmap(task, [[chunk] for chunk in object_chunks])
+        for result in pool.imap_unordered(task, object_chunks):
+            results.append(result)
+            failed = len(result["failed"])
+            metrics.task_done(result["seconds"], completed=result["num_objects"] - failed, failed=failed,
+                              device=f"worker{result['pid']}")
+            for seconds in result["object_seconds"]:
+                metrics.observe("object", seconds)
+    if exporter is not None:
+        exporter.close()
+    failed = [obj_id for result in results for obj_id in result["failed"]]
+    if failed:
+        print(f"{len(failed)} objects failed to import: {failed[:10]}")
     
     attributes_to_write = {
         "vertex_num": args.run_vertex,
@@ -0,0 +1,224 @@
+"""Local store of the Objaverse annotations with an inverted tag/category index.
+
+objaverse.load_annotations() parses the json of every object into Python dicts,
+which takes minutes and GBs for the 800k objects, just to pick the uids of a
+tag. import_annotations() reads the annotations once (the {uid: annotation}
+json or json.gz shards of objaverse) and writes a directory of .npy arrays:
+
+    uids.npy                  sorted uids, fixed-width bytes, the ordinals
+    face_count.npy            faceCount of every uid, -1 if missing
+    vertex_count.npy          vertexCount
+    animation_count.npy       animationCount
+    <kind>_terms.npy          sorted tag or category slugs
+    <kind>_offsets.npy        start of the postings of every term, one more
+    <kind>_postings.npy       int32 ordinals of the uids of each term, sorted
+    annotations.json          number of objects and terms, written last
+
+AnnotationStore memory-maps the arrays, so opening the store is instant
+and only the pages of the terms and postings of a query are read. A term is a
+binary search, a query of several terms intersects their sorted postings, so
+tag and category queries take milliseconds without network access.
+"""
+
+import glob
+import gzip
+import json
+import os
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST_FILE_NAME = "annotations.json"
+KINDS = ("tag", "category")
+COUNT_FIELDS = {"face_count": "faceCount", "vertex_count": "vertexCount", "animation_count": "animationCount"}
+
+
+def term_slug(term) -> str:
+    """Returns the slug of a tag or category, its slug field or lowercased name."""
+    if isinstance(term, dict):
+        term = term.get("slug") or term.get("name") or ""
+    return str(term).strip().lower()
+
+
+def read_annotation_file(path: str) -> Dict[str, dict]:
+    """Reads a {uid: annotation} json or json.gz file."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_annotations(source: str) -> Iterator[Tuple[str, dict]]:
+    """Yields the (uid, annotation) pairs of a file or of every json(.gz) file of a
+    directory, e.g. the metadata directory of objaverse, one file at a time."""
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "*.json")) + glob.glob(os.path.join(source, "*.json.gz")))
+    else:
+        paths = [source]
+    for path in paths:
+        yield from read_annotation_file(path).items()
+
+
+def save_array(store_dir: str, name: str, values: np.ndarray) -> None:
+    tmp_path = os.path.join(store_dir, f"{name}.tmp.npy")
+    np.save(tmp_path, values)
+    os.replace(tmp_path, os.path.join(store_dir, f"{name}.npy"))
+
+
+def import_annotations(annotations: Iterable[Tuple[str, dict]], store_dir: str) -> Dict[str, int]:
+    """Writes the store of annotations to store_dir.
+
+    The terms are collected as two flat int32 arrays of (term id, object id)
+    pairs, not as Python lists per term, so the import of all objects stays
+    within a few hundred MB.
+
+    Args:
+        annotations (Iterable[Tuple[str, dict]]): (uid, annotation) pairs, e.g.
+            from iter_annotations or objaverse.load_annotations().items().
+        store_dir (str): Directory of the store, created if needed.
+
+    Returns:
+        Dict[str, int]: The manifest, the number of objects and of terms.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    uids: List[bytes] = []
+    seen = set()
+    counts = {column: array("q") for column in COUNT_FIELDS}
+    term_ids: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+    pairs = {kind: (array("i"), array("i")) for kind in KINDS}
+    for uid, annotation in annotations:
+        # an object of several shards is kept once, its first annotation wins
+        if uid in seen:
+            continue
+        seen.add(uid)
+        row = len(uids)
+        uids.append(uid.encode())
+        for column, field in COUNT_FIELDS.items():
+            value = annotation.get(field)
+            counts[column].append(int(value) if isinstance(value, (int, float)) and value >= 0 else -1)
+        for kind, field in (("tag", "tags"), ("category", "categories")):
+            ids, terms, rows = term_ids[kind], pairs[kind][0], pairs[kind][1]
+            for slug in {term_slug(term) for term in annotation.get(field) or []} - {""}:
+                terms.append(ids.setdefault(slug, len(ids)))
+                rows.append(row)
+
+    uid_array = np.array(uids, dtype=bytes) if uids else np.array([], dtype="S32")
+    order = np.argsort(uid_array, kind="stable")
+    # ordinal of every imported row in the sorted uid array
+    ordinals = np.empty(len(order), dtype=np.int32)
+    ordinals[order] = np.arange(len(order), dtype=np.int32)
+    save_array(store_dir, "uids", uid_array[order])
+    for column, values in counts.items():
+        save_array(store_dir, column, np.frombuffer(values, dtype=np.int64)[order])
+
+    manifest = {"objects": len(uids)}
+    for kind in KINDS:
+        names = sorted(term_ids[kind], key=lambda slug: slug.encode())
+        # renumber the term ids in the sorted order of their slugs
+        rank = np.empty(len(names), dtype=np.int32)
+        rank[[term_ids[kind][name] for name in names]] = np.arange(len(names), dtype=np.int32)
+        terms = rank[np.frombuffer(pairs[kind][0], dtype=np.int32)]
+        rows = ordinals[np.frombuffer(pairs[kind][1], dtype=np.int32)]
+        by_term = np.lexsort((rows, terms))
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(names)), out=offsets[1:])
+        save_array(store_dir, f"{kind}_terms", np.array([name.encode() for name in names], dtype=bytes)
+                   if names else np.array([], dtype="S1"))
+        save_array(store_dir, f"{kind}_offsets", offsets)
+        save_array(store_dir, f"{kind}_postings", rows[by_term].astype(np.int32))
+        manifest[f"{kind}_terms"] = len(names)
+    manifest["created"] = time.time()
+    tmp_path = os.path.join(store_dir, MANIFEST_FILE_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE_NAME))
+    return manifest
+
+
+class AnnotationStore:
+    """Memory-mapped annotation store written by import_annotations."""
+
+    def __init__(self, store_dir: str) -> None:
+        """Initializes the AnnotationStore.
+
+        Args:
+            store_dir (str): Directory of the store.
+
+        Raises:
+            FileNotFoundError: If the store was not imported (completely).
+        """
+        with open(os.path.join(store_dir, MANIFEST_FILE_NAME)) as f:
+            self.manifest = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.uids = load("uids")
+        self.counts = {column: load(column) for column in COUNT_FIELDS}
+        self.terms = {kind: load(f"{kind}_terms") for kind in KINDS}
+        self.offsets = {kind: load(f"{kind}_offsets") for kind in KINDS}
+        self.postings = {kind: load(f"{kind}_postings") for kind in KINDS}
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def _kind(self, kind: str) -> str:
+        if kind not in KINDS:
+            raise KeyError(f"Unknown kind '{kind}', choose from {list(KINDS)}")
+        return kind
+
+    def term_postings(self, kind: str, term: str) -> np.ndarray:
+        """Returns the sorted ordinals of the objects of a tag or category, empty
+        for an unknown term."""
+        terms = self.terms[self._kind(kind)]
+        key = term_slug(term).encode()
+        position = int(np.searchsorted(terms, key))
+        if position == len(terms) or terms[position] != key:
+            return np.empty(0, dtype=np.int32)
+        offsets = self.offsets[kind]
+        return np.asarray(self.postings[kind][offsets[position]:offsets[position + 1]])
+
+    def select(self, tags: Iterable[str] = (), categories: Iterable[str] = ()) -> np.ndarray:
+        """Returns the sorted ordinals of the objects with all tags and categories,
+        the shortest postings first, all objects without terms."""
+        lists = [self.term_postings("tag", tag) for tag in tags]
+        lists += [self.term_postings("category", category) for category in categories]
+        if not lists:
+            return np.arange(len(self), dtype=np.int32)
+        lists.sort(key=len)
+        result = lists[0]
+        for postings in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, postings, assume_unique=True)
+        return result
+
+    def term_counts(self, kind: str, prefix: str = "", limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Returns the terms starting with prefix and their number of objects,
+        most frequent first, e.g. for autocompletion."""
+        terms, offsets = self.terms[self._kind(kind)], self.offsets[kind]
+        key = term_slug(prefix).encode()
+        start = int(np.searchsorted(terms, key))
+        stop = int(np.searchsorted(terms, key + b"\xff")) if key else len(terms)
+        sizes = np.diff(np.asarray(offsets[start:stop + 1]))
+        order = np.argsort(-sizes, kind="stable")[:limit]
+        return [(terms[start + i].decode(), int(sizes[i])) for i in order]
+
+    def uid_list(self, ordinals: np.ndarray) -> List[str]:
+        return [uid.decode() for uid in self.uids[ordinals]]
+
+    def ordinals(self, uids: Iterable[str]) -> np.ndarray:
+        """Returns the ordinal of every uid, -1 for unknown uids."""
+        keys = np.array([uid.encode() for uid in uids], dtype=bytes)
+        if not len(keys) or not len(self):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.uids, keys), len(self) - 1)
+        return np.where(self.uids[positions] == keys, positions, -1)
+
+    def columns(self, ordinals: np.ndarray) -> Dict[str, list]:
+        """Returns the uids and counts of some objects in columns."""
+        result = {"uid": self.uid_list(ordinals)}
+        for column, values in self.counts.items():
+            result[column] = values[ordinals].tolist()
+        return result
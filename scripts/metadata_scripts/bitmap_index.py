@@ -0,0 +1,292 @@
+"""Bitmap indexes of boolean object flags over the ordinals of MetadataTable.
+
+Filters like "has an armature", "is a usdz file" or "is in group chairs" are set
+memberships. Instead of comparing a whole column for every request, every flag
+is kept as a NumPy packed bit array over the dense uid ordinal of the metadata
+table (bit i is row i), 100 KB for 800k objects, and flags are combined with
+bitwise and, or and not over the packed bytes, 8 objects per byte operation.
+
+The flags are:
+    - has_<column> for every metadata column, e.g. has_armature for
+      armature_count > 0 and has_vertex for vertex_num > 0,
+    - is_<extension> of the object file found in the objects directory, e.g.
+      is_usdz, is_glb,
+    - group:<name> for the groups of group_store.py,
+    - any flag set from a list of uids, e.g. quarantine or missing_textures.
+
+The index is saved as `bitmap_index.npz` next to the metadata table. When the
+table is rebuilt with new objects, load_flags() moves the bits of the known
+objects to their new ordinals and only looks up the new rows, and set_rows()
+changes the bits of single objects, e.g. when the UI adds objects to a group.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metadata_scripts.metadata_table import MetadataTable
+
+INDEX_FILE_NAME = "bitmap_index.npz"
+GROUP_PREFIX = "group:"
+
+
+def column_flag(column: str) -> str:
+    """Returns the flag of a metadata column, e.g. has_armature for armature_count."""
+    for suffix in ("_count", "_num"):
+        if column.endswith(suffix):
+            column = column[: -len(suffix)]
+    return f"has_{column}"
+
+
+class BitmapIndex:
+    """Packed bit arrays of flags over the ordinals of a sorted uid array."""
+
+    def __init__(
+        self,
+        uids: np.ndarray,
+        bitmaps: Optional[Dict[str, np.ndarray]] = None,
+        version: str = "",
+        has_extensions: bool = False,
+    ) -> None:
+        """Initializes the BitmapIndex.
+
+        Args:
+            uids (np.ndarray): Sorted uids, the uids of the MetadataTable.
+            bitmaps (Optional[Dict[str, np.ndarray]], optional): Packed uint8 bits
+                of every flag. Defaults to None, no flags.
+            version (str, optional): Version of the table the index was built
+                for. Defaults to "".
+            has_extensions (bool, optional): Whether the is_<extension> flags
+                were built for all rows. Defaults to False.
+        """
+        self.uids = uids
+        self.size = len(uids)
+        self.bitmaps: Dict[str, np.ndarray] = dict(bitmaps or {})
+        self.version = version
+        self.has_extensions = has_extensions
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def empty(self) -> np.ndarray:
+        return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def set_flag(self, name: str, mask: np.ndarray) -> None:
+        """Sets a flag from a boolean mask over all rows."""
+        with self.lock:
+            self.bitmaps[name] = np.packbits(mask)
+
+    def set_rows(self, name: str, ordinals: Iterable[int], value: bool = True) -> None:
+        """Sets or clears the bits of some rows of a flag, creating the flag if needed."""
+        ordinals = np.asarray(list(ordinals), dtype=np.int64)
+        ordinals = ordinals[ordinals >= 0]
+        with self.lock:
+            bitmap = self.bitmaps.get(name)
+            bitmap = self.empty() if bitmap is None else bitmap.copy()
+            bits = (np.uint8(0x80) >> (ordinals % 8).astype(np.uint8)).astype(np.uint8)
+            if value:
+                np.bitwise_or.at(bitmap, ordinals // 8, bits)
+            else:
+                np.bitwise_and.at(bitmap, ordinals // 8, ~bits)
+            # replaced, not changed in place, so a concurrent reader sees either version
+            self.bitmaps[name] = bitmap
+
+    def drop(self, name: str) -> None:
+        with self.lock:
+            self.bitmaps.pop(name, None)
+
+    def bitmap(self, name: str) -> np.ndarray:
+        """Returns the packed bits of a flag.
+
+        Raises:
+            KeyError: If the flag does not exist.
+        """
+        bitmap = self.bitmaps.get(name)
+        if bitmap is None:
+            raise KeyError(f"Unknown flag '{name}', choose from {sorted(self.bitmaps)}")
+        return bitmap
+
+    def mask(self, bitmap: np.ndarray) -> np.ndarray:
+        """Returns the boolean mask of packed bits."""
+        return np.unpackbits(bitmap, count=self.size).astype(bool)
+
+    def invert(self, bitmap: np.ndarray) -> np.ndarray:
+        """Returns the complement of packed bits, the padding bits stay 0."""
+        inverted = np.invert(bitmap)
+        if self.size % 8:
+            inverted[-1] &= np.uint8((0xFF << (8 - self.size % 8)) & 0xFF)
+        return inverted
+
+    def combine(self, include: List[str] = (), exclude: List[str] = (), any_of: List[str] = ()) -> np.ndarray:
+        """Returns the packed bits of the rows with every flag of include, none of
+        exclude and, if given, at least one of any_of."""
+        result = None
+        if any_of:
+            result = self.empty()
+            for name in any_of:
+                result |= self.bitmap(name)
+        for name in include:
+            result = self.bitmap(name).copy() if result is None else result & self.bitmap(name)
+        if result is None:
+            result = self.invert(self.empty())
+        for name in exclude:
+            result &= np.invert(self.bitmap(name))
+        return result
+
+    def evaluate(self, node: Tuple) -> np.ndarray:
+        """Returns the packed bits of a query tree of metadata_query.py that only
+        combines flags.
+
+        Raises:
+            ValueError: If the tree compares columns.
+            KeyError: If a flag does not exist.
+        """
+        kind = node[0]
+        if kind == "flag":
+            return self.bitmap(node[1])
+        if kind == "not":
+            return self.invert(self.evaluate(node[1]))
+        if kind in ("and", "or"):
+            left, right = self.evaluate(node[1]), self.evaluate(node[2])
+            return left & right if kind == "and" else left | right
+        raise ValueError("Only flags can be combined in the bitmap index")
+
+    def count(self, name: str) -> int:
+        return int(np.unpackbits(self.bitmap(name)).sum())
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of objects of every flag."""
+        return {name: self.count(name) for name in sorted(self.bitmaps)}
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            uids=self.uids,
+            version=np.array(self.version),
+            has_extensions=np.array(self.has_extensions),
+            names=np.array(sorted(self.bitmaps), dtype=str),
+            **{f"bits_{i}": self.bitmaps[name] for i, name in enumerate(sorted(self.bitmaps))},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BitmapIndex":
+        with np.load(path) as data:
+            bitmaps = {str(name): data[f"bits_{i}"] for i, name in enumerate(data["names"])}
+            has_extensions = bool(data["has_extensions"]) if "has_extensions" in data.files else False
+            return cls(data["uids"], bitmaps, str(data["version"]), has_extensions)
+
+    def reindex(self, uids: np.ndarray) -> Tuple["BitmapIndex", np.ndarray]:
+        """Returns the index moved onto a new sorted uid array, and the mask of the
+        new rows whose flags are unknown."""
+        positions = np.searchsorted(self.uids, uids)
+        positions = np.minimum(positions, max(self.size - 1, 0))
+        known = self.uids[positions] == uids if self.size else np.zeros(len(uids), dtype=bool)
+        index = BitmapIndex(uids, version=self.version, has_extensions=self.has_extensions)
+        for name, bitmap in self.bitmaps.items():
+            mask = np.zeros(len(uids), dtype=bool)
+            mask[known] = self.mask(bitmap)[positions[known]]
+            index.bitmaps[name] = np.packbits(mask)
+        return index, ~known
+
+
+def set_column_flags(index: BitmapIndex, table: MetadataTable) -> None:
+    """Sets the has_<column> flags, one vectorized comparison per column."""
+    for column, values in table.columns.items():
+        index.set_flag(column_flag(column), values > 0)
+
+
+def set_extension_flags(index: BitmapIndex, paths: Dict[str, str], rows: Optional[np.ndarray] = None) -> None:
+    """Sets the is_<extension> flags from the object paths of ObjectLocator, of
+    the rows of a mask or of all rows."""
+    selected = np.arange(len(index)) if rows is None else np.flatnonzero(rows)
+    extensions = np.array(
+        [os.path.splitext(paths.get(uid, ""))[1].lower().lstrip(".") for uid in index.uids[selected]], dtype=str
+    )
+    for extension in sorted(set(extensions.tolist()) - {""}):
+        name = f"is_{extension}"
+        if rows is not None and name in index.bitmaps:
+            mask = index.mask(index.bitmaps[name])
+        else:
+            mask = np.zeros(len(index), dtype=bool)
+        mask[selected] = extensions == extension
+        index.set_flag(name, mask)
+
+
+def set_uid_flag(index: BitmapIndex, table: MetadataTable, name: str, uids: Iterable[str]) -> None:
+    """Sets a flag to exactly the given uids, unknown uids are ignored."""
+    mask = np.zeros(len(index), dtype=bool)
+    ordinals = table.ordinals(uids)
+    mask[ordinals[ordinals >= 0]] = True
+    index.set_flag(name, mask)
+
+
+def set_group_flags(index: BitmapIndex, table: MetadataTable, groups: Dict[str, list]) -> None:
+    """Sets a group:<name> flag per group of an id file, dropping removed groups."""
+    for name in [name for name in index.bitmaps if name.startswith(GROUP_PREFIX)]:
+        if name[len(GROUP_PREFIX):] not in groups:
+            index.drop(name)
+    for group, (_, uids) in groups.items():
+        set_uid_flag(index, table, GROUP_PREFIX + group, uids)
+
+
+def load_flags(
+    metadata_dir: str,
+    table: MetadataTable,
+    paths: Optional[Dict[str, str]] = None,
+    groups: Optional[Dict[str, list]] = None,
+    uid_lists: Optional[Dict[str, List[str]]] = None,
+) -> BitmapIndex:
+    """Loads the bitmap index of metadata_dir and brings it up to date with the table.
+
+    The column flags are recomputed when the table changed, they take one
+    comparison per column. The flags of the objects of the saved index are
+    moved to their new ordinals, the file extensions are only looked up for the
+    new rows once they were looked up for all rows, and the whole index is
+    built if none was saved.
+
+    Args:
+        metadata_dir (str): The --save_path of metadata_multiproc.py.
+        table (MetadataTable): The loaded metadata table.
+        paths (Optional[Dict[str, str]], optional): Object file of every uid, the
+            paths of ObjectLocator, for the is_<extension> flags. Defaults to None.
+        groups (Optional[Dict[str, list]], optional): Groups in the id file
+            format, see group_store.py. Defaults to None.
+        uid_lists (Optional[Dict[str, List[str]]], optional): Uids of further
+            flags, e.g. {"quarantine": [...]}. Defaults to None.
+
+    Returns:
+        BitmapIndex: The index, saved again if it changed.
+    """
+    path = os.path.join(metadata_dir, INDEX_FILE_NAME)
+    if os.path.exists(path):
+        index = BitmapIndex.load(path)
+        if index.version == table.version and len(index.uids) == len(table.uids):
+            new_rows = np.zeros(len(table), dtype=bool)
+        else:
+            index, new_rows = index.reindex(table.uids)
+    else:
+        index, new_rows = BitmapIndex(table.uids), None
+
+    changed = index.version != table.version or new_rows is None
+    if changed:
+        set_column_flags(index, table)
+    if paths is not None and not index.has_extensions:
+        # an index saved without paths has no extension flags for the known rows
+        set_extension_flags(index, paths)
+        index.has_extensions = changed = True
+    elif paths is not None and new_rows.any():
+        set_extension_flags(index, paths, new_rows)
+        changed = True
+    if groups is not None:
+        set_group_flags(index, table, groups)
+    for name, uids in (uid_lists or {}).items():
+        set_uid_flag(index, table, name, uids)
+    index.version = table.version
+    if changed or groups is not None or uid_lists:
+        index.save(path)
+    return index
@@ -0,0 +1,175 @@
+"""Boolean predicates over the metadata columns of MetadataTable.
+
+A query combines comparisons of a column with a number by and, or, not and
+parentheses, e.g.
+
+    poly_count<50000 and armature_count>0 and material_count>=1
+    (animation_count>0 or armature_count>0) and not mesh_count==1
+
+The operators are <, <=, >, >=, == (or =) and !=. A name without a
+comparison is a flag of the bitmap index (see bitmap_index.py), e.g.
+`has_animation and not is_usdz and group:chairs`. parse_query turns the text
+into a tree of tuples once, evaluate computes the boolean mask of every node
+with one NumPy comparison over a whole column, and combines the flags of a
+subtree on their packed bits, so a query over 800k objects takes milliseconds.
+Like the range filters of the UI, a comparison never matches an object without
+a value (-1), so `not poly_count<100` does.
+"""
+
+import re
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from metadata_scripts.bitmap_index import BitmapIndex
+from metadata_scripts.metadata_table import MetadataTable
+
+COMPARISONS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "=": np.equal,
+    "!=": np.not_equal,
+}
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(<=|>=|==|!=|<|>|=)|(\()|(\))|([A-Za-z_][A-Za-z0-9_:.\-]*)|(-?\d+(?:\.\d*)?))")
+
+# ("cmp", column, operator, value) | ("flag", name) | ("not", node) | ("and", left, right) | ("or", left, right)
+Node = Tuple
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Returns the (kind, text) tokens of a query, kind is op, (, ), name or number.
+
+    Raises:
+        ValueError: If the query has a character no token starts with.
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected '{text[position:].strip()[:20]}' at position {position} of the query")
+        kind = ("op", "(", ")", "name", "number")[match.lastindex - 1]
+        tokens.append((kind, match.group(match.lastindex)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser, not binds tighter than and, and than or."""
+
+    def __init__(self, tokens: List[Tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ("end", "")
+
+    def take(self, kind: str) -> str:
+        token_kind, text = self.peek()
+        if token_kind != kind:
+            raise ValueError(f"Expected {kind} but found '{text or 'the end'}' in the query")
+        self.position += 1
+        return text
+
+    def keyword(self, word: str) -> bool:
+        kind, text = self.peek()
+        if kind == "name" and text.lower() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse_or(self) -> Node:
+        node = self.parse_and()
+        while self.keyword("or"):
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Node:
+        node = self.parse_not()
+        while self.keyword("and"):
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self) -> Node:
+        if self.keyword("not"):
+            return ("not", self.parse_not())
+        if self.peek()[0] == "(":
+            self.take("(")
+            node = self.parse_or()
+            self.take(")")
+            return node
+        name = self.take("name")
+        if self.peek()[0] != "op":
+            return ("flag", name)
+        operator = self.take("op")
+        value = float(self.take("number"))
+        return ("cmp", name, operator, value)
+
+
+def parse_query(text: str) -> Node:
+    """Parses a query into its tree.
+
+    Raises:
+        ValueError: If the query is not valid.
+    """
+    parser = _Parser(tokenize(text))
+    node = parser.parse_or()
+    if parser.position != len(parser.tokens):
+        raise ValueError(f"Unexpected '{parser.peek()[1]}' in the query")
+    return node
+
+
+def query_columns(node: Node) -> List[str]:
+    """Returns the columns a query compares."""
+    if node[0] == "cmp":
+        return [node[1]]
+    if node[0] == "flag":
+        return []
+    return [column for child in node[1:] for column in query_columns(child)]
+
+
+def query_flags(node: Node) -> List[str]:
+    """Returns the flags a query uses."""
+    if node[0] == "flag":
+        return [node[1]]
+    if node[0] == "cmp":
+        return []
+    return [flag for child in node[1:] for flag in query_flags(child)]
+
+
+def evaluate(node: Node, table: MetadataTable, flags: Optional[BitmapIndex] = None) -> np.ndarray:
+    """Returns the boolean mask of the rows matching a parsed query.
+
+    Raises:
+        KeyError: If the query compares an unknown column or uses an unknown
+            flag, or uses flags without a bitmap index.
+    """
+    kind = node[0]
+    if kind == "cmp":
+        _, column, operator, value = node
+        values = table.column(column)
+        return COMPARISONS[operator](values, value) & (values >= 0)
+    if flags is None and kind == "flag":
+        raise KeyError(f"'{node[1]}' is not compared to a value, and there is no bitmap index of flags")
+    if flags is not None and not query_columns(node):
+        # a subtree of flags only is combined on the packed bits and unpacked once
+        return flags.mask(flags.evaluate(node))
+    if kind == "not":
+        return ~evaluate(node[1], table, flags)
+    left, right = evaluate(node[1], table, flags), evaluate(node[2], table, flags)
+    return left & right if kind == "and" else left | right
+
+
+def query_mask(table: MetadataTable, query: Union[str, Node], flags: Optional[BitmapIndex] = None) -> np.ndarray:
+    """Returns the boolean mask of the rows matching a query, all rows for an
+    empty query."""
+    if isinstance(query, str):
+        if not query.strip():
+            return np.ones(len(table), dtype=bool)
+        query = parse_query(query)
+    return evaluate(query, table, flags)
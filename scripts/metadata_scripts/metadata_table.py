@@ -0,0 +1,239 @@
+"""Column store of the metadata written by metadata_multiproc.py.
+
+metadata_multiproc.py appends one `<uid>: <value>` line per object to a
+`<attribute>.txt` file per attribute in its --save_path. MetadataTable reads
+them into one NumPy array per column over a sorted uid array, so every object
+has a dense ordinal (its row). Values of objects missing from a file are -1.
+
+Parsing the text files is slow for the full corpus, so the table is cached as
+`metadata_table.npz` next to them and rebuilt when a text file is newer.
+
+Range filters are vectorized comparisons over a column, sorting uses a
+stable argsort per column that is computed once and kept, together with its
+inverse (the rank of every row) for cursor pagination.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+METADATA_COLUMNS = (
+    "vertex_num",
+    "armature_count",
+    "mesh_count",
+    "poly_count",
+    "material_count",
+    "edge_count",
+    "animation_count",
+)
+CACHE_FILE_NAME = "metadata_table.npz"
+
+
+def read_attribute_file(path: str) -> Dict[str, int]:
+    """Reads a `<uid>: <value>` file, later lines of a uid win."""
+    values = {}
+    with open(path, "r") as f:
+        for line in f:
+            uid, sep, value = line.partition(":")
+            if not sep:
+                continue
+            try:
+                values[uid.strip()] = int(value)
+            except ValueError:
+                continue
+    return values
+
+
+class MetadataTable:
+    """Metadata columns over a sorted uid array."""
+
+    def __init__(self, uids: np.ndarray, columns: Dict[str, np.ndarray], version: str = "") -> None:
+        """Initializes the MetadataTable.
+
+        Args:
+            uids (np.ndarray): Sorted uids, the ordinal of an object is its index.
+            columns (Dict[str, np.ndarray]): int64 column per attribute, -1 if missing.
+            version (str, optional): Version of the data, changes when it is rebuilt.
+                Defaults to "".
+        """
+        self.uids = uids
+        self.columns = columns
+        self.version = version
+        self._orders: Dict[str, np.ndarray] = {}
+        self._ranks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    @classmethod
+    def from_text_files(cls, metadata_dir: str) -> "MetadataTable":
+        """Builds the table from the `<attribute>.txt` files of metadata_dir."""
+        attributes = {}
+        for column in METADATA_COLUMNS:
+            path = os.path.join(metadata_dir, f"{column}.txt")
+            if os.path.exists(path):
+                attributes[column] = read_attribute_file(path)
+
+        sorted_uids = sorted(set().union(*attributes.values()))
+        ordinal_of = {uid: i for i, uid in enumerate(sorted_uids)}
+        columns = {}
+        for column, values in attributes.items():
+            array = np.full(len(sorted_uids), -1, dtype=np.int64)
+            ordinals = np.fromiter((ordinal_of[uid] for uid in values), dtype=np.int64, count=len(values))
+            array[ordinals] = np.fromiter(values.values(), dtype=np.int64, count=len(values))
+            columns[column] = array
+        uids = np.array(sorted_uids, dtype=str)
+        return cls(uids, columns)
+
+    @classmethod
+    def load(cls, metadata_dir: str) -> "MetadataTable":
+        """Loads the table of metadata_dir from its cache, rebuilding a stale cache.
+
+        Args:
+            metadata_dir (str): The --save_path of metadata_multiproc.py.
+
+        Raises:
+            FileNotFoundError: If metadata_dir has no metadata files.
+
+        Returns:
+            MetadataTable: The table.
+        """
+        text_files = [
+            os.path.join(metadata_dir, f"{column}.txt")
+            for column in METADATA_COLUMNS
+            if os.path.exists(os.path.join(metadata_dir, f"{column}.txt"))
+        ]
+        if not text_files:
+            raise FileNotFoundError(f"No metadata files in {metadata_dir}")
+        newest = max(os.path.getmtime(path) for path in text_files)
+
+        cache_path = os.path.join(metadata_dir, CACHE_FILE_NAME)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= newest:
+            with np.load(cache_path) as data:
+                columns = {name[len("col_"):]: data[name] for name in data.files if name.startswith("col_")}
+                return cls(data["uids"], columns, str(data["version"]))
+
+        table = cls.from_text_files(metadata_dir)
+        table.version = f"{newest:.6f}"
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            uids=table.uids,
+            version=np.array(table.version),
+            **{f"col_{name}": array for name, array in table.columns.items()},
+        )
+        os.replace(tmp_path, cache_path)
+        return table
+
+    def ordinals(self, uids: Iterable[str]) -> np.ndarray:
+        """Returns the ordinals of the uids, -1 for unknown uids."""
+        uids = np.asarray(list(uids), dtype=str)
+        if len(self.uids) == 0 or len(uids) == 0:
+            return np.full(len(uids), -1, dtype=np.int64)
+        positions = np.searchsorted(self.uids, uids)
+        positions = np.minimum(positions, len(self.uids) - 1)
+        return np.where(self.uids[positions] == uids, positions, -1)
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a column.
+
+        Raises:
+            KeyError: If the column does not exist.
+        """
+        if name not in self.columns:
+            raise KeyError(f"Unknown metadata column '{name}', choose from {sorted(self.columns)}")
+        return self.columns[name]
+
+    def range_mask(self, name: str, minimum: Optional[float] = None, maximum: Optional[float] = None) -> np.ndarray:
+        """Returns the rows whose value is within [minimum, maximum], None is unbounded.
+
+        Objects without a value (-1) never match a bounded filter.
+        """
+        values = self.column(name)
+        mask = values >= 0
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+        return mask
+
+    def order(self, name: str) -> np.ndarray:
+        """Returns the rows sorted by a column, ties by ordinal, computed once."""
+        if name not in self._orders:
+            order = np.argsort(self.column(name), kind="stable")
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self._orders[name] = order
+            self._ranks[name] = rank
+        return self._orders[name]
+
+    def rank(self, name: str) -> np.ndarray:
+        """Returns the position of every row in order(name)."""
+        self.order(name)
+        return self._ranks[name]
+
+    def page(
+        self,
+        mask: np.ndarray,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        after: Optional[int] = None,
+        limit: int = 100,
+    ) -> Tuple[np.ndarray, Optional[int]]:
+        """Returns one page of the matching rows in sort order.
+
+        Args:
+            mask (np.ndarray): Boolean mask of the matching rows.
+            sort (Optional[str], optional): Column to sort by. Defaults to None,
+                sorting by uid.
+            descending (bool, optional): Whether to sort in descending order.
+                Defaults to False.
+            after (Optional[int], optional): Ordinal of the last row of the previous
+                page. Defaults to None, the first page.
+            limit (int, optional): Maximum number of rows. Defaults to 100.
+
+        Returns:
+            Tuple[np.ndarray, Optional[int]]: The ordinals of the page, and the
+            ordinal to continue after, None if this is the last page.
+        """
+        n = len(self.uids)
+        if sort is None:
+            order, position = None, (-1 if after is None else after)
+        else:
+            order = self.order(sort)
+            position = -1 if after is None else int(self.rank(sort)[after])
+        if descending:
+            position = n if after is None else position
+
+        rows: List[np.ndarray] = []
+        found = 0
+        # scan the sort order in growing blocks, a page of a selective filter does
+        # not touch the whole order
+        block = max(limit * 4, 1024)
+        start = position + 1 if not descending else position
+        while found <= limit and (0 <= start < n if not descending else start > 0):
+            if descending:
+                positions = np.arange(start - 1, max(start - block, 0) - 1, -1)
+                start = max(start - block, 0)
+            else:
+                positions = np.arange(start, min(start + block, n))
+                start = min(start + block, n)
+            candidates = positions if order is None else order[positions]
+            selected = candidates[mask[candidates]]
+            rows.append(selected)
+            found += len(selected)
+            block *= 4
+
+        selected = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        if len(selected) > limit:
+            return selected[:limit], int(selected[limit - 1])
+        return selected, None
+
+    def rows(self, ordinals: np.ndarray, columns: Optional[Iterable[str]] = None) -> Dict[str, list]:
+        """Returns the uids and column values of the rows, column-wise."""
+        columns = list(self.columns) if columns is None else list(columns)
+        result = {"uid": self.uids[ordinals].tolist()}
+        for name in columns:
+            result[name] = self.column(name)[ordinals].tolist()
+        return result
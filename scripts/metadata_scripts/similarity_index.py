@@ -0,0 +1,167 @@
+"""Nearest-neighbour index over the shape descriptors of the objects.
+
+The descriptors written by blender_geometry.py are kept in one dense float32
+matrix (one L2 normalized row per uid), so the similarity of a query to every
+object is one matrix-vector product. For 800k objects that is already fast,
+an inverted file (IVF) makes it faster: the rows are clustered by spherical
+k-means, stored sorted by cluster, and a query only scores the rows of the
+n_probe clusters whose centroids are closest to it.
+
+The index is saved as one npz file.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+ASSIGN_BATCH = 4096
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the positions of the k largest scores, largest first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    positions = np.argpartition(-scores, k - 1)[:k]
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+def assign_clusters(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the closest centroid (largest dot product) of every row, in batches."""
+    clusters = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH):
+        clusters[start:start + ASSIGN_BATCH] = np.argmax(vectors[start:start + ASSIGN_BATCH] @ centroids.T, axis=1)
+    return clusters
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Returns n_clusters L2 normalized centroids of the rows."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        clusters = assign_clusters(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, clusters, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        # an empty cluster keeps its centroid
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class SimilarityIndex:
+    """Descriptors of the objects with an optional IVF index."""
+
+    def __init__(
+        self,
+        uids: np.ndarray,
+        vectors: np.ndarray,
+        centroids: Optional[np.ndarray] = None,
+        list_offsets: Optional[np.ndarray] = None,
+    ) -> None:
+        """Initializes the SimilarityIndex.
+
+        Args:
+            uids (np.ndarray): Uid of every row.
+            vectors (np.ndarray): (N, D) float32 L2 normalized descriptors. With an
+                IVF index the rows are sorted by cluster.
+            centroids (Optional[np.ndarray], optional): (L, D) cluster centroids.
+                Defaults to None, no IVF index.
+            list_offsets (Optional[np.ndarray], optional): L + 1 offsets, the rows
+                of cluster i are list_offsets[i]:list_offsets[i + 1]. Defaults to
+                None.
+        """
+        self.uids = uids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.row_of = {uid: row for row, uid in enumerate(uids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    @classmethod
+    def from_shards(cls, shard_paths: Iterable[str]) -> "SimilarityIndex":
+        """Merges the npz files of blender_geometry.py, later shards win for a uid."""
+        rows = {}
+        for path in shard_paths:
+            with np.load(path) as data:
+                for uid, vector in zip(data["uids"].tolist(), data["descriptors"]):
+                    rows[uid] = vector
+        uids = sorted(rows)
+        size = len(next(iter(rows.values()))) if rows else 0
+        vectors = np.array([rows[uid] for uid in uids], dtype=np.float32).reshape(len(uids), size)
+        return cls(np.array(uids, dtype=str), vectors)
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 100000) -> None:
+        """Clusters the rows and sorts them by cluster.
+
+        Args:
+            n_lists (Optional[int], optional): Number of clusters. Defaults to None,
+                the square root of the number of rows.
+            iterations (int, optional): k-means iterations. Defaults to 10.
+            sample_size (int, optional): Number of rows the centroids are trained
+                on. Defaults to 100000.
+        """
+        n_lists = min(n_lists or max(1, int(np.sqrt(len(self)))), len(self))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(len(self), min(sample_size, len(self)), replace=False)]
+        centroids = spherical_kmeans(sample, n_lists, iterations)
+        clusters = assign_clusters(self.vectors, centroids)
+        order = np.argsort(clusters, kind="stable")
+        self.uids = self.uids[order]
+        self.vectors = np.ascontiguousarray(self.vectors[order])
+        self.centroids = centroids
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(clusters, minlength=n_lists))])
+        self.row_of = {uid: row for row, uid in enumerate(self.uids.tolist())}
+
+    def save(self, path: str) -> None:
+        arrays = {"uids": self.uids, "vectors": self.vectors}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, list_offsets=self.list_offsets)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        with np.load(path) as data:
+            centroids = data["centroids"] if "centroids" in data.files else None
+            list_offsets = data["list_offsets"] if "list_offsets" in data.files else None
+            return cls(data["uids"], data["vectors"], centroids, list_offsets)
+
+    def query(self, vector: np.ndarray, k: int = 10, n_probe: Optional[int] = 16) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the rows and cosine similarities of the k most similar objects.
+
+        Args:
+            vector (np.ndarray): L2 normalized query descriptor.
+            k (int, optional): Number of results. Defaults to 10.
+            n_probe (Optional[int], optional): Number of clusters searched. Defaults
+                to 16, None searches all rows (exact).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Rows and similarities, most similar first.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.centroids is None or n_probe is None or n_probe >= len(self.centroids):
+            scores = self.vectors @ vector
+            best = top_k(scores, k)
+            return best, scores[best]
+        lists = top_k(self.centroids @ vector, n_probe)
+        rows = np.concatenate([
+            np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists
+        ])
+        scores = self.vectors[rows] @ vector
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+    def similar(self, uid: str, k: int = 10, n_probe: Optional[int] = 16) -> List[Tuple[str, float]]:
+        """Returns the k objects most similar to an indexed object, without itself.
+
+        Raises:
+            KeyError: If the uid is not indexed.
+        """
+        row = self.row_of.get(uid)
+        if row is None:
+            raise KeyError(f"{uid} has no descriptor")
+        rows, scores = self.query(self.vectors[row], k + 1, n_probe)
+        return [(self.uids[r], float(s)) for r, s in zip(rows, scores) if r != row][:k]
@@ -0,0 +1,113 @@
+"""Surface point cloud and voxel export
+
+Writes the normalized surface point clouds, with normals and optionally voxel
+occupancy grids, of the objects for models trained on geometry (see
+render_scripts/point_clouds.py for the shard layout):
+    - export: samples the objects (or the uids of an id file) that have no point
+      cloud in --output_dir yet with blender_geometry.py, many objects per
+      Blender process, one shard per batch, then updates the index,
+    - index: rebuilds index.json from the shards of --output_dir.
+The shards are read back with render_scripts.point_clouds.PointCloudStore.
+
+Usage:
+    python3 scripts/pointclouds.py --objects_dir src/objects_database --output_dir pointclouds/ --voxel_resolution 32 export
+"""
+
+import argparse
+import json
+import os
+from typing import List
+
+from render_scripts.object_locator import ObjectLocator
+from render_scripts.point_clouds import UIDS_SUFFIX, index_shards
+from similarity import run_geometry_batches
+from thumbnails import BLENDER_PATH, load_id_file_uids
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--output_dir
+        "--output_dir",
+        type=str,
+        default="pointclouds/",
+        help="Directory of the point cloud shards")
+    parser.add_argument( #--num_points
+        "--num_points",
+        type=int,
+        default=2048,
+        help="Number of surface points of a point cloud")
+    parser.add_argument( #--voxel_resolution
+        "--voxel_resolution",
+        type=int,
+        default=0,
+        help="Voxel grid cells along every axis, a multiple of 8, 0 writes no voxel grids")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Only export the uids of this id file, defaults to all objects")
+    parser.add_argument( #--batch_size
+        "--batch_size",
+        type=int,
+        default=64,
+        help="Number of objects processed by one Blender process")
+    parser.add_argument( #--processes
+        "--processes",
+        type=int,
+        default=4,
+        help="Number of Blender processes")
+    parser.add_argument( #command
+        "command",
+        choices=["export", "index"])
+    return parser.parse_args()
+
+
+def export(args, locator: ObjectLocator) -> None:
+    if args.voxel_resolution % 8:
+        raise SystemExit("--voxel_resolution must be a multiple of 8")
+    os.makedirs(args.output_dir, exist_ok=True)
+    uids = load_id_file_uids(args.id_file_path) if args.id_file_path else sorted(locator.paths)
+    done = index_shards(args.output_dir)
+    paths = [path for path in (locator.find(uid) for uid in uids if uid not in done) if path is not None]
+    print(f"{len(done)} point clouds exported, exporting {len(paths)}")
+    extra_args = [
+        "--mode", "pointcloud",
+        "--num_points", str(args.num_points),
+        "--voxel_resolution", str(args.voxel_resolution),
+    ]
+    exported = run_geometry_batches(
+        args, paths, args.output_dir, extra_args, suffix="", shard_size=lambda path: len(shard_uids(path))
+    )
+    index = index_shards(args.output_dir)
+    print(f"Failed to export {len(paths) - exported} objects, {len(index)} objects indexed")
+
+
+def shard_uids(shard_path: str) -> List[str]:
+    """Returns the uids of a shard, empty if the shard is incomplete."""
+    path = shard_path + UIDS_SUFFIX
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "export":
+        export(args, ObjectLocator(args.objects_dir))
+    else:
+        print(f"{len(index_shards(args.output_dir))} objects indexed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Metadata query to id files
+
+Selects the objects whose metadata (see metadata_scripts/metadata_table.py)
+matches a query like `poly_count<50000 and armature_count>0 and
+material_count>=1` (see metadata_scripts/metadata_query.py) and writes them as
+an id file in the `{group: [separate_flag, [uids]]}` format of download.py and
+render.py, instead of editing id files like src/three_groups.json by hand:
+    - by default all matching objects form one group,
+    - with --group_size K random matching objects (--seed) are split into
+      groups of K objects, as many as they fill or --num_groups N, every object
+      is used at most once,
+    - --separate 1 renders every object of the groups on its own, 0 renders
+      every group as one scene.
+
+A query can also use the flags of the bitmap index (see
+metadata_scripts/bitmap_index.py), e.g. `has_armature and not is_usdz and
+group:chairs`: is_<extension> needs --objects_dir, group:<name> needs
+--groups_path, and --flag_file quarantine=quarantine.json adds a flag from a
+file with a list of uids or an id file. The index is only loaded when the query
+uses a flag.
+
+Usage:
+    python3 scripts/query_objects.py --metadata_dir metadata/ \
+        --query "poly_count<50000 and armature_count>0" \
+        --num_groups 100 --group_size 5 --separate 0 --output src/ids/rigged_scenes.json
+    python3 scripts/render.py --id_file_path src/ids/rigged_scenes.json
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from group_store import GroupStore, write_json_atomic
+from metadata_scripts.bitmap_index import load_flags
+from metadata_scripts.metadata_query import parse_query, query_flags, query_mask
+from metadata_scripts.metadata_table import MetadataTable
+from render_scripts.object_locator import ObjectLocator
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--metadata_dir
+        "--metadata_dir",
+        type=str,
+        required=True,
+        help="The --save_path of metadata_multiproc.py")
+    parser.add_argument( #--query
+        "--query",
+        type=str,
+        default="",
+        help="Predicate over the metadata columns, e.g. \"poly_count<50000 and armature_count>0\", empty for all objects")
+    parser.add_argument( #--output
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the id file to write, without it only the number of matches is printed")
+    parser.add_argument( #--group_size
+        "--group_size",
+        type=int,
+        default=None,
+        help="Objects per group, the matches are shuffled and split into groups of this size")
+    parser.add_argument( #--num_groups
+        "--num_groups",
+        type=int,
+        default=None,
+        help="Number of groups of --group_size objects, defaults to as many as the matches fill")
+    parser.add_argument( #--separate
+        "--separate",
+        type=int,
+        default=0,
+        choices=[0, 1],
+        help="Separate flag of the groups, 1 renders every object on its own, 0 every group as one scene")
+    parser.add_argument( #--group_prefix
+        "--group_prefix",
+        type=str,
+        default="group",
+        help="Names of the groups are <group_prefix>_<n>")
+    parser.add_argument( #--seed
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the shuffle of the matches")
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default=None,
+        help="Directory of the object files, for the is_<extension> flags")
+    parser.add_argument( #--groups_path
+        "--groups_path",
+        type=str,
+        default=None,
+        help="Group store of group_store.py, for the group:<name> flags")
+    parser.add_argument( #--flag_file
+        "--flag_file",
+        type=str,
+        action="append",
+        default=[],
+        help="<name>=<path> of a flag, the path is a JSON list of uids or an id file, can be repeated")
+    return parser.parse_args()
+
+
+def read_uid_list(path: str) -> List[str]:
+    """Reads the uids of a JSON list of uids or of all groups of an id file."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [uid for _, uids in data.values() for uid in uids]
+    return list(data)
+
+
+def make_groups(
+    uids: np.ndarray,
+    group_size: Optional[int] = None,
+    num_groups: Optional[int] = None,
+    seed: int = 0,
+) -> List[List[str]]:
+    """Splits uids into groups.
+
+    Args:
+        uids (np.ndarray): The matching uids.
+        group_size (Optional[int], optional): Objects per group. Defaults to None,
+            one group of all uids in their order.
+        num_groups (Optional[int], optional): Number of groups. Defaults to None,
+            as many full groups as the uids fill.
+        seed (int, optional): Seed of the shuffle. Defaults to 0.
+
+    Raises:
+        ValueError: If num_groups is given without group_size, or if there are
+            fewer uids than num_groups * group_size, every object is used at
+            most once.
+
+    Returns:
+        List[List[str]]: The uids of every group.
+    """
+    if group_size is None:
+        if num_groups is not None:
+            raise ValueError("--num_groups needs --group_size")
+        return [uids.tolist()] if len(uids) else []
+    if group_size < 1:
+        raise ValueError("The group size must be at least 1")
+    available = len(uids) // group_size
+    num_groups = available if num_groups is None else num_groups
+    if num_groups > available:
+        raise ValueError(
+            f"{num_groups} groups of {group_size} need {num_groups * group_size} objects, the query matches {len(uids)}"
+        )
+    rng = np.random.default_rng(seed)
+    selected = uids[rng.choice(len(uids), num_groups * group_size, replace=False)]
+    return [group.tolist() for group in selected.reshape(num_groups, group_size)] if num_groups else []
+
+
+def id_file(groups: List[List[str]], separate: int, prefix: str) -> Dict[str, list]:
+    """Returns the id file of the groups, {<prefix>_<n>: [separate, [uids]]}."""
+    return {f"{prefix}_{i + 1}": [separate, uids] for i, uids in enumerate(groups)}
+
+
+def main():
+    args = parse_arguments()
+    table = MetadataTable.load(args.metadata_dir)
+
+    start = time.perf_counter()
+    try:
+        query = parse_query(args.query) if args.query.strip() else ""
+        flags = None
+        if query and query_flags(query):
+            uid_lists = {}
+            for text in args.flag_file:
+                name, _, path = text.partition("=")
+                uid_lists[name] = read_uid_list(path)
+            flags = load_flags(
+                args.metadata_dir,
+                table,
+                paths=ObjectLocator(args.objects_dir).paths if args.objects_dir else None,
+                groups=GroupStore(args.groups_path).groups() if args.groups_path else None,
+                uid_lists=uid_lists,
+            )
+        mask = query_mask(table, query, flags)
+    except (ValueError, KeyError) as error:
+        print(f"Invalid query: {error.args[0]}")
+        exit(1)
+    uids = table.uids[mask]
+    seconds = time.perf_counter() - start
+    print(f"{len(uids)} of {len(table)} objects match the query ({seconds * 1000:.1f} ms)")
+
+    try:
+        groups = make_groups(uids, args.group_size, args.num_groups, args.seed)
+    except ValueError as error:
+        print(error)
+        exit(1)
+    if args.output:
+        write_json_atomic(args.output, id_file(groups, args.separate, args.group_prefix))
+        print(f"Wrote {len(groups)} groups of {sum(len(group) for group in groups)} objects to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Work queue worker
+
+Claims render and metadata tasks from a shared work queue (see work_queue.py),
+runs them and marks them done or failed. Start any number of workers on any
+number of nodes against the same queue file, e.g. one per GPU:
+
+    python3 scripts/queue_worker.py --queue_path /shared/render_queue.sqlite --gpu_id 0
+    python3 scripts/queue_worker.py --queue_path /shared/render_queue.sqlite --gpu_id 1
+
+A task payload holds the command to run, with "{gpu_id}" replaced by the
+--gpu_id of the worker, plus optional "name" (of the task log, defaults to the
+queue key), "env" and "cwd" entries. render.py and
+run_metadata.py fill the queue with --queue_path. While a task runs, a heartbeat
+thread extends its lease. If the worker dies, the lease expires and another
+worker picks the task up again.
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+
+from render_scripts.supervisor import run_task, start_log_listener, stop_log_listener
+from work_queue import Task, WorkQueue
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--queue_path
+        "--queue_path",
+        type=str,
+        required=True,
+        help="Path of the SQLite queue file")
+    parser.add_argument( #--worker_id
+        "--worker_id",
+        type=str,
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="Id of the worker, defaults to <hostname>-<pid>")
+    parser.add_argument( #--gpu_id
+        "--gpu_id",
+        type=int,
+        default=0,
+        help="GPU of the worker, sets CUDA_VISIBLE_DEVICES and replaces {gpu_id} in commands")
+    parser.add_argument( #--kinds
+        "--kinds",
+        type=str,
+        default=None,
+        help="Comma separated task kinds to claim (render, metadata), defaults to all")
+    parser.add_argument( #--lease_seconds
+        "--lease_seconds",
+        type=float,
+        default=300.0,
+        help="Length of a lease")
+    parser.add_argument( #--heartbeat_interval
+        "--heartbeat_interval",
+        type=float,
+        default=60.0,
+        help="Seconds between heartbeats, must be well below --lease_seconds")
+    parser.add_argument( #--poll_interval
+        "--poll_interval",
+        type=float,
+        default=10.0,
+        help="Seconds to wait when no task is queued")
+    parser.add_argument( #--max_tasks
+        "--max_tasks",
+        type=int,
+        default=0,
+        help="Exit after this many tasks, 0 means no limit")
+    parser.add_argument( #--exit_when_empty
+        "--exit_when_empty",
+        type=int,
+        default=1,
+        help="Exit when no task is queued or leased by any worker")
+    parser.add_argument( #--log_dir
+        "--log_dir",
+        type=str,
+        default="logs/",
+        help="Directory of the per-task logs")
+    return parser.parse_args()
+
+
+def heartbeat_loop(
+    args, task: Task, stop: threading.Event, lease_lost: threading.Event
+) -> None:
+    """Extends the lease of the task every --heartbeat_interval seconds until stopped."""
+    queue = WorkQueue(args.queue_path, args.lease_seconds)
+    while not stop.wait(args.heartbeat_interval):
+        if not queue.heartbeat(task.id, args.worker_id):
+            lease_lost.set()
+            break
+    queue.close()
+
+
+def execute_task(args, task: Task) -> dict:
+    """Runs the command of a task with the GPU of the worker."""
+    gpu_id = str(args.gpu_id)
+    command = [part.replace("{gpu_id}", gpu_id) for part in task.payload["command"]]
+    env = dict(os.environ, **task.payload.get("env", {}))
+    env["CUDA_VISIBLE_DEVICES"] = gpu_id
+    cwd = task.payload.get("cwd")
+    if cwd and not os.path.isdir(cwd):
+        cwd = None
+    return run_task(command, task.payload.get("name", task.task_key), env, cwd=cwd)
+
+
+def main():
+    args = parse_arguments()
+    kinds = args.kinds.split(",") if args.kinds else None
+    queue = WorkQueue(args.queue_path, args.lease_seconds)
+    log_queue, log_listener = start_log_listener(args.log_dir)
+
+    finished_tasks = 0
+    while not args.max_tasks or finished_tasks < args.max_tasks:
+        task = queue.claim(args.worker_id, kinds)
+        if task is None:
+            if args.exit_when_empty and queue.is_finished():
+                break
+            time.sleep(args.poll_interval)
+            continue
+
+        print(f"[{args.worker_id}] claimed {task.kind} task {task.task_key} (attempt {task.attempts})")
+        stop = threading.Event()
+        lease_lost = threading.Event()
+        heartbeat = threading.Thread(target=heartbeat_loop, args=(args, task, stop, lease_lost), daemon=True)
+        heartbeat.start()
+        result = execute_task(args, task)
+        stop.set()
+        heartbeat.join()
+
+        if lease_lost.is_set():
+            print(f"[{args.worker_id}] lost the lease of {task.task_key}, result discarded")
+        elif result["returncode"] == 0:
+            queue.complete(task.id, args.worker_id, result)
+        else:
+            queue.fail(task.id, args.worker_id, f"exit code {result['returncode']}")
+        finished_tasks += 1
+
+    stop_log_listener(log_queue, log_listener)
+    print(f"[{args.worker_id}] finished {finished_tasks} tasks, queue: {queue.counts()}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
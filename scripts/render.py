@@ -8,9 +8,22 @@ import sys
 import random
 import time
 import logging
+import glob
 
 import concurrent.futures
 
+from metadata_scripts.metadata_table import MetadataTable
+from render_scripts.aov_passes import PASS_FORMATS, parse_passes
+from render_scripts.metrics import RunMetrics, export_metrics
+from render_scripts.poly_budget import triangle_budget
+from render_scripts.profiling import configure_profiling, record, span
+from render_scripts.render_output import TarShardOutput, iter_index_members, read_member
+from render_scripts.render_profiles import RENDER_PROFILES
+from render_scripts.scene_layout import LAYOUTS
+from render_scripts.supervisor import (init_worker_logging, run_task, start_log_listener,
+                                       stop_log_listener, summarize_tasks)
+from work_queue import WorkQueue
+
 def parse_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument( #--id_file_path
@@ -46,13 +59,122 @@ def parse_arguments():
         "--engine", 
         type=str, 
         default="CYCLES", 
-        choices=["CYCLES", "BLENDER_EEVEE"],
+        choices=["CYCLES", "BLENDER_EEVEE", "BLENDER_WORKBENCH"],
         help="")
+    parser.add_argument( #--render_profile
+        "--render_profile",
+        type=str,
+        default="legacy",
+        choices=sorted(RENDER_PROFILES),
+        help="Render profile of every job, see render_scripts/render_profiles.py")
+    parser.add_argument( #--group_profiles
+        "--group_profiles",
+        type=str,
+        default=None,
+        help="Path to json file mapping group names to render profiles, overrides --render_profile per job")
     parser.add_argument( #--only_northern_hemisphere
         "--only_northern_hemisphere",
         type=int,
         help="Only render the northern hemisphere of the object.",
         default=0)
+    parser.add_argument( #--output_format
+        "--output_format",
+        type=str,
+        default="files",
+        choices=["files", "tar"],
+        help="Keep loose image and json files, or collect them into size-bounded tar shards of the run")
+    parser.add_argument( #--shard_max_bytes
+        "--shard_max_bytes",
+        type=int,
+        default=1 << 30,
+        help="Maximum size of a tar shard in bytes")
+    parser.add_argument( #--layout
+        "--layout",
+        type=str,
+        default="shelf",
+        choices=LAYOUTS,
+        help="Layout of the objects of a group scene, see render_scripts/scene_layout.py")
+    parser.add_argument( #--import_cache_dir
+        "--import_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the import cache shared by all Blender tasks, see render_scripts/import_cache.py")
+    parser.add_argument( #--texture_cache_dir
+        "--texture_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the texture cache shared by all Blender tasks, see render_scripts/texture_cache.py")
+    parser.add_argument( #--max_texture_size
+        "--max_texture_size",
+        type=int,
+        default=0,
+        help="Largest texture side with --texture_cache_dir, 0 derives it from --resolution")
+    parser.add_argument( #--max_triangles
+        "--max_triangles",
+        type=int,
+        default=0,
+        help="Triangle budget of a scene, larger scenes are decimated, 0 means no budget, see render_scripts/poly_budget.py")
+    parser.add_argument( #--max_scene_memory_mb
+        "--max_scene_memory_mb",
+        type=float,
+        default=0,
+        help="Geometry memory budget of a scene in MB, converted to triangles, 0 means no budget")
+    parser.add_argument( #--metadata_dir
+        "--metadata_dir",
+        type=str,
+        default=None,
+        help="Metadata of metadata_multiproc.py, its poly counts show which tasks exceed the triangle budget before rendering")
+    parser.add_argument( #--passes
+        "--passes",
+        type=str,
+        default="",
+        help="Comma separated render passes written with every view (depth, normal, index), see render_scripts/aov_passes.py")
+    parser.add_argument( #--pass_format
+        "--pass_format",
+        type=str,
+        default="exr",
+        choices=PASS_FORMATS,
+        help="Half float EXR or 16-bit PNG files for the render passes")
+    parser.add_argument( #--timings_dir
+        "--timings_dir",
+        type=str,
+        default=None,
+        help="Directory to write per-task timing spans (JSONL) to, summarize them with timings_report.py")
+    parser.add_argument( #--log_dir
+        "--log_dir",
+        type=str,
+        default=None,
+        help="Directory of the per-task Blender logs, defaults to <output_dir>/logs")
+    parser.add_argument( #--retries
+        "--retries",
+        type=int,
+        default=2,
+        help="Number of times a failed Blender task is retried")
+    parser.add_argument( #--retry_backoff
+        "--retry_backoff",
+        type=float,
+        default=10.0,
+        help="Seconds to wait before the first retry, doubled for every further retry")
+    parser.add_argument( #--queue_path
+        "--queue_path",
+        type=str,
+        default=None,
+        help="Add the render tasks to this shared SQLite work queue instead of rendering, run them with queue_worker.py")
+    parser.add_argument( #--metrics_port
+        "--metrics_port",
+        type=int,
+        default=None,
+        help="Serve the progress metrics of the run for Prometheus at http://<host>:<port>/metrics")
+    parser.add_argument( #--metrics_textfile
+        "--metrics_textfile",
+        type=str,
+        default=None,
+        help="Rewrite the progress metrics to this .prom file for the textfile collector of node_exporter")
+    parser.add_argument( #--dedup_map
+        "--dedup_map",
+        type=str,
+        default=None,
+        help="Dedup map of dedup.py, duplicate objects are downloaded and rendered once")
     parser.add_argument("--azimuth_aug",  type=int, default=0)
     parser.add_argument("--elevation_aug", type=int, default=0,)
     parser.add_argument("--resolution", default=256)
@@ -87,6 +209,13 @@ def download_groups(args):
     download_args = [   "--id_file_path", args.id_file_path, 
                         "--save_path", args.save_path, 
                         "--store_in_save_path", str(args.store_in_save_path)]
+    if args.dedup_map:
+        download_args += ["--dedup_map", args.dedup_map]
+    # download.py exports the metrics of the download stage before the render starts
+    if args.metrics_port is not None:
+        download_args += ["--metrics_port", str(args.metrics_port)]
+    if args.metrics_textfile:
+        download_args += ["--metrics_textfile", args.metrics_textfile]
     subprocess.run(["python3", download_py_path] + download_args)
 
     
@@ -126,14 +255,100 @@ def download_groups(args):
                 group_names.append(group_name)
 
     return groups, group_names, separates, separate_names
-            
-    
 
+
+def load_group_profiles(args):
+    """Returns the render profile of every group, defaulting to --render_profile."""
+    group_profiles = {}
+    if args.group_profiles:
+        with open(args.group_profiles, "r") as f:
+            group_profiles = json.load(f)
+    for group, profile in group_profiles.items():
+        if profile not in RENDER_PROFILES:
+            print(f"Unknown render profile '{profile}' for group '{group}', choose from {sorted(RENDER_PROFILES)}")
+            exit(1)
+    return group_profiles
+
+
+def load_render_costs(output_dir):
+    """Yields the render cost records of the jobs in output_dir.
+
+    With --output_format files every blender_render.py job writes a
+    <task_key>_render_cost.json file next to its images, with tar the record is a
+    "<task_key>__render_cost.json" member of the shards.
+    """
+    pattern = os.path.join(output_dir, "**", "*_render_cost.json")
+    for cost_path in glob.glob(pattern, recursive=True):
+        with open(cost_path, "r") as f:
+            yield json.load(f)
+    for index_path in glob.glob(os.path.join(output_dir, "**", "*.index.json"), recursive=True):
+        for member in iter_index_members(index_path):
+            if member["name"].endswith("__render_cost.json"):
+                yield json.loads(read_member(member))
+
+
+def report_budget_tasks(render_tasks, metadata_dir, budget):
+    """Prints how many tasks exceed the triangle budget by the poly counts of the
+    metadata, a lower bound of their triangles. Blender counts the triangles again."""
+    table = MetadataTable.load(metadata_dir)
+    over, unknown, polygons = 0, 0, 0
+    for objects_paths, *_ in render_tasks:
+        uids = [os.path.splitext(os.path.basename(path))[0] for path in objects_paths]
+        ordinals = table.ordinals(uids)
+        counts = table.column("poly_count")[ordinals[ordinals >= 0]]
+        if len(counts) < len(uids) or (counts < 0).any():
+            unknown += 1
+            continue
+        polygons += int(counts.sum())
+        over += int(counts.sum()) > budget
+    print(f"Triangle budget {budget}: {over} of {len(render_tasks)} tasks are over it by their poly counts, "
+          f"{unknown} have no poly count, {polygons} polygons in the known tasks")
+
+
+def summarize_render_costs(output_dir):
+    """Aggregates the render cost records of a run per render profile.
+
+    The summary is printed and saved to render_costs.json in output_dir.
+    """
+    summary = {}
+    for cost in load_render_costs(output_dir):
+        entry = summary.setdefault(cost["profile"]["name"], {
+            "jobs": 0, "views": 0, "total_seconds": 0.0, "over_budget": 0, "renders_saved": 0,
+            "decimated_jobs": 0, "decimated_views": 0, "decimated_seconds": 0.0, "triangles_removed": 0,
+        })
+        entry["jobs"] += 1
+        entry["views"] += cost["num_views"]
+        entry["total_seconds"] += cost["total_seconds"]
+        entry["over_budget"] += int(cost["over_budget"])
+        # views of static scenes saved under two names, rendered once
+        entry["renders_saved"] += cost.get("renders_saved", 0)
+        # jobs over the triangle budget, their seconds per view against the others
+        # show the time saved by decimating
+        triangle_budget = cost.get("triangle_budget")
+        if triangle_budget and triangle_budget["triangles"] < triangle_budget["source_triangles"]:
+            entry["decimated_jobs"] += 1
+            entry["decimated_views"] += cost["num_views"]
+            entry["decimated_seconds"] += cost["total_seconds"]
+            entry["triangles_removed"] += triangle_budget["source_triangles"] - triangle_budget["triangles"]
+
+    for profile, entry in summary.items():
+        entry["seconds_per_view"] = entry["total_seconds"] / max(entry["views"], 1)
+        print(f"Profile {profile}: {entry['jobs']} jobs, {entry['views']} views, "
+              f"{entry['seconds_per_view']:.2f}s per view, {entry['over_budget']} over budget, "
+              f"{entry['renders_saved']} renders saved")
+        if entry["decimated_jobs"]:
+            print(f"    {entry['decimated_jobs']} jobs decimated to the triangle budget, {entry['triangles_removed']} "
+                  f"triangles removed, {entry['decimated_seconds'] / max(entry['decimated_views'], 1):.2f}s per view")
+
+    with open(os.path.join(output_dir, "render_costs.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
     
-# Render command execution function for multiprocessing
-# def execute_command(args, objects_paths, gpu_id, separate_render):
-def execute_command(objects_paths, save_file_name, gpu_id, separate_render):
+
     
+def build_command(objects_paths, save_file_name, gpu_id, separate_render, render_profile):
+    """Returns the task key, the output directory and the blender_render.py command
+    of a render task."""
     output_dir_name = args.id_file_path.split('.')[-2]
     
     if args.azimuth_aug:
@@ -151,41 +366,101 @@ def execute_command(objects_paths, save_file_name, gpu_id, separate_render):
     # output dir + name of json file + elevation/azimuth
     output_dir_path = os.path.join(args.output_dir,  output_dir_name, save_file_name)
 
-    command = f'CUDA_VISIBLE_DEVICES={gpu_id} export DISPLAY=:0.1 && scripts/blender-3.2.2-linux-x64/blender \
-        --background --python scripts/blender_render.py -- \
-            --objects_paths {",".join(objects_paths)} \
-            --separate {separate_render} \
-            --output_dir {output_dir_path} \
-            --gpu_id {gpu_id} \
-            --num_images {args.num_images} \
-            --azimuth {azimuth}\
-            --elevation {elevation}\
-            --resolution {args.resolution} \
-            --mode_multi {args.mode_multi}\
-            --mode_static {args.mode_static}\
-            --mode_front {args.mode_front_view}\
-            --mode_four_view {args.mode_four_view}\
-            --engine {args.engine} \
-            --only_northern_hemisphere {args.only_northern_hemisphere}'
-
-    # Setting up logger
-    logger = logging.getLogger("my_logger")
-    # TODO task id ami összeáll a group name-ből vagy az obj id-ből
-    logger.setLevel(logging.INFO)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # separate objects are keyed by their uid, group scenes by the group name
+    if separate_render:
+        task_key = os.path.splitext(os.path.basename(objects_paths[0]))[0]
+    else:
+        task_key = save_file_name
+
+    command = [
+        "scripts/blender-3.2.2-linux-x64/blender",
+        "--background", "--python", "scripts/blender_render.py", "--",
+        "--objects_paths", ",".join(objects_paths),
+        "--separate", str(separate_render),
+        "--output_dir", output_dir_path,
+        "--gpu_id", str(gpu_id),
+        "--num_images", str(args.num_images),
+        "--azimuth", str(azimuth),
+        "--elevation", str(elevation),
+        "--resolution", str(args.resolution),
+        "--mode_multi", str(args.mode_multi),
+        "--mode_static", str(args.mode_static),
+        "--mode_front", str(args.mode_front_view),
+        "--mode_four_view", str(args.mode_four_view),
+        "--engine", args.engine,
+        "--render_profile", render_profile,
+        "--output_format", args.output_format,
+        "--shard_max_bytes", str(args.shard_max_bytes),
+        "--layout", args.layout,
+        "--task_key", task_key,
+        "--only_northern_hemisphere", str(args.only_northern_hemisphere),
+    ]
+    if args.passes:
+        command += ["--passes", args.passes, "--pass_format", args.pass_format]
+    if args.import_cache_dir:
+        command += ["--import_cache_dir", args.import_cache_dir]
+    if args.max_triangles:
+        command += ["--max_triangles", str(args.max_triangles)]
+    if args.max_scene_memory_mb:
+        command += ["--max_scene_memory_mb", str(args.max_scene_memory_mb)]
+    if args.texture_cache_dir:
+        command += ["--texture_cache_dir", args.texture_cache_dir, "--max_texture_size", str(args.max_texture_size)]
+    if args.timings_dir:
+        command += ["--timings_dir", args.timings_dir]
+    return task_key, output_dir_path, command
+
+
+def run_shard_prefix():
+    """Returns the prefix of the run level tar shards, unique per run."""
+    id_file_name = os.path.splitext(os.path.basename(args.id_file_path))[0]
+    return f"{id_file_name}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+def enqueue_tasks(render_tasks):
+    """Adds the render tasks to the shared work queue instead of running them.
+
+    The GPU is chosen by the worker that claims the task (see queue_worker.py).
+    The queue key is the output directory of the task plus its uid or group name,
+    so runs of other id files, output dirs or augmentations into the same queue are
+    not mistaken for tasks that are already queued.
+    """
+    queue = WorkQueue(args.queue_path)
+    added = 0
+    for objects_paths, save_file_name, _, separate_render, render_profile in render_tasks:
+        task_key, output_dir_path, command = build_command(
+            objects_paths, save_file_name, "{gpu_id}", separate_render, render_profile)
+        queue_key = os.path.join(os.path.abspath(output_dir_path), task_key)
+        payload = {"name": task_key, "command": command, "env": {"DISPLAY": ":0.1"}, "cwd": os.getcwd()}
+        added += queue.enqueue("render", queue_key, payload, max_attempts=args.retries + 1)
+    print(f"Enqueued {added} of {len(render_tasks)} render tasks to {args.queue_path}, queue: {queue.counts()}")
+    queue.close()
+
+
+# Render command execution function for multiprocessing
+# def execute_command(args, objects_paths, gpu_id, separate_render):
+def execute_command(objects_paths, save_file_name, gpu_id, separate_render, render_profile):
+    task_key, output_dir_path, command = build_command(
+        objects_paths, save_file_name, gpu_id, separate_render, render_profile)
+    if args.timings_dir:
+        configure_profiling(os.path.join(args.timings_dir, f"{task_key}.jsonl"), task_key)
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(gpu_id), DISPLAY=":0.1")
 
     #running
-    result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    logger.info(f"Executing command: {command}")
-    logger.info(result.stdout.decode())
-    logger.error(result.stderr.decode())
+    result = run_task(command, task_key, env, args.retries, args.retry_backoff)
+    # one record per attempt, so the retry backoff is not counted as Blender time
+    # and the peak memory is Blender's, not of this pool worker
+    for attempt_run in result["attempt_runs"]:
+        record("blender_task", gpu_id=gpu_id, num_objects=len(objects_paths), **attempt_run)
+    result["output_dir"] = output_dir_path
+    result["gpu_id"] = gpu_id
+    result["num_objects"] = len(objects_paths)
+    return result
+
+
+def execute_task(task):
+    return execute_command(*task)
+
 
-   
-    
 
 if __name__ == "__main__":
     args = parse_arguments()
@@ -195,8 +470,17 @@ if __name__ == "__main__":
     if not os.path.exists(args.id_file_path):
         print(f"The given --id_file_path file does not exist: {args.id_file_path}")
         exit(1)
+    try:
+        parse_passes(args.passes)
+    except ValueError as e:
+        print(e)
+        exit(1)
 
-    groups, group_names, separates, separate_names = download_groups(args)
+    if args.timings_dir:
+        configure_profiling(os.path.join(args.timings_dir, "render_py.jsonl"), "render_py")
+    with span("download"):
+        groups, group_names, separates, separate_names = download_groups(args)
+    group_profiles = load_group_profiles(args)
 
     os.makedirs(args.output_dir, exist_ok=True)
 
@@ -205,17 +489,66 @@ if __name__ == "__main__":
 
     # Assign each group (non-separated) to a specific GPU
     for i, group in enumerate(groups):
-        render_tasks.append((group, group_names[i], i % args.num_of_gpus, False))
+        render_profile = group_profiles.get(group_names[i], args.render_profile)
+        render_tasks.append((group, group_names[i], i % args.num_of_gpus, False, render_profile))
 
     # Assign each separate object to a GPU
     k = 0
     for i, sep_objects in enumerate(separates):
+        render_profile = group_profiles.get(separate_names[i], args.render_profile)
         for obj in sep_objects:
             k=k+1
-            render_tasks.append(([obj], separate_names[i], k % args.num_of_gpus, True))
+            render_tasks.append(([obj], separate_names[i], k % args.num_of_gpus, True, render_profile))
 
-    # Execute rendering tasks in parallel on available GPUs
-    with multiprocessing.Pool(processes=gpu_count) as pool:
-        pool.starmap(execute_command, render_tasks)
-        
-    print("Rendering process completed.")
\ No newline at end of file
+    budget = triangle_budget(args.max_triangles, args.max_scene_memory_mb)
+    if budget is not None and args.metadata_dir:
+        report_budget_tasks(render_tasks, args.metadata_dir, budget)
+
+    if args.queue_path:
+        enqueue_tasks(render_tasks)
+        exit(0)
+
+    # Execute rendering tasks in parallel on available GPUs, their output is streamed
+    # to one log file per task by a single log listener process
+    log_queue, log_listener = start_log_listener(args.log_dir or os.path.join(args.output_dir, "logs"))
+    # with tar output the shards of every finished job are moved into the shards of
+    # the run, which only this process writes
+    run_output = None
+    if args.output_format == "tar":
+        run_output = TarShardOutput(args.output_dir, run_shard_prefix(), args.shard_max_bytes)
+    # the pool returns every finished task to this process, which keeps the metrics
+    metrics = RunMetrics("render", sum(len(task[0]) for task in render_tasks))
+    exporter = export_metrics(metrics, args.metrics_port, args.metrics_textfile)
+    results = []
+    with multiprocessing.Pool(processes=gpu_count, initializer=init_worker_logging, initargs=(log_queue,)) as pool:
+        for result in pool.imap_unordered(execute_task, render_tasks):
+            results.append(result)
+            ok = result["returncode"] == 0
+            attempts_seconds = sum(run["duration_s"] for run in result["attempt_runs"])
+            metrics.task_done(
+                attempts_seconds,
+                completed=result["num_objects"] if ok else 0,
+                failed=0 if ok else result["num_objects"],
+                device=f"gpu{result['gpu_id']}",
+            )
+            for attempt_run in result["attempt_runs"]:
+                metrics.observe("blender_task", attempt_run["duration_s"])
+            job_dir = result["output_dir"]
+            if run_output is not None and os.path.exists(os.path.join(job_dir, f"{result['task']}.index.json")):
+                start = time.perf_counter()
+                run_output.add_job(job_dir, result["task"], os.path.relpath(job_dir, args.output_dir))
+                metrics.observe("collect_shards", time.perf_counter() - start)
+                if not os.listdir(job_dir):
+                    os.rmdir(job_dir)
+    if run_output is not None:
+        run_output.close()
+    if exporter is not None:
+        exporter.close()
+    stop_log_listener(log_queue, log_listener)
+
+    summary = summarize_tasks(results, os.path.join(args.output_dir, "run_summary.json"))
+    summarize_render_costs(args.output_dir)
+    print("Rendering process completed.")
+    # let batch drivers detect failed tasks
+    if summary["failed"] > 0:
+        exit(1)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""Render passes (AOVs) written next to the RGBA images by blender_render.py.
+
+The passes come from the same render call as the image: blender_render.py
+enables them on the view layer and writes them with one compositor File Output
+node, so every view is rendered once whatever passes are enabled:
+    - depth: distance to the camera plane (Z pass),
+    - normal: world space normals (Normal pass),
+    - index: the pass index of the object a pixel shows (Object Index pass), 0 on
+      the background. load_objects gives every object of a group scene its own
+      index, so the pass is the instance mask of the scene.
+The formats are:
+    - exr: half float OpenEXR with ZIP compression, the raw values,
+    - png16: 16-bit PNG, the values are mapped to [0, 1] as given by PNG_ENCODING,
+      the index is stored as the integer pixel value.
+A pass of the view "multi_frame3" is written to multi_frame3_depth.exr.
+
+Cycles renders all passes, EEVEE has no Object Index pass and Workbench none of
+them, unsupported passes are dropped with a warning.
+
+This module does not import bpy, so render.py can validate the arguments.
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+PASSES = ("depth", "normal", "index")
+PASS_FORMATS = ("exr", "png16")
+
+# view layer flag and Render Layers output socket of every pass
+PASS_SOCKETS: Dict[str, Tuple[str, str]] = {
+    "depth": ("use_pass_z", "Depth"),
+    "normal": ("use_pass_normal", "Normal"),
+    "index": ("use_pass_object_index", "IndexOB"),
+}
+
+# passes every engine can render
+ENGINE_PASSES: Dict[str, Tuple[str, ...]] = {
+    "CYCLES": ("depth", "normal", "index"),
+    "BLENDER_EEVEE": ("depth", "normal"),
+    "BLENDER_WORKBENCH": (),
+}
+
+# png16 stores (value - offset) * scale, the depth is clamped to 8 scene units,
+# twice the farthest camera of the unit cube scene
+PNG_DEPTH_MAX = 8.0
+PNG_ENCODING: Dict[str, Dict[str, float]] = {
+    "depth": {"offset": 0.0, "scale": 1.0 / PNG_DEPTH_MAX},
+    "normal": {"offset": -1.0, "scale": 0.5},
+    "index": {"offset": 0.0, "scale": 1.0 / 65535},
+}
+
+
+def parse_passes(passes: str) -> List[str]:
+    """Returns the passes of a comma separated list, e.g. "depth,index".
+
+    Raises:
+        ValueError: If a pass is unknown.
+    """
+    names = [name.strip() for name in passes.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(PASSES))
+    if unknown:
+        raise ValueError(f"Unknown render passes {unknown}, choose from {list(PASSES)}")
+    return list(dict.fromkeys(names))
+
+
+def supported_passes(passes: List[str], engine: str) -> Tuple[List[str], List[str]]:
+    """Returns the passes the engine renders and the ones it does not."""
+    supported = ENGINE_PASSES.get(engine, ())
+    return [name for name in passes if name in supported], [name for name in passes if name not in supported]
+
+
+def pass_extension(pass_format: str) -> str:
+    return ".exr" if pass_format == "exr" else ".png"
+
+
+def pass_path(output_dir: str, view_name: str, name: str, pass_format: str) -> str:
+    """Returns the path of a pass of a view, e.g. <output_dir>/multi_frame3_depth.exr."""
+    return os.path.join(output_dir, f"{view_name}_{name}{pass_extension(pass_format)}")
+
+
+class PassStats:
+    """Size of the files written per pass.
+
+    The passes share the render call of their view, so their render time is part
+    of the view seconds of RenderBudget; what a pass costs on its own is the
+    compositing and the storage, recorded here.
+    """
+
+    def __init__(self, passes: List[str], pass_format: str) -> None:
+        self.passes = passes
+        self.pass_format = pass_format
+        self.files = {name: 0 for name in passes}
+        self.bytes = {name: 0 for name in passes}
+        self.seconds = 0.0
+
+    def add(self, name: str, path: str) -> None:
+        """Records a written pass file."""
+        self.files[name] += 1
+        self.bytes[name] += os.path.getsize(path)
+
+    def summary(self) -> Dict:
+        """Returns the record of the passes for the render cost record."""
+        summary = {
+            "format": self.pass_format,
+            "collect_seconds": self.seconds,
+            "passes": {
+                name: {"files": self.files[name], "bytes": self.bytes[name]} for name in self.passes
+            },
+        }
+        if self.pass_format == "png16":
+            summary["encoding"] = {name: PNG_ENCODING[name] for name in self.passes}
+        return summary
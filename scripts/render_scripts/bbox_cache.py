@@ -0,0 +1,38 @@
+"""Cache of the scene bounding boxes of blender_render.py.
+
+scene_bbox is called for every rendered view (camera placement and metadata),
+but the geometry of a scene only changes at a few known points: when objects are
+loaded or deleted, when the scene is normalized or laid out, when the frame of an
+animated scene changes and when meshes are decimated. The cache holds the box of
+every (object, ignore_matrix, exact) query and is cleared at these points with
+invalidate(), instead of comparing all world matrices on every call, which costs
+about as much as the corner box it saves.
+"""
+
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+Box = TypeVar("Box")
+
+
+class BBoxCache:
+    """Bounding boxes of the current geometry, cleared explicitly."""
+
+    def __init__(self) -> None:
+        self.boxes: Dict[Hashable, Tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, compute: Callable[[], Tuple[Box, Box]]) -> Tuple[Box, Box]:
+        """Returns the cached box of a query, computes it on the first call since
+        the last invalidate()."""
+        box = self.boxes.get(key)
+        if box is None:
+            self.misses += 1
+            box = self.boxes[key] = compute()
+        else:
+            self.hits += 1
+        return box
+
+    def invalidate(self) -> None:
+        """Forgets all boxes, call it after any change of the scene geometry."""
+        self.boxes.clear()
@@ -0,0 +1,37 @@
+"""Dedup map of near-duplicate objects, written by dedup.py.
+
+The map is a json file whose "duplicates" entry maps every duplicate uid to the
+uid kept for its cluster. download.py and render.py (--dedup_map) replace the
+duplicates of an id file with the kept uid, so a separate group renders every
+cluster once, and a group scene keeps its number of objects but imports the
+mesh once (repeated uids share their imported data).
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+
+def load_dedup_map(path: str) -> Dict[str, str]:
+    """Returns the duplicate -> kept uid mapping of a dedup map file."""
+    with open(path, "r") as f:
+        return json.load(f)["duplicates"]
+
+
+def apply_dedup_map(uids: List[str], duplicates: Dict[str, str], separate: bool) -> Tuple[List[str], int]:
+    """Replaces the duplicates of a group with their kept uid.
+
+    Args:
+        uids (List[str]): Uids of the group.
+        duplicates (Dict[str, str]): The mapping of load_dedup_map.
+        separate (bool): Whether the objects of the group are rendered separately,
+            then repeated uids are dropped, a group scene keeps them.
+
+    Returns:
+        Tuple[List[str], int]: The uids in their order, and the number of
+        replaced duplicates.
+    """
+    replaced = sum(uid in duplicates for uid in uids)
+    kept = [duplicates.get(uid, uid) for uid in uids]
+    if separate:
+        kept = list(dict.fromkeys(kept))
+    return kept, replaced
@@ -0,0 +1,143 @@
+"""Near-duplicate detection of object geometry with MinHash and LSH.
+
+The fingerprint of an object is the MinHash signature of the set of grid cells
+its vertices fall in, after the vertices are moved to the center of their
+bounding box and scaled to unit size. Re-uploads of the same mesh (also
+rescaled, moved or with split vertices) share almost all cells. The fraction
+of equal signature entries of two objects estimates the Jaccard similarity of
+their cell sets.
+
+Locality-sensitive hashing finds the candidate pairs without comparing all
+pairs: the signature is cut into bands, objects with an equal band are
+candidates, and only the candidates are compared. Duplicates are merged into
+clusters with a union-find.
+
+This module does not import bpy, blender_geometry.py passes the vertices.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+GRID_SIZE = 32
+NUM_PERM = 128
+# 16 bands of 8 rows make pairs with a Jaccard similarity of about 0.7 or more candidates
+BANDS = 16
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _permutations(num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    """Returns the (a, b) coefficients of the hash functions (a * x + b) mod p."""
+    rng = np.random.default_rng(seed)
+    return np.stack([
+        rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.int64),
+        rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.int64),
+    ])
+
+
+PERMUTATIONS = _permutations()
+
+
+def vertex_cells(vertices: np.ndarray, grid_size: int = GRID_SIZE) -> np.ndarray:
+    """Returns the ids of the grid cells of the normalized vertices."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    size = (high - low).max()
+    if size <= 0 or not np.isfinite(size):
+        return np.zeros(1, dtype=np.int64)
+    normalized = (vertices - (low + high) / 2) / size + 0.5
+    cells = np.clip((normalized * grid_size).astype(np.int64), 0, grid_size - 1)
+    return np.unique((cells[:, 0] * grid_size + cells[:, 1]) * grid_size + cells[:, 2])
+
+
+def minhash_signature(vertices: np.ndarray) -> np.ndarray:
+    """Returns the uint32 MinHash signature of the grid cells of the vertices."""
+    cells = vertex_cells(vertices)
+    a, b = PERMUTATIONS
+    # a and the cell ids are below 2**31, the products fit in int64
+    hashes = (np.outer(cells, a) + b) % MERSENNE_PRIME
+    return hashes.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signatures: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """Returns an (N, bands) uint64 hash of every band of the signatures."""
+    rows = signatures.shape[1] // bands
+    multipliers = np.random.default_rng(2).integers(1, 1 << 62, rows, dtype=np.int64).astype(np.uint64)
+    banded = signatures[:, : bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    # multiply and add with uint64 wrap-around
+    with np.errstate(over="ignore"):
+        return (banded * multipliers).sum(axis=2, dtype=np.uint64)
+
+
+class UnionFind:
+    """Disjoint sets of row numbers with path halving and union by size."""
+
+    def __init__(self, size: int) -> None:
+        self.parent = np.arange(size)
+        self.size = np.ones(size, dtype=np.int64)
+
+    def find(self, row: int) -> int:
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return int(row)
+
+    def union(self, first: int, second: int) -> None:
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """Returns the (P, 2) row pairs that share a band, each row with the first row of its bucket."""
+    keys = band_keys(signatures, bands)
+    pairs = []
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind="stable")
+        sorted_keys = keys[order, band]
+        starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+        run_of = np.repeat(starts, np.diff(np.concatenate([starts, [len(order)]])))
+        followers = np.flatnonzero(run_of != np.arange(len(order)))
+        pairs.append(np.stack([order[run_of[followers]], order[followers]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def duplicate_clusters(
+    uids: List[str], signatures: np.ndarray, threshold: float = 0.9, bands: int = BANDS
+) -> List[List[str]]:
+    """Returns the clusters of near-duplicate objects, sorted by uid within a cluster.
+
+    Args:
+        uids (List[str]): Uid of every signature.
+        signatures (np.ndarray): (N, NUM_PERM) MinHash signatures.
+        threshold (float, optional): Minimum estimated Jaccard similarity of
+            duplicates. Defaults to 0.9.
+        bands (int, optional): Number of LSH bands. Defaults to BANDS.
+
+    Returns:
+        List[List[str]]: Clusters with more than one object.
+    """
+    if len(uids) < 2:
+        return []
+    pairs = candidate_pairs(signatures, bands)
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    duplicates = pairs[similarity >= threshold]
+    union_find = UnionFind(len(uids))
+    for first, second in duplicates:
+        union_find.union(first, second)
+    clusters: Dict[int, List[str]] = {}
+    for row in np.unique(duplicates):
+        clusters.setdefault(union_find.find(row), []).append(uids[row])
+    return sorted(sorted(cluster) for cluster in clusters.values() if len(cluster) > 1)
+
+
+def dedup_map(clusters: List[List[str]]) -> Dict[str, str]:
+    """Maps every duplicate uid to the uid kept for its cluster, the smallest one."""
+    return {uid: cluster[0] for cluster in clusters for uid in cluster[1:]}
@@ -0,0 +1,64 @@
+"""Image dimensions read from the file header, without decoding the pixels.
+
+Used to measure textures without making Blender load them. Supports PNG and
+JPEG, the formats embedded in GLB files.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers, all carry the image size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_header_size(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """Returns the width, height and bit depth per channel of a PNG or JPEG image.
+
+    Args:
+        data (bytes): Content of the image file, only the header is read.
+
+    Returns:
+        Optional[Tuple[int, int, int]]: Width, height and bit depth, None if the
+        format is unknown or the header is broken.
+    """
+    if data[:8] == PNG_SIGNATURE and len(data) >= 25:
+        # the IHDR chunk is always first
+        width, height, bit_depth = struct.unpack(">IIB", data[16:25])
+        return width, height, bit_depth
+    if data[:2] == b"\xff\xd8":
+        position = 2
+        while position + 9 <= len(data):
+            if data[position] != 0xFF:
+                return None
+            marker = data[position + 1]
+            if marker == 0xFF:  # fill byte
+                position += 1
+                continue
+            if marker in JPEG_SOF_MARKERS:
+                bit_depth, height, width = struct.unpack(">BHH", data[position + 4:position + 9])
+                return width, height, bit_depth
+            (length,) = struct.unpack(">H", data[position + 2:position + 4])
+            position += 2 + length
+    return None
+
+
+def read_image_header_size(path: str) -> Optional[Tuple[int, int, int]]:
+    """Returns the header size of an image file, see image_header_size.
+
+    JPEG headers can follow large EXIF blocks, so the file is read in growing
+    chunks until the size is found, up to the first 16 MB.
+    """
+    data = b""
+    chunk = 64 * 1024
+    with open(path, "rb") as f:
+        while len(data) < 16 * 2**20:
+            more = f.read(chunk)
+            if not more:
+                break
+            data += more
+            size = image_header_size(data)
+            if size is not None:
+                return size
+            chunk *= 2
+    return image_header_size(data)
@@ -0,0 +1,79 @@
+"""Cache of imported objects as .blend files.
+
+Importing a GLB, FBX or USDZ file is the slowest step of loading an object, and
+every render, augmentation rerun and metadata run imports the same files again.
+blender_render.py (import_object_file) saves the objects of every imported file
+once as a .blend file holding only them and their data (meshes, materials,
+packed images, actions), and later loads append that file, which skips the
+parsing, triangulation and vertex merging of the importer.
+
+The files are keyed by the sha256 of the source file, the Blender version that
+wrote them and the importer options (e.g. "merged" for glTF files imported with
+merge_vertices), `<cache_dir>/blender-<version>/<hash[:2]>/<hash>[_<options>].blend`,
+so a changed object, other options or a Blender upgrade never append a stale
+conversion.
+`imports.sqlite` memoizes the hash of every source path by its size and mtime.
+"""
+
+import os
+import uuid
+from typing import Optional
+
+from render_scripts.lod_cache import SourceHashes
+
+
+class ImportCache:
+    """Converted .blend files keyed by the content hash of their source file."""
+
+    def __init__(self, cache_dir: str, blender_version: str) -> None:
+        """Initializes the ImportCache.
+
+        Args:
+            cache_dir (str): Directory of the .blend files and of imports.sqlite,
+                can be shared by the workers of several nodes.
+            blender_version (str): Version of the running Blender, e.g. "3.2.2".
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.version_dir = os.path.join(cache_dir, f"blender-{blender_version}")
+        self.hashes = SourceHashes(os.path.join(cache_dir, "imports.sqlite"))
+
+    def close(self) -> None:
+        self.hashes.close()
+
+    def blend_path(self, digest: str, options: str = "") -> str:
+        """Returns the path of the conversion of a source hash, whether it exists or not."""
+        name = f"{digest}_{options}" if options else digest
+        return os.path.join(self.version_dir, digest[:2], f"{name}.blend")
+
+    def get(self, source_path: str, options: str = "") -> Optional[str]:
+        """Returns the path of the conversion of a source file imported with the
+        given options, None if not cached."""
+        path = self.blend_path(self.hashes.source_hash(source_path), options)
+        return path if os.path.exists(path) else None
+
+    def temporary_path(self) -> str:
+        """Returns a unique path to write a conversion to before put, on the
+        filesystem of the cache."""
+        os.makedirs(self.version_dir, exist_ok=True)
+        return os.path.join(self.version_dir, f"tmp_{uuid.uuid4().hex}.blend")
+
+    def put(self, source_path: str, blend_file: str, options: str = "") -> str:
+        """Moves a .blend file written for source_path into the cache.
+
+        Workers converting the same file at the same time replace each other's
+        identical conversion atomically.
+
+        Args:
+            source_path (str): Path of the source object.
+            blend_file (str): Path of the conversion, from temporary_path.
+            options (str, optional): Importer options of the conversion. Defaults
+                to "".
+
+        Returns:
+            str: Path of the cached conversion.
+        """
+        path = self.blend_path(self.hashes.source_hash(source_path), options)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(blend_file, path)
+        return path
@@ -0,0 +1,136 @@
+"""Cache of the level-of-detail (LOD) preview GLBs of the objects.
+
+blender_lod.py writes a decimated, texture-downscaled GLB per object. The
+previews are stored by the sha256 of the source file, under a directory per
+LOD budget, `<cache_dir>/<budget>/<hash[:2]>/<hash>.glb`, so a re-downloaded
+or duplicated object reuses its preview and a changed budget does not serve
+stale ones. Hashing a large object takes a while, so `lods.sqlite` memoizes
+the hash of every source path by its size and mtime; lods.py computes the
+hashes when it precomputes the previews, and the request path of the UI
+backend only looks them up with cached_hash.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from render_scripts.shared_sqlite import connect_shared
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+"""
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Returns the sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceHashes:
+    """The sha256 of source files in a SQLite file, memoized by size and mtime."""
+
+    def __init__(self, db_path: str) -> None:
+        self.lock = threading.Lock()
+        self.connection = connect_shared(db_path, SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def cached_hash(self, path: str) -> Optional[str]:
+        """Returns the memoized sha256 of a source file, None if it was not hashed
+        at its current size and mtime."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self.lock:
+            row = self.connection.execute("SELECT size, mtime, hash FROM sources WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+        return None
+
+    def source_hash(self, path: str) -> str:
+        """Returns the sha256 of a source file, memoized by size and mtime."""
+        digest = self.cached_hash(path)
+        if digest is not None:
+            return digest
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest = file_sha256(path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sources (path, size, mtime, hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, digest),
+            )
+        return digest
+
+
+class LodCache:
+    """Preview GLBs keyed by the content hash of their source object."""
+
+    def __init__(self, cache_dir: str, max_triangles: int = 50000, max_texture_size: int = 1024) -> None:
+        """Initializes the LodCache.
+
+        Args:
+            cache_dir (str): Directory of the previews and of lods.sqlite.
+            max_triangles (int, optional): Triangle budget of a preview. Defaults
+                to 50000.
+            max_texture_size (int, optional): Largest texture side of a preview.
+                Defaults to 1024.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_triangles = max_triangles
+        self.max_texture_size = max_texture_size
+        self.budget_dir = os.path.join(cache_dir, f"t{max_triangles}_x{max_texture_size}")
+        self.hashes = SourceHashes(os.path.join(cache_dir, "lods.sqlite"))
+
+    def close(self) -> None:
+        self.hashes.close()
+
+    def source_hash(self, path: str) -> str:
+        """Returns the sha256 of a source object, memoized by size and mtime."""
+        return self.hashes.source_hash(path)
+
+    def cached_hash(self, path: str) -> Optional[str]:
+        """Returns the source hash of an object without hashing it, None if it
+        changed since the last precompute."""
+        return self.hashes.cached_hash(path)
+
+    def lod_path(self, digest: str) -> str:
+        """Returns the path of the preview of a source hash, whether it exists or not."""
+        return os.path.join(self.budget_dir, digest[:2], f"{digest}.glb")
+
+    def get(self, source_path: str) -> Optional[Tuple[str, str]]:
+        """Returns the source hash and preview path of an object, None if not cached."""
+        digest = self.source_hash(source_path)
+        path = self.lod_path(digest)
+        return (digest, path) if os.path.exists(path) else None
+
+    def put(self, source_path: str, lod_file: str) -> str:
+        """Moves a preview GLB written for source_path into the cache.
+
+        Args:
+            source_path (str): Path of the source object.
+            lod_file (str): Path of the preview, on the same filesystem as the cache
+                to be moved atomically.
+
+        Returns:
+            str: Path of the cached preview.
+        """
+        path = self.lod_path(self.source_hash(source_path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(lod_file, path)
+        return path
+
+    def missing(self, source_paths: Iterable[str]) -> List[str]:
+        """Returns the source objects without a preview."""
+        return [path for path in source_paths if self.get(path) is None]
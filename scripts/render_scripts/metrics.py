@@ -0,0 +1,274 @@
+"""Live progress metrics of long runs in the Prometheus text format.
+
+download.py, render.py and metadata_multiproc.py runs take days and give no
+progress signal besides their logs. With --metrics_port they serve their metrics
+at `http://<host>:<port>/metrics`, with --metrics_textfile they rewrite a .prom
+file every few seconds for the textfile collector of node_exporter:
+
+    piquick_objects{stage}                           objects of the run
+    piquick_objects_completed_total{stage}           objects done
+    piquick_objects_failed_total{stage}              objects that failed
+    piquick_throughput_objects_per_second{stage}     finished objects per second
+    piquick_queue_depth{stage}                       objects not finished yet
+    piquick_eta_seconds{stage}                       queue depth over throughput
+    piquick_device_busy_seconds_total{stage,device}  seconds of finished tasks
+    piquick_device_busy_fraction{stage,device}       busy seconds over run seconds
+    piquick_step_seconds{stage,step}                 latency histogram of a step
+
+Only the parent process of a run keeps the metrics. It already gets the result
+of every finished task from its pool, so the workers and Blender never pay for
+them: recording a task is a few additions under a lock, and the derived values
+are computed when the metrics are read.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+PREFIX = "piquick"
+# seconds, from a small object to a large group scene
+LATENCY_BUCKETS = (0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Returns the label set of a sample, e.g. {device="0",stage="render"}."""
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative histogram of observed values."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Returns the _bucket, _sum and _count lines of the histogram."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(self.sum)}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+class RunMetrics:
+    """Progress of the objects of one stage of a run, e.g. "render"."""
+
+    def __init__(self, stage: str, total: int = 0, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initializes the RunMetrics.
+
+        Args:
+            stage (str): Name of the stage, the stage label of every metric.
+            total (int, optional): Number of objects of the run. Defaults to 0,
+                set later with set_total.
+            buckets (Sequence[float], optional): Upper bounds of the latency
+                histograms in seconds. Defaults to LATENCY_BUCKETS.
+        """
+        self.stage = stage
+        self.total = total
+        self.buckets = buckets
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds: Dict[str, float] = {}
+        self.steps: Dict[str, Histogram] = {}
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_total(self, total: int) -> None:
+        with self.lock:
+            self.total = total
+
+    def task_done(self, seconds: float, completed: int = 1, failed: int = 0, device: Optional[str] = None) -> None:
+        """Records a finished task.
+
+        Args:
+            seconds (float): Duration of the task.
+            completed (int, optional): Objects the task finished. Defaults to 1.
+            failed (int, optional): Objects the task failed on. Defaults to 0.
+            device (Optional[str], optional): Device the task ran on, e.g. the GPU
+                id, for its busy fraction. Defaults to None.
+        """
+        with self.lock:
+            self.completed += completed
+            self.failed += failed
+            if device is not None:
+                self.busy_seconds[device] = self.busy_seconds.get(device, 0.0) + seconds
+
+    def observe(self, step: str, seconds: float) -> None:
+        """Adds the duration of a step, e.g. "blender_task", to its histogram."""
+        with self.lock:
+            if step not in self.steps:
+                self.steps[step] = Histogram(self.buckets)
+            self.steps[step].observe(seconds)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Returns the derived progress values, NaN while they are unknown."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            elapsed = max(now - self.start, 1e-9)
+            finished = self.completed + self.failed
+            remaining = max(self.total - finished, 0)
+            throughput = finished / elapsed
+            return {
+                "elapsed": elapsed,
+                "throughput": throughput,
+                "queue_depth": remaining,
+                "eta": remaining / throughput if throughput > 0 else (0.0 if remaining == 0 else math.nan),
+                "busy_fraction": {device: seconds / elapsed for device, seconds in self.busy_seconds.items()},
+            }
+
+    def render(self, now: Optional[float] = None) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot(now)
+        stage = {"stage": self.stage}
+        lines: List[str] = []
+
+        def add(name: str, kind: str, help_text: str, samples: List[str]) -> None:
+            lines.extend([f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} {kind}"])
+            lines.extend(samples)
+
+        def sample(name: str, value: float, labels: Dict[str, str] = stage) -> str:
+            return f"{PREFIX}_{name}{format_labels(labels)} {format_value(value)}"
+
+        with self.lock:
+            add("objects", "gauge", "Objects of the run.", [sample("objects", self.total)])
+            add("objects_completed_total", "counter", "Objects done.",
+                [sample("objects_completed_total", self.completed)])
+            add("objects_failed_total", "counter", "Objects that failed.",
+                [sample("objects_failed_total", self.failed)])
+            add("device_busy_seconds_total", "counter", "Seconds of the finished tasks of a device.",
+                [sample("device_busy_seconds_total", seconds, {**stage, "device": device})
+                 for device, seconds in sorted(self.busy_seconds.items())])
+            histograms = []
+            for step, histogram in sorted(self.steps.items()):
+                histograms.extend(histogram.samples(f"{PREFIX}_step_seconds", {**stage, "step": step}))
+            add("step_seconds", "histogram", "Duration of the steps of a stage.", histograms)
+        add("throughput_objects_per_second", "gauge", "Finished objects per second since the start.",
+            [sample("throughput_objects_per_second", snapshot["throughput"])])
+        add("queue_depth", "gauge", "Objects not finished yet.", [sample("queue_depth", snapshot["queue_depth"])])
+        add("eta_seconds", "gauge", "Seconds until the queue is empty at the current throughput.",
+            [sample("eta_seconds", snapshot["eta"])])
+        add("device_busy_fraction", "gauge", "Busy seconds of a device over the seconds of the run.",
+            [sample("device_busy_fraction", fraction, {**stage, "device": device})
+             for device, fraction in sorted(snapshot["busy_fraction"].items())])
+        return "\n".join(lines) + "\n"
+
+
+def write_textfile(metrics: RunMetrics, path: str) -> None:
+    """Writes the metrics to a .prom file atomically, node_exporter never reads a
+    partial file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """Serves the metrics over HTTP and/or rewrites a textfile in background threads."""
+
+    def __init__(
+        self,
+        metrics: RunMetrics,
+        port: Optional[int] = None,
+        textfile: Optional[str] = None,
+        interval: float = 15.0,
+    ) -> None:
+        """Initializes the MetricsExporter and starts its threads.
+
+        Args:
+            metrics (RunMetrics): The metrics to export.
+            port (Optional[int], optional): Port of the /metrics endpoint. Defaults
+                to None, no endpoint.
+            textfile (Optional[str], optional): Path of the .prom file. Defaults to
+                None, no textfile.
+            interval (float, optional): Seconds between two textfile writes.
+                Defaults to 15.0.
+        """
+        self.metrics = metrics
+        self.textfile = textfile
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.server = None
+        self.threads = []
+        if port is not None:
+            self.server = ThreadingHTTPServer(("", port), self._handler())
+            self.server.daemon_threads = True
+            self.threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+        if textfile:
+            self.threads.append(threading.Thread(target=self._write_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # scrapes every few seconds would flood the run log
+                pass
+
+        return Handler
+
+    def _write_loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            write_textfile(self.metrics, self.textfile)
+
+    def close(self) -> None:
+        """Stops the threads, the textfile keeps the final values."""
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.textfile:
+            write_textfile(self.metrics, self.textfile)
+
+
+def export_metrics(metrics: RunMetrics, port: Optional[int], textfile: Optional[str]) -> Optional[MetricsExporter]:
+    """Starts exporting the metrics if a port or textfile is given, None otherwise."""
+    if port is None and not textfile:
+        return None
+    return MetricsExporter(metrics, port, textfile)
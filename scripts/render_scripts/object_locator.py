@@ -0,0 +1,55 @@
+"""Finds the object file of a uid in an object database directory.
+
+download.py stores the objects in the Objaverse layout,
+`<objects_dir>/glbs/<000-023>/<uid>.glb`. ObjectLocator scans the directory
+once and rescans it when a uid is not found, at most every few seconds, so
+objects downloaded while a server runs are found too.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+OBJECT_EXTENSIONS = (".glb", ".gltf", ".fbx", ".obj", ".usdz")
+
+
+class ObjectLocator:
+    """Maps uids to the object files of a directory tree."""
+
+    def __init__(self, objects_dir: str, rescan_interval: float = 10.0) -> None:
+        """Initializes the ObjectLocator.
+
+        Args:
+            objects_dir (str): Root directory of the object files, e.g.
+                src/objects_database.
+            rescan_interval (float, optional): Minimum seconds between two scans.
+                Defaults to 10.0.
+        """
+        self.objects_dir = objects_dir
+        self.rescan_interval = rescan_interval
+        self.paths: Dict[str, str] = {}
+        self.last_scan = 0.0
+        self.lock = threading.Lock()
+        self.scan()
+
+    def scan(self) -> None:
+        """Rescans the directory tree."""
+        paths = {}
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                uid, ext = os.path.splitext(name)
+                if ext.lower() in OBJECT_EXTENSIONS:
+                    paths[uid] = os.path.join(root, name)
+        self.paths = paths
+        self.last_scan = time.monotonic()
+
+    def find(self, uid: str) -> Optional[str]:
+        """Returns the path of the object file of a uid, None if it does not exist."""
+        path = self.paths.get(uid)
+        if path is not None and os.path.exists(path):
+            return path
+        with self.lock:
+            if time.monotonic() - self.last_scan > self.rescan_interval:
+                self.scan()
+        return self.paths.get(uid)
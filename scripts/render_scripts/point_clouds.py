@@ -0,0 +1,161 @@
+"""Surface point clouds and voxel grids of objects, for models trained on
+geometry instead of images.
+
+blender_geometry.py (--mode pointcloud) normalizes every object to the unit cube
+like the renders, samples a fixed number of points uniformly on its surface
+(area weighted, see shape_descriptors.sample_surface) with the normals of their
+triangles, and optionally marks the cells of a voxel grid that the surface
+passes through. A batch of objects is written as one shard of fixed-shape .npy
+files that can be memory mapped:
+    - <shard>.points.npy: (n, num_points, 3) float32 points in [-0.5, 0.5],
+    - <shard>.normals.npy: (n, num_points, 3) float32 unit normals,
+    - <shard>.voxels.npy: (n, resolution, resolution, resolution / 8) uint8, the
+      occupancy grids packed along the last axis with np.packbits (optional),
+    - <shard>.uids.json: the uids of the rows, written last so a shard without
+      it is incomplete and ignored.
+index.json in the output directory maps every uid to its shard and row, see
+index_shards, and PointCloudStore reads the objects back.
+"""
+
+import glob
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_NAME = "index.json"
+UIDS_SUFFIX = ".uids.json"
+# surface samples per voxel grid cell side squared, enough to hit every cell the
+# surface of a normalized object passes through
+VOXEL_SAMPLES_PER_CELL = 8
+
+
+def voxel_grid(points: np.ndarray, resolution: int) -> np.ndarray:
+    """Returns the occupancy grid of points of a normalized object.
+
+    Args:
+        points (np.ndarray): (N, 3) points in the unit cube centered at the origin.
+        resolution (int): Number of cells along every axis, a multiple of 8.
+
+    Returns:
+        np.ndarray: (resolution, resolution, resolution // 8) uint8 grid indexed
+        by x, y, z, packed along z with np.packbits.
+    """
+    if resolution % 8:
+        raise ValueError(f"voxel resolution {resolution} is not a multiple of 8")
+    cells = np.floor((points + 0.5) * resolution).astype(np.int64)
+    np.clip(cells, 0, resolution - 1, out=cells)
+    occupied = np.zeros((resolution, resolution, resolution), dtype=bool)
+    occupied[cells[:, 0], cells[:, 1], cells[:, 2]] = True
+    return np.packbits(occupied, axis=-1)
+
+
+def unpack_voxels(packed: np.ndarray) -> np.ndarray:
+    """Returns the (R, R, R) bool occupancy grid of a packed voxel grid."""
+    return np.unpackbits(packed, axis=-1).astype(bool)
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    # written to a file object, np.save would add .npy to the temporary name
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_shard(
+    shard_path: str,
+    uids: List[str],
+    points: np.ndarray,
+    normals: np.ndarray,
+    voxels: Optional[np.ndarray] = None,
+) -> None:
+    """Writes a shard of point clouds.
+
+    Args:
+        shard_path (str): Path of the shard without suffix.
+        uids (List[str]): Uids of the rows.
+        points (np.ndarray): (n, num_points, 3) points.
+        normals (np.ndarray): (n, num_points, 3) normals.
+        voxels (Optional[np.ndarray], optional): (n, R, R, R // 8) packed voxel
+            grids. Defaults to None.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(shard_path)), exist_ok=True)
+    _save_npy(shard_path + ".points.npy", np.ascontiguousarray(points, dtype=np.float32))
+    _save_npy(shard_path + ".normals.npy", np.ascontiguousarray(normals, dtype=np.float32))
+    if voxels is not None:
+        _save_npy(shard_path + ".voxels.npy", np.ascontiguousarray(voxels, dtype=np.uint8))
+    tmp_path = shard_path + UIDS_SUFFIX + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(uids, f)
+    os.replace(tmp_path, shard_path + UIDS_SUFFIX)
+
+
+def shard_names(output_dir: str) -> List[str]:
+    """Returns the names of the complete shards of the directory, oldest first."""
+    paths = glob.glob(os.path.join(output_dir, "*" + UIDS_SUFFIX))
+    paths.sort(key=lambda path: (os.path.getmtime(path), path))
+    return [os.path.basename(path)[: -len(UIDS_SUFFIX)] for path in paths]
+
+
+def index_shards(output_dir: str) -> Dict[str, Tuple[str, int]]:
+    """Writes index.json, the shard and row of every uid of the directory, the
+    newest shard wins, and returns it."""
+    index = {}
+    for name in shard_names(output_dir):
+        with open(os.path.join(output_dir, name + UIDS_SUFFIX), "r") as f:
+            for row, uid in enumerate(json.load(f)):
+                index[uid] = (name, row)
+    tmp_path = os.path.join(output_dir, INDEX_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(output_dir, INDEX_NAME))
+    return index
+
+
+class PointCloudStore:
+    """Reads the point clouds of an output directory through its index.
+
+    The shards are memory mapped when first used, so reading an object only
+    pages in its rows.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+        with open(os.path.join(output_dir, INDEX_NAME), "r") as f:
+            self.index = {uid: tuple(location) for uid, location in json.load(f).items()}
+        self._arrays: Dict[Tuple[str, str], Optional[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, uid: str) -> bool:
+        return uid in self.index
+
+    def _array(self, name: str, kind: str) -> Optional[np.ndarray]:
+        key = (name, kind)
+        if key not in self._arrays:
+            path = os.path.join(self.output_dir, f"{name}.{kind}.npy")
+            self._arrays[key] = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        return self._arrays[key]
+
+    def get(self, uid: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the (num_points, 3) points and normals of an object.
+
+        Raises:
+            KeyError: If the object has no point cloud.
+        """
+        name, row = self.index[uid]
+        return self._array(name, "points")[row], self._array(name, "normals")[row]
+
+    def voxels(self, uid: str) -> Optional[np.ndarray]:
+        """Returns the (R, R, R) bool occupancy grid of an object, None if its
+        shard has no voxel grids.
+
+        Raises:
+            KeyError: If the object has no point cloud.
+        """
+        name, row = self.index[uid]
+        packed = self._array(name, "voxels")
+        return None if packed is None else unpack_voxels(packed[row])
@@ -0,0 +1,73 @@
+"""Triangle budget of a render scene.
+
+A group of high-poly objects can reach tens of millions of triangles, which
+makes the Cycles BVH build slow and large although the detail is invisible at
+the render resolution. blender_render.py (apply_triangle_budget) decimates the
+meshes of a scene above the budget with the ratios of decimation_ratios: every
+mesh is reduced by the same ratio, so the objects keep their relative detail,
+but no mesh is reduced below min_triangles, so small parts keep their shape.
+
+The budget is given in triangles or in megabytes of geometry memory, converted
+with TRIANGLE_BYTES.
+
+This module does not import bpy, so render.py can plan with it.
+"""
+
+from typing import Dict, Optional
+
+# Cycles memory per triangle for the vertices, normals, UVs and the BVH nodes,
+# a rough average for meshes with one UV map
+TRIANGLE_BYTES = 160
+
+
+def triangle_budget(max_triangles: Optional[int] = None, max_memory_mb: Optional[float] = None) -> Optional[int]:
+    """Returns the triangle budget of the given ceilings, None if there is none."""
+    budgets = []
+    if max_triangles:
+        budgets.append(int(max_triangles))
+    if max_memory_mb:
+        budgets.append(int(max_memory_mb * 2**20 / TRIANGLE_BYTES))
+    return min(budgets) if budgets else None
+
+
+def decimation_ratios(
+    triangle_counts: Dict[str, int],
+    budget: int,
+    min_triangles: int = 1000,
+    min_ratio: float = 0.02,
+) -> Dict[str, float]:
+    """Returns the decimation ratio of every mesh that fits the scene into the budget.
+
+    Meshes of at most min_triangles are kept, the others are reduced by the same
+    ratio, except that meshes the ratio would bring below min_triangles are
+    reduced to min_triangles only and the ratio of the rest is lowered to
+    compensate. The ratio is at least min_ratio, so a tiny budget can be exceeded.
+
+    Args:
+        triangle_counts (Dict[str, int]): Triangles of every mesh.
+        budget (int): Triangle budget of the scene.
+        min_triangles (int, optional): Smallest decimated mesh. Defaults to 1000.
+        min_ratio (float, optional): Smallest ratio. Defaults to 0.02.
+
+    Returns:
+        Dict[str, float]: Ratio of every mesh, 1.0 for the kept ones.
+    """
+    ratios = {name: 1.0 for name in triangle_counts}
+    if sum(triangle_counts.values()) <= budget:
+        return ratios
+
+    fixed = sum(count for count in triangle_counts.values() if count <= min_triangles)
+    # reduced meshes, smallest first, the first ones may hit min_triangles
+    scaled = sorted((count, name) for name, count in triangle_counts.items() if count > min_triangles)
+    remaining = sum(count for count, _ in scaled)
+    ratio = 1.0
+    for i, (count, name) in enumerate(scaled):
+        ratio = max(min_ratio, min(1.0, (budget - fixed) / remaining))
+        if count * ratio >= min_triangles:
+            for _, other in scaled[i:]:
+                ratios[other] = ratio
+            break
+        ratios[name] = max(min_ratio, min_triangles / count)
+        fixed += count * ratios[name]
+        remaining -= count
+    return ratios
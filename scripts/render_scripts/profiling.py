@@ -0,0 +1,86 @@
+"""Lightweight timing spans written as JSONL, one file per render task.
+
+Every finished span appends one line to the task file:
+    {"task": "<task_key>", "stage": "normalize_scene", "start": 1718000000.1,
+     "duration_s": 0.42, "peak_rss_mb": 812.3, ...extra fields}
+
+Profiling is disabled until configure_profiling is called with a path, so the
+spans cost a time.perf_counter call when it is off. Used by blender_render.py
+and render.py, and read by timings_report.py.
+"""
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Optional
+
+_task_key: Optional[str] = None
+_file = None
+
+
+def configure_profiling(path: Optional[str], task_key: str) -> None:
+    """Starts writing spans of a task to the JSONL file at path, None disables it."""
+    global _task_key, _file
+    if _file is not None:
+        _file.close()
+        _file = None
+    _task_key = task_key
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _file = open(path, "a", buffering=1)
+
+
+def profiling_enabled() -> bool:
+    """Returns whether spans are written, to skip collecting expensive fields."""
+    return _file is not None
+
+
+def maxrss_mb(maxrss: int) -> float:
+    """Converts the ru_maxrss field of a resource usage to MB."""
+    # kilobytes on Linux, bytes on macOS
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident set size of the current process in MB."""
+    return maxrss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def record(stage: str, **fields: Any) -> None:
+    """Writes a record without timing, e.g. object statistics, or a record timed by
+    the caller, e.g. a subprocess, with start and duration_s fields."""
+    if _file is None:
+        return
+    line = {"task": _task_key, "stage": stage, "start": time.time()}
+    line.update(fields)
+    _file.write(json.dumps(line) + "\n")
+
+
+@contextmanager
+def span(stage: str, **fields: Any) -> Generator[Dict[str, Any], None, None]:
+    """Times the enclosed block and writes it as a record of the stage.
+
+    The yielded dict can be filled with extra fields inside the block.
+
+    Args:
+        stage (str): Name of the stage, e.g. "import" or "render".
+        **fields: Extra fields of the record, e.g. the view name.
+    """
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        if _file is not None:
+            line = {
+                "task": _task_key,
+                "stage": stage,
+                "start": start_time,
+                "duration_s": time.perf_counter() - start,
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            line.update(fields)
+            _file.write(json.dumps(line) + "\n")
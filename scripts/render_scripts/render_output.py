@@ -0,0 +1,219 @@
+"""Output backends for the images and records written by blender_render.py.
+
+Blender always renders to a file, so both backends receive finished files:
+    - LooseFileOutput keeps them where they were written (the original layout).
+    - TarShardOutput streams them into size-bounded WebDataset-style tar shards
+      and deletes the loose files, so a job leaves a few large files behind
+      instead of dozens of small ones.
+
+A sample groups the files of one view under a single key, e.g. the members
+`<task_key>__multi_frame3.png` and `<task_key>__multi_frame3.json` of a shard.
+Shards are written to `<prefix>-000000.tar.tmp` and renamed when complete, and
+`<prefix>.index.json` lists the data offset and size of every member of the
+finished shards, so readers never see a partial shard and can seek to a member.
+
+A Blender job only writes the shards of its own object or group. render.py
+moves the members of every finished job into run level shards with
+TarShardOutput.add_job, so a run leaves a few large files behind.
+"""
+
+import io
+import json
+import os
+import tarfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+
+class LooseFileOutput:
+    """Keeps the rendered files in the output directory."""
+
+    def add_view(self, key: str, paths: Dict[str, str]) -> None:
+        """Adds the files of a view, a no-op for loose files."""
+
+    def add_record(self, key: str, ext: str, record: dict) -> None:
+        """Adds a json record, a no-op as records are written next to the images."""
+
+    def close(self) -> None:
+        """Closes the output."""
+
+
+class TarShardOutput:
+    """Streams samples into size-bounded tar shards with an index."""
+
+    def __init__(self, shard_dir: str, prefix: str, max_shard_bytes: int) -> None:
+        """Initializes the TarShardOutput.
+
+        Args:
+            shard_dir (str): Directory of the shards.
+            prefix (str): Uid based prefix of the shard file names and sample keys.
+            max_shard_bytes (int): A shard is closed once adding the next sample would
+                make it larger than this. A single larger sample gets its own shard.
+        """
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        self.shard_number = 0
+        self.shard_bytes = 0
+        self.tar: Optional[tarfile.TarFile] = None
+        self.members: List[Dict] = []
+        self.index: List[Dict] = []
+        self.samples = set()
+
+    def _shard_path(self) -> str:
+        return os.path.join(self.shard_dir, f"{self.prefix}-{self.shard_number:06d}.tar")
+
+    def _open_shard(self) -> None:
+        self.tar = tarfile.open(self._shard_path() + ".tmp", "w")
+        self.shard_bytes = 0
+        self.members = []
+
+    def _close_shard(self) -> None:
+        """Finalizes the current shard and renames it to its final name."""
+        if self.tar is None:
+            return
+        self.tar.close()
+        shard_path = self._shard_path()
+        with open(shard_path + ".tmp", "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(shard_path + ".tmp", shard_path)
+        self.index.append({"shard": os.path.basename(shard_path), "members": self.members})
+        self.tar = None
+        self.shard_number += 1
+
+    def _add_member(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, io.BytesIO(data))
+        # addfile copies info, the data ends at the padded end of the archive
+        offset = self.tar.offset - (info.size + 511) // 512 * 512
+        self.members.append({"name": name, "offset": offset, "size": info.size})
+        self.shard_bytes = self.tar.offset
+
+    def _add_files(self, sample: str, files: Dict[str, bytes]) -> None:
+        """Adds the files of a sample, named <sample>.<ext>, to the current shard."""
+        if sample in self.samples:
+            raise ValueError(f"Sample {sample} was already added to the shards of {self.prefix}")
+        self.samples.add(sample)
+        sample_bytes = sum(512 + len(data) for data in files.values())
+        if self.tar is not None and self.members and (
+            self.shard_bytes + sample_bytes > self.max_shard_bytes
+        ):
+            self._close_shard()
+        if self.tar is None:
+            self._open_shard()
+        for ext, data in files.items():
+            self._add_member(f"{sample}.{ext}", data)
+
+    def add_sample(self, key: str, files: Dict[str, bytes]) -> None:
+        """Adds the files of one sample to the current shard.
+
+        Args:
+            key (str): Key of the sample, without the prefix.
+            files (Dict[str, bytes]): Content of the files keyed by extension.
+
+        Returns:
+            None
+        """
+        self._add_files(f"{self.prefix}__{key}", files)
+
+    def add_view(self, key: str, paths: Dict[str, str]) -> None:
+        """Moves the rendered files of a view into the current shard.
+
+        Args:
+            key (str): Key of the view, e.g. "multi_frame3".
+            paths (Dict[str, str]): Paths of the files keyed by extension.
+
+        Returns:
+            None
+        """
+        files = {}
+        for ext, path in paths.items():
+            with open(path, "rb") as f:
+                files[ext] = f.read()
+        self.add_sample(key, files)
+        for path in paths.values():
+            os.remove(path)
+
+    def add_record(self, key: str, ext: str, record: dict) -> None:
+        """Adds a json record (e.g. metadata or render cost) as its own sample."""
+        self.add_sample(key, {ext: json.dumps(record).encode("utf-8")})
+
+    def add_job(self, job_dir: str, job_prefix: str, name_prefix: str) -> int:
+        """Moves the members of the shards of a finished job into these shards.
+
+        The members keep their sample grouping and are renamed to
+        <name_prefix>/<member name>, then the shards and index of the job are deleted.
+
+        Args:
+            job_dir (str): Directory of the shards of the job.
+            job_prefix (str): Prefix of the shards of the job, its task key.
+            name_prefix (str): Prefix of the moved member names, e.g. the output
+                directory of the job relative to the run output directory.
+
+        Returns:
+            int: The number of moved members.
+        """
+        index_path = os.path.join(job_dir, f"{job_prefix}.index.json")
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        moved = 0
+        for shard in index["shards"]:
+            # the files of a sample are consecutive members, one sample is held at a time
+            sample, files = None, {}
+            with open(os.path.join(job_dir, shard["shard"]), "rb") as f:
+                for member in shard["members"]:
+                    # extensions may have dots, e.g. depth.exr of a render pass
+                    member_sample, ext = member["name"].split(".", 1)
+                    if member_sample != sample and files:
+                        self._add_files(f"{name_prefix}/{sample}", files)
+                        moved += len(files)
+                        files = {}
+                    sample = member_sample
+                    f.seek(member["offset"])
+                    files[ext] = f.read(member["size"])
+            if files:
+                self._add_files(f"{name_prefix}/{sample}", files)
+                moved += len(files)
+        for shard in index["shards"]:
+            os.remove(os.path.join(job_dir, shard["shard"]))
+        os.remove(index_path)
+        return moved
+
+    def close(self) -> None:
+        """Finalizes the last shard and writes the index of the shards atomically."""
+        self._close_shard()
+        index_path = os.path.join(self.shard_dir, f"{self.prefix}.index.json")
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"prefix": self.prefix, "shards": self.index}, f, indent=2)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def iter_index_members(index_path: str) -> Iterator[Dict]:
+    """Yields the members listed by a shard index with the path of their shard."""
+    with open(index_path, "r") as f:
+        index = json.load(f)
+    shard_dir = os.path.dirname(index_path)
+    for shard in index["shards"]:
+        for member in shard["members"]:
+            yield dict(member, shard_path=os.path.join(shard_dir, shard["shard"]))
+
+
+def read_member(member: Dict) -> bytes:
+    """Reads the data of a member yielded by iter_index_members."""
+    with open(member["shard_path"], "rb") as f:
+        f.seek(member["offset"])
+        return f.read(member["size"])
+
+
+def create_render_output(
+    output_format: str, output_dir: str, prefix: str, max_shard_bytes: int
+):
+    """Returns the output backend selected by --output_format ("files" or "tar")."""
+    if output_format == "files":
+        return LooseFileOutput()
+    if output_format == "tar":
+        return TarShardOutput(output_dir, prefix, max_shard_bytes)
+    raise ValueError(f"Unknown output format: {output_format}")
@@ -0,0 +1,153 @@
+"""Named render profiles used by blender_render.py and render.py.
+
+A profile bundles the engine, resolution and sampling settings of a render job,
+so a job can trade image quality for throughput on purpose:
+    - preview:       Workbench at low resolution, for thumbnails and quick looks.
+    - preview_eevee: EEVEE at low resolution with a handful of samples.
+    - training:      Cycles with adaptive sampling, a noise threshold and a
+                     per-object time budget that caps the samples of every view.
+    - legacy:        the settings blender_render.py always used (128 samples,
+                     denoising), the engine is taken from --engine.
+    - benchmark:     Cycles with few samples and no denoising, cheap enough on
+                     the CPU for scripts/benchmarks/suite.py.
+
+This module does not import bpy, so render.py can use it to validate and
+choose profiles without Blender.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """Render settings of a quality tier.
+
+    Args:
+        name (str): Name of the profile.
+        engine (Optional[str]): Render engine, None keeps the --engine argument.
+        resolution (Optional[int]): Output resolution, None keeps --resolution.
+        samples (int): Maximum number of samples per view.
+        min_samples (int): Lower bound when the time budget caps the samples.
+        use_adaptive_sampling (bool): Whether Cycles stops sampling converged pixels.
+            Defaults to True, like in Blender.
+        adaptive_threshold (float): Cycles noise threshold for adaptive sampling.
+        use_denoising (bool): Whether Cycles denoises the final image.
+        time_budget (Optional[float]): Render seconds allowed for all views of one
+            object (or group scene), None means unlimited.
+    """
+
+    name: str
+    engine: Optional[str] = None
+    resolution: Optional[int] = None
+    samples: int = 128
+    min_samples: int = 1
+    use_adaptive_sampling: bool = True
+    adaptive_threshold: float = 0.01
+    use_denoising: bool = True
+    time_budget: Optional[float] = None
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    "legacy": RenderProfile(name="legacy"),
+    "preview": RenderProfile(
+        name="preview",
+        engine="BLENDER_WORKBENCH",
+        resolution=128,
+        samples=1,
+        use_denoising=False,
+    ),
+    "preview_eevee": RenderProfile(
+        name="preview_eevee",
+        engine="BLENDER_EEVEE",
+        resolution=128,
+        samples=8,
+        use_denoising=False,
+    ),
+    "training": RenderProfile(
+        name="training",
+        engine="CYCLES",
+        samples=256,
+        min_samples=16,
+        use_adaptive_sampling=True,
+        adaptive_threshold=0.02,
+        use_denoising=True,
+        time_budget=120.0,
+    ),
+    "benchmark": RenderProfile(
+        name="benchmark",
+        engine="CYCLES",
+        resolution=128,
+        samples=16,
+        use_adaptive_sampling=False,
+        use_denoising=False,
+    ),
+}
+
+
+def get_render_profile(name: str) -> RenderProfile:
+    """Returns the render profile with the given name.
+
+    Raises:
+        ValueError: If there is no profile with that name.
+    """
+    if name not in RENDER_PROFILES:
+        raise ValueError(
+            f"Unknown render profile: {name}, must be one of {sorted(RENDER_PROFILES)}"
+        )
+    return RENDER_PROFILES[name]
+
+
+class RenderBudget:
+    """Caps the samples of each view so all views of a scene fit in a time budget.
+
+    The seconds spent per sample are measured on the views already rendered, and
+    the remaining budget is split evenly over the remaining views.
+    """
+
+    def __init__(self, profile: RenderProfile, num_views: int) -> None:
+        """Initializes the RenderBudget.
+
+        Args:
+            profile (RenderProfile): The profile of the render job.
+            num_views (int): Number of views that will be rendered for the scene.
+        """
+        self.profile = profile
+        self.num_views = num_views
+        self.view_seconds: List[float] = []
+        self.view_samples: List[int] = []
+
+    def next_samples(self) -> int:
+        """Returns the number of samples to use for the next view."""
+        profile = self.profile
+        if profile.time_budget is None or not self.view_seconds:
+            return profile.samples
+
+        remaining_views = max(self.num_views - len(self.view_seconds), 1)
+        remaining_seconds = profile.time_budget - sum(self.view_seconds)
+        per_view_seconds = remaining_seconds / remaining_views
+        seconds_per_sample = sum(self.view_seconds) / max(sum(self.view_samples), 1)
+        samples = int(per_view_seconds / max(seconds_per_sample, 1e-6))
+        return max(profile.min_samples, min(profile.samples, samples))
+
+    def record(self, seconds: float, samples: int) -> None:
+        """Records the cost of a rendered view."""
+        self.view_seconds.append(seconds)
+        self.view_samples.append(samples)
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the cost record of the scene for the render_cost.json file."""
+        total_seconds = sum(self.view_seconds)
+        rendered = len(self.view_seconds)
+        return {
+            "profile": asdict(self.profile),
+            "num_views": rendered,
+            "total_seconds": total_seconds,
+            "seconds_per_view": total_seconds / rendered if rendered else None,
+            "view_seconds": self.view_seconds,
+            "view_samples": self.view_samples,
+            "over_budget": (
+                self.profile.time_budget is not None
+                and total_seconds > self.profile.time_budget
+            ),
+        }
@@ -0,0 +1,84 @@
+"""Layouts for the objects of a group scene.
+
+The functions take the bounding box sizes of the objects (an (N, 3) array) and
+return the position of the minimum corner of every box on the XY plane, so the
+group fills a compact, roughly square footprint instead of a long line. The
+boxes stand on z = 0.
+
+This module does not import bpy, the bounds are computed by blender_render.py.
+"""
+
+import math
+
+import numpy as np
+
+LAYOUTS = ("shelf", "grid")
+
+
+def _gap(sizes: np.ndarray, spacing: float) -> float:
+    """Returns the gap between neighbouring boxes, relative to their median size."""
+    return spacing * float(np.median(sizes.max(axis=1)))
+
+
+def shelf_layout(sizes: np.ndarray, spacing: float = 0.1) -> np.ndarray:
+    """Packs boxes into shelves (rows) with the next-fit decreasing depth heuristic.
+
+    The boxes are sorted by depth (Y size) and placed left to right until the row
+    reaches the width of a square with the total footprint area, then a new row
+    starts behind the deepest box of the previous one.
+
+    Args:
+        sizes (np.ndarray): (N, 3) sizes of the bounding boxes.
+        spacing (float, optional): Gap between boxes relative to their median size.
+            Defaults to 0.1.
+
+    Returns:
+        np.ndarray: (N, 3) positions of the minimum corners of the boxes.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    gap = _gap(sizes, spacing)
+    footprints = sizes[:, :2] + gap
+    row_width = max(math.sqrt(float(footprints.prod(axis=1).sum())), footprints[:, 0].max())
+
+    positions = np.zeros((len(sizes), 3))
+    x = y = row_depth = 0.0
+    for i in np.argsort(-footprints[:, 1], kind="stable"):
+        width, depth = footprints[i]
+        if x > 0 and x + width > row_width:
+            x, y, row_depth = 0.0, y + row_depth, 0.0
+        positions[i, :2] = x, y
+        x += width
+        row_depth = max(row_depth, depth)
+    return positions
+
+
+def grid_layout(sizes: np.ndarray, spacing: float = 0.1) -> np.ndarray:
+    """Places boxes in the cells of a square grid sized to the largest box.
+
+    Args:
+        sizes (np.ndarray): (N, 3) sizes of the bounding boxes.
+        spacing (float, optional): Gap between cells relative to the median box size.
+            Defaults to 0.1.
+
+    Returns:
+        np.ndarray: (N, 3) positions of the minimum corners of the boxes, centered
+        in their cells.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    cell = sizes[:, :2].max(axis=0) + _gap(sizes, spacing)
+    columns = math.ceil(math.sqrt(len(sizes)))
+    index = np.arange(len(sizes))
+    cells = np.stack([index % columns, index // columns], axis=1)
+
+    positions = np.zeros((len(sizes), 3))
+    positions[:, :2] = cells * cell + (cell - sizes[:, :2]) / 2
+    return positions
+
+
+def compute_layout(sizes: np.ndarray, layout: str = "shelf", spacing: float = 0.1) -> np.ndarray:
+    """Returns the box positions of the given layout ("shelf" or "grid")."""
+    if layout == "shelf":
+        return shelf_layout(sizes, spacing)
+    if layout == "grid":
+        return grid_layout(sizes, spacing)
+    raise ValueError(f"Unknown layout: {layout}, must be one of {LAYOUTS}")
@@ -0,0 +1,114 @@
+"""Compact geometric descriptors of objects for similarity search.
+
+The descriptor of an object is computed from points sampled uniformly on its
+surface (area weighted over the triangles):
+    - a D2 shape distribution, the histogram of the distances between random
+      point pairs, divided by the largest distance so it does not depend on the
+      scale of the object,
+    - the extents of the points along their principal axes, divided by the
+      largest one, so it does not depend on the orientation.
+Both parts are concatenated and L2 normalized, the dot product of two
+descriptors is their cosine similarity.
+
+This module does not import bpy, blender_geometry.py passes the triangles.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+D2_BINS = 32
+D2_PAIRS = 20000
+SURFACE_SAMPLES = 4096
+# weight of the 3 extent ratios against the 32 histogram bins
+EXTENT_WEIGHT = 0.5
+DESCRIPTOR_SIZE = D2_BINS + 3
+
+
+def sample_surface(
+    vertices: np.ndarray, triangles: np.ndarray, count: int, rng: Optional[np.random.Generator] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Samples points uniformly on the surface of a triangle mesh, with the normal
+    of the triangle they lie on.
+
+    Args:
+        vertices (np.ndarray): (V, 3) float vertex positions.
+        triangles (np.ndarray): (T, 3) int vertex indices of the triangles.
+        count (int): Number of points.
+        rng (Optional[np.random.Generator], optional): Random generator. Defaults
+            to None, a generator with seed 0 so descriptors are reproducible.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (count, 3) float32 points and unit normals,
+        empty if the mesh has no area.
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    corners = vertices[triangles].astype(np.float64)
+    crosses = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = 0.5 * np.linalg.norm(crosses, axis=1)
+    total = areas.sum()
+    if len(triangles) == 0 or not np.isfinite(total) or total <= 0:
+        return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.float32)
+    chosen = rng.choice(len(triangles), size=count, p=areas / total)
+    # uniform barycentric coordinates, folding the samples outside the triangle back
+    u, v = rng.random(count), rng.random(count)
+    outside = u + v > 1
+    u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+    a, b, c = corners[chosen, 0], corners[chosen, 1], corners[chosen, 2]
+    points = a + u[:, None] * (b - a) + v[:, None] * (c - a)
+    # chosen triangles have a positive area
+    normals = crosses[chosen] / (2 * areas[chosen, None])
+    return points.astype(np.float32), normals.astype(np.float32)
+
+
+def sample_surface_points(
+    vertices: np.ndarray, triangles: np.ndarray, count: int, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """Samples points uniformly on the surface of a triangle mesh, see sample_surface."""
+    return sample_surface(vertices, triangles, count, rng)[0]
+
+
+def d2_histogram(points: np.ndarray, bins: int = D2_BINS, pairs: int = D2_PAIRS, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Returns the normalized histogram of the distances of random point pairs."""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    first = rng.integers(0, len(points), pairs)
+    second = rng.integers(0, len(points), pairs)
+    distances = np.linalg.norm(points[first] - points[second], axis=1)
+    largest = distances.max()
+    if largest <= 0:
+        histogram = np.zeros(bins)
+        histogram[0] = 1.0
+        return histogram
+    histogram, _ = np.histogram(distances / largest, bins=bins, range=(0.0, 1.0))
+    return histogram / pairs
+
+
+def extent_ratios(points: np.ndarray) -> np.ndarray:
+    """Returns the extents along the principal axes, largest first, divided by the largest."""
+    centered = points - points.mean(axis=0)
+    _, _, axes = np.linalg.svd(centered[: min(len(centered), 4096)], full_matrices=False)
+    projected = centered @ axes.T
+    extents = np.sort(projected.max(axis=0) - projected.min(axis=0))[::-1]
+    if extents[0] <= 0:
+        return np.zeros(3)
+    return extents / extents[0]
+
+
+def shape_descriptor(vertices: np.ndarray, triangles: np.ndarray, samples: int = SURFACE_SAMPLES) -> Optional[np.ndarray]:
+    """Returns the descriptor of a triangle mesh.
+
+    Args:
+        vertices (np.ndarray): (V, 3) float vertex positions in world space.
+        triangles (np.ndarray): (T, 3) int vertex indices of the triangles.
+        samples (int, optional): Number of surface points. Defaults to 4096.
+
+    Returns:
+        Optional[np.ndarray]: L2 normalized float32 vector of DESCRIPTOR_SIZE
+        values, None if the mesh has no area.
+    """
+    points = sample_surface_points(vertices, triangles, samples)
+    if len(points) == 0:
+        return None
+    # the square root makes the dot product the Bhattacharyya coefficient of the histograms
+    descriptor = np.concatenate([np.sqrt(d2_histogram(points)), EXTENT_WEIGHT * extent_ratios(points)])
+    return (descriptor / np.linalg.norm(descriptor)).astype(np.float32)
@@ -0,0 +1,33 @@
+"""SQLite connections shared by the threads of a process.
+
+The caches and the group store are used by the threads of the UI backend's HTTP
+server and by the workers of render runs, several processes at a time. Each of
+them opens one connection with connect_shared and serializes its statements with
+its own lock; SQLite's busy timeout makes the other processes wait for a write
+instead of failing.
+"""
+
+import sqlite3
+
+BUSY_TIMEOUT_SECONDS = 60.0
+
+
+def connect_shared(path: str, schema: str) -> sqlite3.Connection:
+    """Opens an autocommit connection usable from any thread and creates the schema.
+
+    Args:
+        path (str): Path of the SQLite file.
+        schema (str): CREATE ... IF NOT EXISTS statements of the tables.
+
+    Returns:
+        sqlite3.Connection: The connection, guarded by a lock of the caller.
+    """
+    connection = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    connection.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}")
+    connection.executescript(schema)
+    return connection
@@ -0,0 +1,227 @@
+"""Supervision of the Blender subprocesses started by render.py.
+
+    - run_task starts a command without a shell, streams its output in small
+      batches of lines to a bounded logging queue, retries failed runs with exponential backoff and
+      returns the exit code, attempts and duration of the task.
+    - A single log listener process drains the queue and writes every task's
+      lines to <log_dir>/<task_key>.log, so memory stays flat however chatty
+      Blender is, and the pool workers never write files concurrently.
+    - summarize_tasks prints the end-of-run summary.
+
+Usage in a multiprocessing pool:
+    log_queue, listener = start_log_listener(log_dir)
+    with multiprocessing.Pool(n, initializer=init_worker_logging, initargs=(log_queue,)) as pool:
+        results = pool.starmap(...)   # calling run_task
+    stop_log_listener(log_queue, listener)
+    summarize_tasks(results, summary_path)
+"""
+
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+from render_scripts.profiling import maxrss_mb
+
+LOGGER_NAME = "render_supervisor"
+LOG_BATCH_LINES = 256
+LOG_QUEUE_SIZE = 1024
+
+
+class _BlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that waits for free space instead of dropping records when the
+    bounded queue is full, so a chatty task is slowed down rather than buffered."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put(record)
+
+
+def _log_listener(log_queue: multiprocessing.Queue, log_dir: str) -> None:
+    """Writes the records of the queue to one log file per task until None arrives
+    or the parent process dies."""
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    parent_pid = os.getppid()
+    files = {}
+    while True:
+        try:
+            record = log_queue.get(timeout=5.0)
+        except queue.Empty:
+            # a killed parent cannot send None, do not outlive it
+            if os.getppid() != parent_pid:
+                break
+            continue
+        if record is None:
+            break
+        task = getattr(record, "task", "render")
+        if task not in files:
+            files[task] = open(os.path.join(log_dir, f"{task}.log"), "a")
+        files[task].write(formatter.format(record) + "\n")
+        if getattr(record, "task_done", False):
+            files.pop(task).close()
+        if record.levelno >= logging.WARNING or task == "render":
+            print(formatter.format(record), flush=True)
+    for f in files.values():
+        f.close()
+
+
+def start_log_listener(log_dir: str):
+    """Starts the log listener process.
+
+    Returns:
+        Tuple[multiprocessing.Queue, multiprocessing.Process]: The queue to pass to
+        init_worker_logging and the listener process.
+    """
+    log_queue = multiprocessing.Queue(LOG_QUEUE_SIZE)
+    listener = multiprocessing.Process(target=_log_listener, args=(log_queue, log_dir), daemon=True)
+    listener.start()
+    init_worker_logging(log_queue)
+    return log_queue, listener
+
+
+def stop_log_listener(log_queue: multiprocessing.Queue, listener: multiprocessing.Process) -> None:
+    """Flushes the queue and stops the log listener process."""
+    log_queue.put(None)
+    listener.join()
+
+
+def init_worker_logging(log_queue: multiprocessing.Queue) -> None:
+    """Sends the records of the supervisor logger to the log queue, pool initializer."""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [_BlockingQueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def run_task(
+    command: List[str],
+    task_key: str,
+    env: Optional[Dict[str, str]] = None,
+    retries: int = 0,
+    retry_backoff: float = 10.0,
+    cwd: Optional[str] = None,
+) -> dict:
+    """Runs a command, streaming its output to the task log, and retries on failure.
+
+    Args:
+        command (List[str]): The command and its arguments, run without a shell.
+        task_key (str): Key of the task, names its log file.
+        env (Optional[Dict[str, str]], optional): Environment of the command.
+            Defaults to None, inheriting the environment.
+        retries (int, optional): Number of retries after a failed run. Defaults to 0.
+        retry_backoff (float, optional): Seconds to wait before the first retry,
+            doubled for every further retry. Defaults to 10.0.
+        cwd (Optional[str], optional): Working directory of the command. Defaults to
+            None, the current directory.
+
+    Returns:
+        dict: The task key, exit code of the last run, number of attempts, the total
+        duration in seconds including the backoff, and the start, duration, exit code
+        and peak memory of every attempt.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    extra = {"task": task_key}
+    start = time.perf_counter()
+    returncode = None
+    attempt = 0
+    attempt_runs = []
+    for attempt in range(1, retries + 2):
+        logger.info(f"Executing command (attempt {attempt}): {' '.join(command)}", extra=extra)
+        attempt_start_time = time.time()
+        attempt_start = time.perf_counter()
+        peak_rss = None
+        try:
+            process = subprocess.Popen(
+                command,
+                env=env,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                bufsize=1,
+            )
+        except OSError as error:
+            logger.error(f"Task {task_key} could not start: {error}", extra=extra)
+            returncode = -1
+        else:
+            # lines are sent in small batches, one queue record per line is too slow
+            # for Blender's per-sample progress output
+            batch = []
+            last_flush = time.perf_counter()
+            with process.stdout:
+                for line in process.stdout:
+                    batch.append(line.rstrip("\n"))
+                    if len(batch) >= LOG_BATCH_LINES or time.perf_counter() - last_flush > 1.0:
+                        logger.info("\n".join(batch), extra=extra)
+                        batch = []
+                        last_flush = time.perf_counter()
+            if batch:
+                logger.info("\n".join(batch), extra=extra)
+            # wait4 returns the resource usage of this child only, unlike RUSAGE_CHILDREN
+            _, status, usage = os.wait4(process.pid, 0)
+            returncode = process.returncode = os.waitstatus_to_exitcode(status)
+            peak_rss = maxrss_mb(usage.ru_maxrss)
+
+        attempt_duration = time.perf_counter() - attempt_start
+        attempt_runs.append({
+            "attempt": attempt,
+            "start": attempt_start_time,
+            "duration_s": attempt_duration,
+            "returncode": returncode,
+            "peak_rss_mb": peak_rss,
+        })
+        logger.info(f"Task {task_key} exited with {returncode} after {attempt_duration:.1f}s", extra=extra)
+        if returncode == 0:
+            break
+        if attempt <= retries:
+            delay = retry_backoff * 2 ** (attempt - 1)
+            logger.warning(
+                f"Task {task_key} failed with exit code {returncode}, retrying in {delay:.0f}s",
+                extra=extra,
+            )
+            time.sleep(delay)
+
+    duration = time.perf_counter() - start
+    if returncode != 0:
+        logger.error(f"Task {task_key} failed after {attempt} attempts", extra=extra)
+    logger.info(f"Task {task_key} done", extra={**extra, "task_done": True})
+    return {
+        "task": task_key,
+        "returncode": returncode,
+        "attempts": attempt,
+        "duration_s": duration,
+        "attempt_runs": attempt_runs,
+    }
+
+
+def summarize_tasks(results: List[dict], summary_path: Optional[str] = None) -> dict:
+    """Prints the end-of-run summary of the task results and optionally saves it."""
+    failed = [result for result in results if result["returncode"] != 0]
+    durations = [result["duration_s"] for result in results]
+    summary = {
+        "tasks": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "retried": sum(1 for result in results if result["attempts"] > 1),
+        "total_duration_s": sum(durations),
+        "mean_duration_s": sum(durations) / len(durations) if durations else 0.0,
+        "max_duration_s": max(durations, default=0.0),
+        "failed_tasks": failed,
+    }
+    print(f"\nTasks: {summary['tasks']}, succeeded: {summary['succeeded']}, "
+          f"failed: {summary['failed']}, retried: {summary['retried']}")
+    print(f"Task duration mean: {summary['mean_duration_s']:.1f}s, "
+          f"max: {summary['max_duration_s']:.1f}s")
+    for result in failed:
+        print(f"  FAILED {result['task']}: exit code {result['returncode']} "
+              f"after {result['attempts']} attempts")
+    if summary_path:
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
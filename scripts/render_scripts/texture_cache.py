@@ -0,0 +1,202 @@
+"""Cache of textures downscaled for the render resolution.
+
+Many objects embed 4K or 8K textures, which at a 256 px render only cost import
+time, memory and texture upload. blender_render.py (downscale_textures) replaces
+every texture larger than the texture size of the render resolution with a
+downscaled copy after import:
+    - the copy is keyed by the sha256 of the encoded source image and the
+      texture size, so a texture shared by many objects is decoded and
+      downscaled once, later loads only hash the encoded bytes and load the small
+      copy from `<cache_dir>/s<size>/<hash[:2]>/<hash>.<ext>`,
+    - `textures.sqlite` records the source and downscaled size of every texture,
+      and also the textures that are small enough, so those are not decoded to
+      find out again.
+"""
+
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from render_scripts.shared_sqlite import connect_shared
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS textures (
+    hash TEXT NOT NULL,
+    max_size INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    scaled_width INTEGER NOT NULL,
+    scaled_height INTEGER NOT NULL,
+    source_bytes INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    path TEXT,
+    PRIMARY KEY (hash, max_size)
+);
+"""
+
+
+@dataclass(frozen=True)
+class TextureEntry:
+    """A texture of the cache.
+
+    Args:
+        width (int): Width of the source image.
+        height (int): Height of the source image.
+        scaled_width (int): Width of the downscaled copy, the source width if the
+            texture is small enough.
+        scaled_height (int): Height of the downscaled copy.
+        source_bytes (int): Size of the encoded source image.
+        bytes (int): Size of the encoded copy, source_bytes if not downscaled.
+        path (Optional[str]): Path of the copy, None if the texture is kept.
+    """
+
+    width: int
+    height: int
+    scaled_width: int
+    scaled_height: int
+    source_bytes: int
+    bytes: int
+    path: Optional[str]
+
+
+def texture_size_for_resolution(resolution: int, factor: int = 2) -> int:
+    """Returns the largest texture side worth keeping for a render resolution.
+
+    An object fills at most the frame, and a texture rarely maps onto more than
+    the visible surface, so twice the resolution, rounded up to a power of two,
+    keeps every texel that can reach a pixel.
+    """
+    return 1 << max(int(resolution * factor) - 1, 1).bit_length()
+
+
+def scaled_size(width: int, height: int, max_size: int) -> Optional[Tuple[int, int]]:
+    """Returns the size of a texture with its larger side at most max_size, None
+    if it fits already."""
+    if max(width, height) <= max_size:
+        return None
+    scale = max_size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _area_weights(size: int, scaled: int) -> np.ndarray:
+    """Returns the (scaled, size) matrix averaging the source pixels covered by
+    every target pixel."""
+    edges = np.arange(scaled + 1) * (size / scaled)
+    starts, ends = edges[:-1, None], edges[1:, None]
+    pixels = np.arange(size)[None, :]
+    overlap = np.clip(np.minimum(ends, pixels + 1) - np.maximum(starts, pixels), 0, None)
+    return (overlap / overlap.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def downscale_pixels(pixels: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Downscales an image by averaging the pixels covered by every target pixel.
+
+    Args:
+        pixels (np.ndarray): (H, W, C) float32 pixels.
+        width (int): Target width.
+        height (int): Target height.
+
+    Returns:
+        np.ndarray: (height, width, C) float32 pixels.
+    """
+    source_height, source_width = pixels.shape[:2]
+    if source_height % height == 0 and source_width % width == 0:
+        # integer factors, the common power of two case, average blocks
+        blocks = pixels.reshape(height, source_height // height, width, source_width // width, -1)
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+    rows = np.einsum("hy,ywc->hwc", _area_weights(source_height, height), pixels)
+    return np.einsum("wx,hxc->hwc", _area_weights(source_width, width), rows)
+
+
+class TextureCache:
+    """Downscaled textures keyed by the content hash of their source image."""
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        """Initializes the TextureCache.
+
+        Args:
+            cache_dir (str): Directory of the textures and of textures.sqlite, can
+                be shared by the workers of several nodes.
+            max_size (int): Largest texture side, see texture_size_for_resolution.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.size_dir = os.path.join(cache_dir, f"s{max_size}")
+        self.lock = threading.Lock()
+        self.connection = connect_shared(os.path.join(cache_dir, "textures.sqlite"), SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get(self, digest: str) -> Optional[TextureEntry]:
+        """Returns the entry of a source image hash, None if it was never seen or
+        its copy was deleted."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT width, height, scaled_width, scaled_height, source_bytes, bytes, path "
+                "FROM textures WHERE hash = ? AND max_size = ?",
+                (digest, self.max_size),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = TextureEntry(*row)
+        if entry.path is not None and not os.path.exists(entry.path):
+            return None
+        return entry
+
+    def texture_path(self, digest: str, extension: str) -> str:
+        """Returns the path of the copy of a source image hash, e.g. extension ".png"."""
+        return os.path.join(self.size_dir, digest[:2], f"{digest}{extension}")
+
+    def temporary_path(self, extension: str) -> str:
+        """Returns a unique path to write a copy to before put, on the filesystem
+        of the cache."""
+        os.makedirs(self.size_dir, exist_ok=True)
+        return os.path.join(self.size_dir, f"tmp_{uuid.uuid4().hex}{extension}")
+
+    def put(
+        self,
+        digest: str,
+        width: int,
+        height: int,
+        source_bytes: int,
+        scaled_file: Optional[str] = None,
+        scaled_width: Optional[int] = None,
+        scaled_height: Optional[int] = None,
+    ) -> TextureEntry:
+        """Adds a texture, with its downscaled copy if it is too large.
+
+        Args:
+            digest (str): sha256 of the encoded source image.
+            width (int): Width of the source image.
+            height (int): Height of the source image.
+            source_bytes (int): Size of the encoded source image.
+            scaled_file (Optional[str], optional): Copy written to temporary_path,
+                moved into the cache. Defaults to None, the texture is kept.
+            scaled_width (Optional[int], optional): Width of the copy.
+            scaled_height (Optional[int], optional): Height of the copy.
+
+        Returns:
+            TextureEntry: The entry of the texture.
+        """
+        if scaled_file is None:
+            entry = TextureEntry(width, height, width, height, source_bytes, source_bytes, None)
+        else:
+            path = self.texture_path(digest, os.path.splitext(scaled_file)[1])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(scaled_file, path)
+            entry = TextureEntry(width, height, scaled_width, scaled_height, source_bytes, os.path.getsize(path), path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO textures "
+                "(hash, max_size, width, height, scaled_width, scaled_height, source_bytes, bytes, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, self.max_size, entry.width, entry.height, entry.scaled_width,
+                 entry.scaled_height, entry.source_bytes, entry.bytes, entry.path),
+            )
+        return entry
@@ -0,0 +1,111 @@
+"""Packed, content-addressed store of the object thumbnails.
+
+All thumbnails are appended to a single `thumbnails.pack` file instead of one
+small file per uid. `thumbnails.sqlite` maps every uid to the sha256 of its
+PNG, and every distinct hash to its offset and size in the pack, so identical
+thumbnails (e.g. of re-uploaded objects) are stored once and the hash serves
+as ETag. Appends hold an exclusive lock on the pack file, so several processes
+can fill the cache. A crash between the append and the index update only
+leaves unreferenced bytes in the pack.
+"""
+
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from render_scripts.shared_sqlite import connect_shared
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS thumbnails (
+    uid TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+class ThumbnailCache:
+    """Thumbnail PNGs keyed by uid, stored once per content hash."""
+
+    def __init__(self, cache_dir: str) -> None:
+        """Initializes the ThumbnailCache, creating the files if needed.
+
+        Args:
+            cache_dir (str): Directory of thumbnails.pack and thumbnails.sqlite.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.pack_path = os.path.join(cache_dir, "thumbnails.pack")
+        self.pack = open(self.pack_path, "ab+")
+        self.lock = threading.Lock()
+        self.connection = connect_shared(os.path.join(cache_dir, "thumbnails.sqlite"), SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+        self.pack.close()
+
+    def put(self, uid: str, data: bytes) -> str:
+        """Stores the thumbnail of a uid, returns its content hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            fcntl.flock(self.pack.fileno(), fcntl.LOCK_EX)
+            try:
+                row = self.connection.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+                if row is None:
+                    offset = self.pack.seek(0, os.SEEK_END)
+                    self.pack.write(data)
+                    self.pack.flush()
+                    os.fsync(self.pack.fileno())
+                    self.connection.execute(
+                        "INSERT INTO blobs (hash, offset, size) VALUES (?, ?, ?)", (digest, offset, len(data))
+                    )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO thumbnails (uid, hash, created) VALUES (?, ?, ?)",
+                    (uid, digest, time.time()),
+                )
+            finally:
+                fcntl.flock(self.pack.fileno(), fcntl.LOCK_UN)
+        return digest
+
+    def lookup(self, uid: str) -> Optional[Tuple[str, int, int]]:
+        """Returns the hash, offset and size in the pack of the thumbnail of a uid."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT blobs.hash, blobs.offset, blobs.size FROM thumbnails"
+                " JOIN blobs ON blobs.hash = thumbnails.hash WHERE thumbnails.uid = ?",
+                (uid,),
+            ).fetchone()
+
+    def get(self, uid: str) -> Optional[Tuple[str, bytes]]:
+        """Returns the hash and PNG of the thumbnail of a uid, None if not cached."""
+        entry = self.lookup(uid)
+        if entry is None:
+            return None
+        digest, offset, size = entry
+        return digest, os.pread(self.pack.fileno(), size, offset)
+
+    def missing(self, uids: Iterable[str]) -> List[str]:
+        """Returns the uids without a thumbnail."""
+        with self.lock:
+            cached = {row[0] for row in self.connection.execute("SELECT uid FROM thumbnails")}
+        return [uid for uid in uids if uid not in cached]
+
+    def stats(self) -> dict:
+        """Returns the number of thumbnails, distinct blobs and the pack size."""
+        with self.lock:
+            thumbnails = self.connection.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0]
+            blobs, blob_bytes = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {
+            "thumbnails": thumbnails,
+            "blobs": blobs,
+            "blob_bytes": blob_bytes,
+            "pack_bytes": os.path.getsize(self.pack_path),
+        }
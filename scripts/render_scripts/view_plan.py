@@ -0,0 +1,97 @@
+"""Views of a render task that are rendered, and views that reuse a render.
+
+A scene without animation looks the same at every frame, so blender_render.py
+skips its frame changes, and its static views (mode_static) are the multi views
+(mode_multi) under another name: they are rendered once and the files of the
+static view are hard links to those of the multi view. count_views gives the
+number of views the render budget is spread over, link_view_files saves a
+linked view and RenderSavings is the summary in the render cost record.
+"""
+
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from render_scripts.aov_passes import pass_path
+
+
+def links_static_views(args, animated: bool) -> bool:
+    """Returns whether the static views are links to the multi views."""
+    return not animated and bool(args.mode_multi) and bool(args.mode_static)
+
+
+def count_views(args, num_images: int, animated: bool = True) -> int:
+    """Returns the number of views render_scene renders with the enabled modes,
+    the static views of a scene without animation reuse the multi views."""
+    views_per_frame = (
+        bool(args.mode_multi)
+        + bool(args.mode_front)
+        + 4 * bool(args.mode_four_view)
+        + bool(args.mode_static and not links_static_views(args, animated))
+    )
+    return views_per_frame * num_images
+
+
+def view_file_pairs(
+    view_name: str,
+    camera_name: str,
+    source_view: str,
+    source_camera: str,
+    pass_names: Iterable[str] = (),
+    pass_format: Optional[str] = None,
+) -> List[Tuple[str, str]]:
+    """Returns the (source, target) file names of a view linked to a rendered
+    one: its image, camera json and the files of its passes."""
+    pairs = [
+        (f"{source_view}.png", f"{view_name}.png"),
+        (f"{source_camera}.json", f"{camera_name}.json"),
+    ]
+    pairs += [
+        (os.path.basename(pass_path("", source_view, name, pass_format)),
+         os.path.basename(pass_path("", view_name, name, pass_format)))
+        for name in pass_names
+    ]
+    return pairs
+
+
+def link_view_files(output_dir: str, pairs: List[Tuple[str, str]]) -> int:
+    """Hard links the target files to the source files of output_dir (copies if
+    the file system has no hard links), returns the number of linked files.
+    Missing sources are skipped, existing targets are replaced."""
+    linked = 0
+    for source, target in pairs:
+        source, target = os.path.join(output_dir, source), os.path.join(output_dir, target)
+        if not os.path.exists(source):
+            continue
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        linked += 1
+    return linked
+
+
+class RenderSavings:
+    """Renders and frame changes a static scene saved."""
+
+    def __init__(self) -> None:
+        self.renders_saved = 0
+        self.frame_sets_skipped = 0
+        self.view_links: Dict[str, str] = {}
+
+    def frame_skipped(self) -> None:
+        self.frame_sets_skipped += 1
+
+    def view_linked(self, view_name: str, source_view: str) -> None:
+        self.renders_saved += 1
+        self.view_links[view_name] = source_view
+
+    def summary(self) -> Dict[str, object]:
+        """Returns the fields of the render cost record."""
+        return {
+            "renders_saved": self.renders_saved,
+            "frame_sets_skipped": self.frame_sets_skipped,
+            "view_links": dict(self.view_links),
+        }
@@ -2,6 +2,9 @@ import subprocess
 import multiprocessing
 import argparse
 import logging
+import os
+
+from work_queue import WorkQueue
 
 parser = argparse.ArgumentParser(description="Process metadata multiproc arguments.")
 
@@ -56,8 +59,42 @@ parser.add_argument( # --run_animation
     default=True,
     help="Flag to indicate whether to run the animations metadata extraction.")
 
+parser.add_argument( # --metrics_port
+    "--metrics_port",
+    type=int,
+    default=None,
+    help="Serve the progress metrics of the run for Prometheus at http://<host>:<port>/metrics.")
+parser.add_argument( # --metrics_textfile
+    "--metrics_textfile",
+    type=str,
+    default=None,
+    help="Rewrite the progress metrics to this .prom file for the textfile collector of node_exporter.")
+
+parser.add_argument( # --queue_path
+    "--queue_path",
+    type=str,
+    default=None,
+    help="Add the metadata task to this shared SQLite work queue instead of running it, run it with queue_worker.py")
+
 args = parser.parse_args()
 
+if args.queue_path:
+    queue_command = ["scripts/blender-3.2.2-linux-x64/blender",
+                     "--background", "--python", "scripts/metadata_multiproc.py", "--",
+                     "--save_path", args.save_path,
+                     "--objects_path", args.objects_path,
+                     "--cpu_count", str(args.cpu_count)]
+    queue = WorkQueue(args.queue_path)
+    task_key = "metadata_" + os.path.basename(os.path.normpath(args.objects_path))
+    # keyed by both paths, another objects file or save path is another task
+    queue_key = f"metadata:{os.path.abspath(args.objects_path)}:{os.path.abspath(args.save_path)}"
+    payload = {"name": task_key, "command": queue_command, "env": {"DISPLAY": ":0.1"}, "cwd": os.getcwd()}
+    if queue.enqueue("metadata", queue_key, payload):
+        print(f"Enqueued metadata task {task_key} to {args.queue_path}")
+    else:
+        print(f"Metadata task {task_key} is already in {args.queue_path}")
+    exit(0)
+
 #CUDA_VISIBLE_DEVICES={gpu_id} export DISPLAY=:0.1 &&
 gpu_id = 0
 command=f'CUDA_VISIBLE_DEVICES={gpu_id} export DISPLAY=:0.1 && scripts/blender-3.2.2-linux-x64/blender \
@@ -72,6 +109,10 @@ command=f'CUDA_VISIBLE_DEVICES={gpu_id} export DISPLAY=:0.1 && scripts/blender-3
     --run_material {args.run_material} \
     --run_edge {args.run_edge} \
     --run_animation {args.run_animation}'
+if args.metrics_port is not None:
+    command += f' --metrics_port {args.metrics_port}'
+if args.metrics_textfile:
+    command += f' --metrics_textfile {args.metrics_textfile}'
 
 print('command:',command)
 logging.info(f'Executing command: {command}')
@@ -0,0 +1,250 @@
+"""Shape similarity search
+
+Finds the objects that look like a given object from compact geometric
+descriptors (a D2 shape distribution plus the principal extent ratios, see
+render_scripts/shape_descriptors.py):
+    - descriptors: computes the descriptors of all objects (or of the uids of an
+      id file) that have none yet with blender_geometry.py, many objects per
+      Blender process, into npz shards in --descriptor_dir,
+    - build: merges the shards into one index file with an IVF index (see
+      metadata_scripts/similarity_index.py),
+    - query: prints the objects most similar to --uid,
+    - benchmark: measures the query time and recall of the index on random
+      descriptors of --benchmark_size objects.
+ui_backend.py serves the index from /similar/<uid> with --similarity_index.
+
+Usage:
+    python3 scripts/similarity.py --objects_dir src/objects_database --descriptor_dir descriptors/ descriptors
+    python3 scripts/similarity.py --descriptor_dir descriptors/ --index_path similarity.npz build
+    python3 scripts/similarity.py --index_path similarity.npz --uid <uid> query
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from metadata_scripts.similarity_index import SimilarityIndex
+from render_scripts.object_locator import ObjectLocator
+from render_scripts.shape_descriptors import DESCRIPTOR_SIZE
+from thumbnails import BLENDER_PATH, load_id_file_uids
+
+GEOMETRY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_geometry.py")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--descriptor_dir
+        "--descriptor_dir",
+        type=str,
+        default="descriptors/",
+        help="Directory of the descriptor shards")
+    parser.add_argument( #--index_path
+        "--index_path",
+        type=str,
+        default="similarity.npz",
+        help="Path of the index file")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Only compute the descriptors of the uids of this id file, defaults to all objects")
+    parser.add_argument( #--batch_size
+        "--batch_size",
+        type=int,
+        default=64,
+        help="Number of objects processed by one Blender process")
+    parser.add_argument( #--processes
+        "--processes",
+        type=int,
+        default=4,
+        help="Number of Blender processes")
+    parser.add_argument( #--n_lists
+        "--n_lists",
+        type=int,
+        default=None,
+        help="Number of IVF clusters, defaults to the square root of the number of objects")
+    parser.add_argument( #--n_probe
+        "--n_probe",
+        type=int,
+        default=16,
+        help="Number of IVF clusters searched by a query, 0 searches all objects")
+    parser.add_argument( #--uid
+        "--uid",
+        type=str,
+        default=None,
+        help="Object to query")
+    parser.add_argument( #--k
+        "--k",
+        type=int,
+        default=10,
+        help="Number of similar objects")
+    parser.add_argument( #--benchmark_size
+        "--benchmark_size",
+        type=int,
+        default=800000,
+        help="Number of random descriptors of the benchmark")
+    parser.add_argument( #command
+        "command",
+        choices=["descriptors", "build", "query", "benchmark"])
+    return parser.parse_args()
+
+
+def shard_paths(descriptor_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(descriptor_dir, "*.npz")))
+
+
+def described_uids(descriptor_dir: str) -> Set[str]:
+    """Returns the uids of the descriptor shards."""
+    uids = set()
+    for path in shard_paths(descriptor_dir):
+        with np.load(path) as data:
+            uids.update(data["uids"].tolist())
+    return uids
+
+
+def descriptor_shard_size(output_path: str) -> int:
+    """Returns the number of objects of a descriptor shard, 0 if it was not written."""
+    if not os.path.exists(output_path):
+        return 0
+    with np.load(output_path) as data:
+        return len(data["uids"])
+
+
+def run_geometry_batches(
+    args,
+    paths: List[str],
+    output_dir: Optional[str] = None,
+    extra_args: Sequence[str] = (),
+    suffix: str = ".npz",
+    shard_size: Callable[[str], int] = descriptor_shard_size,
+) -> int:
+    """Runs blender_geometry.py over the objects in batches, one shard per batch,
+    returns the number of objects processed.
+
+    Args:
+        args: The arguments with --blender, --batch_size and --processes.
+        paths (List[str]): Object files to process.
+        output_dir (Optional[str], optional): Directory of the shards. Defaults to
+            None, --descriptor_dir.
+        extra_args (Sequence[str], optional): Further arguments of
+            blender_geometry.py, e.g. its --mode. Defaults to ().
+        suffix (str, optional): Suffix of the --output_path of a shard. Defaults
+            to ".npz".
+        shard_size (Callable[[str], int], optional): Returns the number of
+            objects of a written shard from its --output_path. Defaults to
+            descriptor_shard_size.
+    """
+    output_dir = args.descriptor_dir if output_dir is None else output_dir
+    batches = [paths[i:i + args.batch_size] for i in range(0, len(paths), args.batch_size)]
+    # shards of earlier runs are kept, a run prefix keeps the names unique
+    prefix = time.strftime("%Y%m%d-%H%M%S")
+
+    def run_batch(numbered_batch) -> int:
+        number, batch = numbered_batch
+        output_path = os.path.join(output_dir, f"{prefix}_{number:05d}{suffix}")
+        command = [
+            args.blender, "--background", "--python", GEOMETRY_SCRIPT, "--",
+            *extra_args,
+            "--objects_paths", ",".join(batch),
+            "--output_path", output_path,
+        ]
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return shard_size(output_path)
+
+    start = time.perf_counter()
+    processed = 0
+    with ThreadPoolExecutor(max_workers=args.processes) as executor:
+        for count in executor.map(run_batch, enumerate(batches)):
+            processed += count
+            print(f"{processed}/{len(paths)} objects processed, {time.perf_counter() - start:.0f}s")
+    return processed
+
+
+def compute_descriptors(args, locator: ObjectLocator) -> None:
+    uids = load_id_file_uids(args.id_file_path) if args.id_file_path else sorted(locator.paths)
+    done = described_uids(args.descriptor_dir)
+    paths = [path for path in (locator.find(uid) for uid in uids if uid not in done) if path is not None]
+    print(f"{len(done)} objects described, computing {len(paths)}")
+    computed = run_geometry_batches(args, paths)
+    print(f"Failed to describe {len(paths) - computed} objects")
+
+
+def build_index(args) -> None:
+    start = time.perf_counter()
+    index = SimilarityIndex.from_shards(shard_paths(args.descriptor_dir))
+    if len(index) == 0:
+        raise SystemExit(f"No descriptors in {args.descriptor_dir}")
+    index.build_ivf(args.n_lists)
+    index.save(args.index_path)
+    print(f"Indexed {len(index)} objects in {len(index.centroids)} clusters in {time.perf_counter() - start:.1f}s")
+
+
+def query(args) -> None:
+    index = SimilarityIndex.load(args.index_path)
+    start = time.perf_counter()
+    results = index.similar(args.uid, args.k, args.n_probe or None)
+    print(f"{len(results)} similar objects in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for uid, score in results:
+        print(f"{uid}: {score:.4f}")
+
+
+def benchmark(args) -> None:
+    """Times exact and IVF queries on clustered random descriptors and measures the recall."""
+    rng = np.random.default_rng(0)
+    centers = rng.random((2000, DESCRIPTOR_SIZE), dtype=np.float32)
+    vectors = centers[rng.integers(0, len(centers), args.benchmark_size)]
+    vectors += rng.normal(0, 0.05, vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = SimilarityIndex(np.array([f"{i:032x}" for i in range(len(vectors))]), vectors)
+
+    start = time.perf_counter()
+    index.build_ivf(args.n_lists)
+    print(f"IVF of {len(index)} descriptors with {len(index.centroids)} clusters built in {time.perf_counter() - start:.1f}s")
+
+    queries = rng.choice(len(index), 200, replace=False)
+    for n_probe in (None, args.n_probe):
+        times, recalls = [], []
+        for row in queries:
+            start = time.perf_counter()
+            rows, _ = index.query(index.vectors[row], args.k, n_probe)
+            times.append(time.perf_counter() - start)
+            exact, _ = index.query(index.vectors[row], args.k, None)
+            recalls.append(len(set(rows.tolist()) & set(exact.tolist())) / len(exact))
+        times.sort()
+        name = "exact" if n_probe is None else f"n_probe={n_probe}"
+        print(f"{name}: p50 {times[len(times) // 2] * 1000:.2f} ms, p99 {times[int(len(times) * 0.99)] * 1000:.2f} ms, "
+              f"recall@{args.k} {np.mean(recalls):.3f}")
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "descriptors":
+        compute_descriptors(args, ObjectLocator(args.objects_dir))
+    elif args.command == "build":
+        build_index(args)
+    elif args.command == "query":
+        if args.uid is None:
+            raise SystemExit("query needs --uid")
+        query(args)
+    else:
+        benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
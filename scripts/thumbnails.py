@@ -0,0 +1,186 @@
+"""Object thumbnails
+
+Renders a small preview image per uid with blender_thumbnails.py and keeps it
+in the packed thumbnail cache (see render_scripts/thumbnail_cache.py).
+ui_backend.py generates missing thumbnails lazily on the first request, this
+script prewarms the cache in batches:
+    - prewarm: renders the thumbnails of all objects (or of the uids of an id
+      file) that are not cached yet, many objects per Blender process,
+    - stats: prints the size of the cache.
+
+Usage:
+    python3 scripts/thumbnails.py --objects_dir src/objects_database --cache_dir thumbnails/ prewarm
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from render_scripts.object_locator import ObjectLocator
+from render_scripts.thumbnail_cache import ThumbnailCache
+
+BLENDER_PATH = "scripts/blender-3.2.2-linux-x64/blender"
+THUMBNAIL_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_thumbnails.py")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--cache_dir
+        "--cache_dir",
+        type=str,
+        default="thumbnails/",
+        help="Directory of the thumbnail cache")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable")
+    parser.add_argument( #--id_file_path
+        "--id_file_path",
+        type=str,
+        default=None,
+        help="Only prewarm the uids of this id file, defaults to all objects")
+    parser.add_argument( #--batch_size
+        "--batch_size",
+        type=int,
+        default=64,
+        help="Number of objects rendered by one Blender process")
+    parser.add_argument( #--processes
+        "--processes",
+        type=int,
+        default=4,
+        help="Number of Blender processes")
+    parser.add_argument( #command
+        "command",
+        choices=["prewarm", "stats"])
+    return parser.parse_args()
+
+
+def render_thumbnails(blender: str, object_paths: List[str], timeout: float = 3600) -> Dict[str, bytes]:
+    """Renders the thumbnails of the objects in one Blender process.
+
+    Args:
+        blender (str): Path of the Blender executable.
+        object_paths (List[str]): Paths of the object files.
+        timeout (float, optional): Seconds before the Blender process is killed.
+            Defaults to 3600.
+
+    Returns:
+        Dict[str, bytes]: PNG of every uid that rendered, failed uids are missing.
+    """
+    with tempfile.TemporaryDirectory(prefix="thumbnails_") as output_dir:
+        command = [
+            blender, "--background", "--python", THUMBNAIL_SCRIPT, "--",
+            "--objects_paths", ",".join(object_paths),
+            "--output_dir", output_dir,
+        ]
+        try:
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # keep the thumbnails rendered before the timeout
+            print(f"Thumbnail rendering timed out after {timeout:.0f}s")
+        thumbnails = {}
+        for name in os.listdir(output_dir):
+            uid, ext = os.path.splitext(name)
+            if ext == ".png":
+                with open(os.path.join(output_dir, name), "rb") as f:
+                    thumbnails[uid] = f.read()
+        return thumbnails
+
+
+class ThumbnailService:
+    """Serves cached thumbnails and renders missing ones on first request.
+
+    Concurrent requests for the same uid wait for a single render, and at most
+    max_renders Blender processes run at a time.
+    """
+
+    def __init__(self, cache: ThumbnailCache, locator: ObjectLocator, blender: str, max_renders: int = 2) -> None:
+        self.cache = cache
+        self.locator = locator
+        self.blender = blender
+        self.render_slots = threading.Semaphore(max_renders)
+        self.lock = threading.Lock()
+        self.pending: Dict[str, threading.Event] = {}
+
+    def get(self, uid: str) -> Optional[Tuple[str, bytes]]:
+        """Returns the hash and PNG of the thumbnail, None if the object is unknown
+        or cannot be rendered."""
+        cached = self.cache.get(uid)
+        if cached is not None:
+            return cached
+        path = self.locator.find(uid)
+        if path is None:
+            return None
+
+        with self.lock:
+            event = self.pending.get(uid)
+            owner = event is None
+            if owner:
+                event = self.pending[uid] = threading.Event()
+        if owner:
+            try:
+                with self.render_slots:
+                    thumbnails = render_thumbnails(self.blender, [path], timeout=300)
+                if uid in thumbnails:
+                    self.cache.put(uid, thumbnails[uid])
+            finally:
+                with self.lock:
+                    del self.pending[uid]
+                event.set()
+        else:
+            event.wait()
+        return self.cache.get(uid)
+
+
+def load_id_file_uids(id_file_path: str) -> List[str]:
+    """Returns the uids of all groups of an id file."""
+    with open(id_file_path, "r") as f:
+        groups = json.load(f)
+    return [uid for _, uids in groups.values() for uid in uids]
+
+
+def prewarm(args, cache: ThumbnailCache, locator: ObjectLocator) -> None:
+    uids = load_id_file_uids(args.id_file_path) if args.id_file_path else sorted(locator.paths)
+    missing = cache.missing(uids)
+    paths = [(uid, locator.find(uid)) for uid in missing]
+    not_found = [uid for uid, path in paths if path is None]
+    paths = [path for _, path in paths if path is not None]
+    batches = [paths[i:i + args.batch_size] for i in range(0, len(paths), args.batch_size)]
+    print(f"{len(uids) - len(missing)} of {len(uids)} thumbnails cached, rendering {len(paths)} "
+          f"in {len(batches)} batches, {len(not_found)} objects not found")
+
+    start = time.perf_counter()
+    rendered = 0
+    with ThreadPoolExecutor(max_workers=args.processes) as executor:
+        for thumbnails in executor.map(lambda batch: render_thumbnails(args.blender, batch), batches):
+            for uid, data in thumbnails.items():
+                cache.put(uid, data)
+            rendered += len(thumbnails)
+            print(f"{rendered}/{len(paths)} thumbnails rendered, {time.perf_counter() - start:.0f}s")
+    print(f"Failed to render {len(paths) - rendered} thumbnails")
+
+
+def main():
+    args = parse_arguments()
+    cache = ThumbnailCache(args.cache_dir)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        prewarm(args, cache, ObjectLocator(args.objects_dir))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
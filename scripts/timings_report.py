@@ -0,0 +1,137 @@
+"""Render timings report
+
+Aggregates the timing spans written by render.py and blender_render.py with
+--timings_dir (one <task_key>.jsonl file per task, see
+render_scripts/profiling.py):
+    - percentiles of the duration of every stage across the run,
+    - the slowest tasks (objects or group scenes) with their object statistics.
+
+Usage:
+    python3 scripts/timings_report.py --timings_dir timings/ --top 20
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+from typing import Dict, List
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--timings_dir
+        "--timings_dir",
+        type=str,
+        required=True,
+        help="Directory of the <task_key>.jsonl timing files")
+    parser.add_argument( #--top
+        "--top",
+        type=int,
+        default=20,
+        help="Number of slowest tasks to list")
+    parser.add_argument( #--output_json
+        "--output_json",
+        type=str,
+        default=None,
+        help="Optional path to save the report as json")
+    return parser.parse_args()
+
+
+def load_records(timings_dir: str) -> List[dict]:
+    """Reads the records of all JSONL files in timings_dir, skipping broken lines of
+    tasks that were killed while writing."""
+    records = []
+    for path in sorted(glob.glob(os.path.join(timings_dir, "*.jsonl"))):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Returns the q-th percentile (0-100) of sorted values with linear interpolation."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def stage_percentiles(records: List[dict]) -> Dict[str, dict]:
+    """Returns count, total, p50, p90, p99 and max duration of every stage."""
+    durations: Dict[str, List[float]] = {}
+    for rec in records:
+        if "duration_s" in rec:
+            durations.setdefault(rec["stage"], []).append(rec["duration_s"])
+
+    stages = {}
+    for stage, values in durations.items():
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "total_s": sum(values),
+            "p50_s": percentile(values, 50),
+            "p90_s": percentile(values, 90),
+            "p99_s": percentile(values, 99),
+            "max_s": values[-1],
+        }
+    return dict(sorted(stages.items(), key=lambda item: -item[1]["total_s"]))
+
+
+def slowest_tasks(records: List[dict], top: int) -> List[dict]:
+    """Returns the tasks with the longest total time, with their object statistics.
+
+    The time of a task is the sum of its blender_task attempts (measured by
+    render.py, without the retry backoff) if present, otherwise the sum of its
+    blender_render.py stage spans.
+    """
+    tasks: Dict[str, dict] = {}
+    for rec in sorted(records, key=lambda rec: rec.get("start", 0.0)):
+        task = tasks.setdefault(rec["task"], {"task": rec["task"], "stages_s": 0.0, "peak_rss_mb": 0.0})
+        if rec["stage"] == "object_stats":
+            task.update({k: v for k, v in rec.items() if k not in {"task", "stage", "start"}})
+        elif rec["stage"] == "blender_task":
+            task["blender_task_s"] = task.get("blender_task_s", 0.0) + rec["duration_s"]
+            task["attempts"] = task.get("attempts", 0) + 1
+            task["returncode"] = rec.get("returncode")
+        elif "duration_s" in rec:
+            task["stages_s"] += rec["duration_s"]
+        task["peak_rss_mb"] = max(task["peak_rss_mb"], rec.get("peak_rss_mb") or 0.0)
+
+    for task in tasks.values():
+        task["total_s"] = task.get("blender_task_s", task["stages_s"])
+    tasks.pop("render_py", None)
+    return sorted(tasks.values(), key=lambda task: -task["total_s"])[:top]
+
+
+def main():
+    args = parse_arguments()
+    records = load_records(args.timings_dir)
+    if not records:
+        print(f"No timing records found in {args.timings_dir}")
+        exit(1)
+
+    stages = stage_percentiles(records)
+    print(f"{'stage':<26}{'count':>8}{'total s':>12}{'p50 s':>10}{'p90 s':>10}{'p99 s':>10}{'max s':>10}")
+    for stage, stat in stages.items():
+        print(f"{stage:<26}{stat['count']:>8}{stat['total_s']:>12.2f}{stat['p50_s']:>10.3f}"
+              f"{stat['p90_s']:>10.3f}{stat['p99_s']:>10.3f}{stat['max_s']:>10.3f}")
+
+    slowest = slowest_tasks(records, args.top)
+    print(f"\nSlowest {len(slowest)} tasks:")
+    for task in slowest:
+        texture_bytes = task.get("texture_bytes", {}).get("decoded_bytes", 0)
+        print(f"{task['task']:<40}{task['total_s']:>10.2f}s  polys: {task.get('poly_count', '-')}  "
+              f"textures: {texture_bytes / 2**20:.1f} MB  peak rss: {task['peak_rss_mb']:.0f} MB")
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"stages": stages, "slowest_tasks": slowest}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
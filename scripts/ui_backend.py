@@ -0,0 +1,700 @@
+"""Backend of the PiQuick Objects Flutter UI
+
+Serves object listings from the metadata extracted by metadata_multiproc.py
+(see metadata_scripts/metadata_table.py) over HTTP:
+
+    GET /columns
+        The metadata columns with their minimum and maximum value.
+    GET /objects?filter=poly_count:0:50000&filter=armature_count:1:&sort=-poly_count&limit=50
+        The objects matching every range filter (<column>:<min>:<max>, an empty
+        bound is open), sorted by a column (- for descending, default uid), one
+        page at a time. The response holds the columns of the page, the number of
+        matching objects and a cursor, pass it as ?cursor= to get the next page.
+    GET /objects?flag=has_armature&flag=!is_usdz&flag=group:chairs
+        The objects with every flag (! for without it) of the bitmap index, see
+        metadata_scripts/bitmap_index.py, together with the range filters.
+    GET /objects?where=has_animation and (poly_count<5000 or group:chairs)
+        The objects matching a query of metadata_scripts/metadata_query.py.
+    GET /flags
+        The flags of the bitmap index with their number of objects.
+    GET /objects?tag=chair&category=furniture-home
+        The objects with every tag and category of the Objaverse annotations
+        (with --annotations_dir, see annotations.py), together with the filters.
+    GET /annotations/terms?kind=tag&prefix=ch&limit=20
+        The most frequent tags or categories starting with prefix, for
+        autocompletion.
+    GET /objects/<uid>
+        The metadata of one object.
+    GET /thumbnails/<uid>
+        A small PNG preview of the object (with --thumbnail_dir), rendered on the
+        first request and then served from the thumbnail cache with an ETag.
+    GET /models/<uid>
+        The preview GLB of the object precomputed by lods.py (with --lod_dir), or
+        the original object if it has no preview. The X-Model-Lod header tells
+        which one was sent.
+    GET /models/<uid>?lod=full
+        The original object file.
+    Model files are sent with sendfile (zero-copy, never read into memory),
+    support single Range requests (206 Partial Content) and at most
+    --max_large_transfers transfers larger than 16 MB run at a time, further
+    ones wait up to 30s and are then answered 503 with Retry-After.
+    GET /groups
+        The object groups (with --groups_path) in the id file format,
+        {group: [separate_flag, [uids]]}, see group_store.py.
+    POST /groups/<group>?separate=1
+        Creates a group, 201 if it is new.
+    DELETE /groups/<group>
+        Deletes a group.
+    POST /groups/<group>/objects with a json body {"uids": [...]}
+        Adds objects to a group, returns the uids that were added.
+    DELETE /groups/<group>/objects/<uid>
+        Removes an object from a group.
+    GET /objects/<uid>/groups
+        The groups of an object.
+    GET /similar/<uid>?k=20
+        The k objects with the most similar shape (with --similarity_index, see
+        similarity.py) and their cosine similarity.
+
+Responses are compact json, or msgpack with ?format=msgpack or an
+"Accept: application/x-msgpack" header if the msgpack package is installed.
+
+Usage:
+    python3 scripts/ui_backend.py --metadata_dir metadata/ --port 8080
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+from group_store import GroupStore
+from metadata_scripts.annotation_store import AnnotationStore
+from metadata_scripts.bitmap_index import GROUP_PREFIX, load_flags
+from metadata_scripts.metadata_query import query_mask
+from metadata_scripts.metadata_table import MetadataTable
+from metadata_scripts.similarity_index import SimilarityIndex
+from render_scripts.lod_cache import LodCache
+from render_scripts.object_locator import ObjectLocator
+from render_scripts.thumbnail_cache import ThumbnailCache
+from thumbnails import BLENDER_PATH, ThumbnailService
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAX_PAGE_SIZE = 1000
+# thumbnails of an uid only change when they are rendered again, the ETag
+# revalidates them after a day
+THUMBNAIL_CACHE_CONTROL = "public, max-age=86400"
+MODEL_CONTENT_TYPES = {".glb": "model/gltf-binary", ".gltf": "model/gltf+json"}
+LARGE_TRANSFER_BYTES = 16 * 1024 * 1024
+TRANSFER_SLOT_TIMEOUT = 30.0
+
+
+class BadRequest(Exception):
+    """Error in the request, answered with status 400."""
+
+
+class NotFound(Exception):
+    """Unknown path or object, answered with status 404."""
+
+
+class RangeNotSatisfiable(Exception):
+    """Range outside of the file, answered with status 416."""
+
+    def __init__(self, message: str, size: int) -> None:
+        super().__init__(message)
+        self.size = size
+
+
+class ServiceUnavailable(Exception):
+    """Too many large transfers, answered with status 503."""
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( #--metadata_dir
+        "--metadata_dir",
+        type=str,
+        required=True,
+        help="The --save_path of metadata_multiproc.py")
+    parser.add_argument( #--host
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to listen on")
+    parser.add_argument( #--port
+        "--port",
+        type=int,
+        default=8080,
+        help="Port to listen on")
+    parser.add_argument( #--objects_dir
+        "--objects_dir",
+        type=str,
+        default="src/objects_database",
+        help="Directory of the downloaded object files")
+    parser.add_argument( #--thumbnail_dir
+        "--thumbnail_dir",
+        type=str,
+        default=None,
+        help="Directory of the thumbnail cache, enables /thumbnails")
+    parser.add_argument( #--blender
+        "--blender",
+        type=str,
+        default=BLENDER_PATH,
+        help="Path of the Blender executable, renders missing thumbnails")
+    parser.add_argument( #--lod_dir
+        "--lod_dir",
+        type=str,
+        default=None,
+        help="The --cache_dir of lods.py, /models serves its previews first")
+    parser.add_argument( #--lod_max_triangles
+        "--lod_max_triangles",
+        type=int,
+        default=50000,
+        help="The --max_triangles of lods.py")
+    parser.add_argument( #--lod_max_texture_size
+        "--lod_max_texture_size",
+        type=int,
+        default=1024,
+        help="The --max_texture_size of lods.py")
+    parser.add_argument( #--max_large_transfers
+        "--max_large_transfers",
+        type=int,
+        default=8,
+        help="Number of concurrent model transfers larger than 16 MB")
+    parser.add_argument( #--groups_path
+        "--groups_path",
+        type=str,
+        default=None,
+        help="SQLite groups file of group_store.py, enables /groups")
+    parser.add_argument( #--similarity_index
+        "--similarity_index",
+        type=str,
+        default=None,
+        help="Index file of similarity.py, enables /similar")
+    parser.add_argument( #--annotations_dir
+        "--annotations_dir",
+        type=str,
+        default=None,
+        help="Annotation store of annotations.py, enables tag and category filters")
+    return parser.parse_args()
+
+
+def encode_cursor(version: str, sort: str, ordinal: int) -> str:
+    data = json.dumps({"v": version, "s": sort, "o": ordinal}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str, sort: str) -> int:
+    """Returns the ordinal to continue after, checking the cursor fits the request."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        ordinal = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise BadRequest("Invalid cursor")
+    if data.get("v") != version:
+        raise BadRequest("The metadata changed since the cursor was created, start from the first page")
+    if data.get("s") != sort:
+        raise BadRequest("The cursor belongs to another sort order")
+    return ordinal
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses a Range header of a file of size bytes.
+
+    Args:
+        header (str): The header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-512".
+        size (int): Size of the file.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts after the end of the file.
+
+    Returns:
+        Optional[Tuple[int, int]]: The first and last byte (inclusive), None if
+        the header is not a single byte range, then the whole file is sent.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+    first, sep, last = (part.strip() for part in ranges.partition("-"))
+    if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # suffix range, the last bytes of the file
+        if int(last) == 0:
+            raise RangeNotSatisfiable(f"Empty suffix range {header}", size)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(f"Range {header} is outside of the {size} bytes", size)
+    return start, end
+
+
+def parse_filter(text: str) -> Tuple[str, Optional[float], Optional[float]]:
+    """Parses a <column>:<min>:<max> filter, an empty bound is open."""
+    parts = text.split(":")
+    if len(parts) != 3:
+        raise BadRequest(f"Filter '{text}' is not <column>:<min>:<max>")
+    bounds = []
+    for part in parts[1:]:
+        try:
+            bounds.append(float(part) if part else None)
+        except ValueError:
+            raise BadRequest(f"Bound '{part}' of filter '{text}' is not a number")
+    return parts[0], bounds[0], bounds[1]
+
+
+class UIBackend:
+    """State and request handling of the backend, independent of the HTTP server."""
+
+    def __init__(
+        self,
+        metadata_dir: str,
+        objects_dir: Optional[str] = None,
+        thumbnail_dir: Optional[str] = None,
+        blender: str = BLENDER_PATH,
+        lods: Optional[LodCache] = None,
+        max_large_transfers: int = 8,
+        groups: Optional[GroupStore] = None,
+        similarity: Optional[SimilarityIndex] = None,
+        annotations: Optional[AnnotationStore] = None,
+    ) -> None:
+        self.metadata_dir = metadata_dir
+        self.table = MetadataTable.load(metadata_dir)
+        # warm the sort orders, so the first requests are fast too
+        for name in self.table.columns:
+            self.table.order(name)
+        self.locator = ObjectLocator(objects_dir) if objects_dir and os.path.isdir(objects_dir) else None
+        self.thumbnails = None
+        if thumbnail_dir and self.locator is not None:
+            self.thumbnails = ThumbnailService(ThumbnailCache(thumbnail_dir), self.locator, blender)
+        self.lods = lods
+        self.transfer_slots = threading.BoundedSemaphore(max_large_transfers)
+        self.groups = groups
+        self.similarity = similarity
+        self.annotations = annotations
+        self.flags = load_flags(
+            metadata_dir,
+            self.table,
+            paths=self.locator.paths if self.locator is not None else None,
+            groups=groups.groups() if groups is not None else None,
+        )
+
+    def filter_mask(
+        self,
+        filters: List[str],
+        flags: List[str] = (),
+        where: Optional[str] = None,
+        terms: Optional[Tuple[List[str], List[str]]] = None,
+    ) -> np.ndarray:
+        mask = np.ones(len(self.table), dtype=bool)
+        try:
+            if flags:
+                include = [flag for flag in flags if not flag.startswith("!")]
+                exclude = [flag[1:] for flag in flags if flag.startswith("!")]
+                mask = self.flags.mask(self.flags.combine(include, exclude))
+            for text in filters:
+                column, minimum, maximum = parse_filter(text)
+                mask &= self.table.range_mask(column, minimum, maximum)
+            if where:
+                mask &= query_mask(self.table, where, self.flags)
+            if terms is not None and (terms[0] or terms[1]):
+                mask &= self.annotation_mask(*terms)
+        except KeyError as error:
+            raise BadRequest(str(error.args[0]))
+        except ValueError as error:
+            raise BadRequest(f"Invalid where query: {error}")
+        return mask
+
+    def annotation_mask(self, tags: List[str], categories: List[str]) -> np.ndarray:
+        """Returns the mask of the rows with every tag and category."""
+        if self.annotations is None:
+            raise NotFound("Annotations are not enabled, start the backend with --annotations_dir")
+        uids = self.annotations.uids[self.annotations.select(tags, categories)].astype(str)
+        mask = np.zeros(len(self.table), dtype=bool)
+        ordinals = self.table.ordinals(uids)
+        mask[ordinals[ordinals >= 0]] = True
+        return mask
+
+    def annotation_terms(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        if self.annotations is None:
+            raise NotFound("Annotations are not enabled, start the backend with --annotations_dir")
+        try:
+            limit = min(int(query.get("limit", ["20"])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise BadRequest("limit is not an integer")
+        if limit < 1:
+            raise BadRequest("limit has to be at least 1")
+        try:
+            terms = self.annotations.term_counts(query.get("kind", ["tag"])[0], query.get("prefix", [""])[0], limit)
+        except KeyError as error:
+            raise BadRequest(str(error.args[0]))
+        return {"term": [term for term, _ in terms], "count": [count for _, count in terms]}
+
+    def flag_counts(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        return {"objects": len(self.table), "flags": self.flags.counts()}
+
+    def columns(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        result = {}
+        for name, values in self.table.columns.items():
+            present = values[values >= 0]
+            result[name] = {
+                "min": int(present.min()) if len(present) else None,
+                "max": int(present.max()) if len(present) else None,
+                "count": int(len(present)),
+            }
+        return {"objects": len(self.table), "columns": result}
+
+    def objects(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        sort = query.get("sort", ["uid"])[0]
+        descending = sort.startswith("-")
+        sort_column = sort.lstrip("-")
+        if sort_column != "uid" and sort_column not in self.table.columns:
+            raise BadRequest(f"Unknown sort column '{sort_column}'")
+        try:
+            limit = min(int(query.get("limit", ["100"])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise BadRequest("limit is not an integer")
+        if limit < 1:
+            raise BadRequest("limit has to be at least 1")
+
+        mask = self.filter_mask(
+            query.get("filter", []),
+            query.get("flag", []),
+            query.get("where", [None])[0],
+            (query.get("tag", []), query.get("category", [])),
+        )
+        after = None
+        if "cursor" in query:
+            after = decode_cursor(query["cursor"][0], self.table.version, sort)
+        ordinals, last = self.table.page(
+            mask, None if sort_column == "uid" else sort_column, descending, after, limit
+        )
+        return {
+            "total": int(mask.sum()),
+            "objects": self.table.rows(ordinals),
+            "next_cursor": None if last is None else encode_cursor(self.table.version, sort, last),
+        }
+
+    def object(self, uid: str) -> Dict[str, Any]:
+        ordinal = int(self.table.ordinals([uid])[0])
+        if ordinal < 0:
+            raise NotFound(f"Unknown object {uid}")
+        row = self.table.rows(np.array([ordinal]))
+        return {name: values[0] for name, values in row.items()}
+
+    def thumbnail(self, uid: str) -> Tuple[str, bytes]:
+        """Returns the hash and PNG of the thumbnail of an object."""
+        if self.thumbnails is None:
+            raise NotFound("Thumbnails are not enabled, start the backend with --thumbnail_dir")
+        thumbnail = self.thumbnails.get(uid)
+        if thumbnail is None:
+            raise NotFound(f"No thumbnail of {uid}")
+        return thumbnail
+
+    def model(self, uid: str, lod: str = "preview") -> Tuple[str, str, str]:
+        """Returns the path, level of detail and ETag of the model file of an object.
+
+        Args:
+            uid (str): The object.
+            lod (str, optional): "preview" for the preview GLB if it was
+                precomputed, else the original, "full" for the original.
+                Defaults to "preview".
+        """
+        if lod not in ("preview", "full"):
+            raise BadRequest(f"Unknown lod '{lod}', choose from preview, full")
+        path = self.locator.find(uid) if self.locator is not None else None
+        if path is None:
+            raise NotFound(f"No model of {uid}")
+        # the hash is only looked up, a source hashed on the request thread would
+        # block it for seconds, lods.py hashes the sources when it precomputes
+        digest = self.lods.cached_hash(path) if self.lods is not None else None
+        if digest is None:
+            return path, "full", f'"{os.path.getsize(path)}-{os.path.getmtime(path):.0f}"'
+        if lod == "preview":
+            lod_path = self.lods.lod_path(digest)
+            if os.path.exists(lod_path):
+                return lod_path, "preview", f'"{digest}-preview"'
+        return path, "full", f'"{digest}"'
+
+    def similar(self, uid: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        if self.similarity is None:
+            raise NotFound("Similarity search is not enabled, start the backend with --similarity_index")
+        try:
+            k = min(int(query.get("k", ["20"])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise BadRequest("k is not an integer")
+        if k < 1:
+            raise BadRequest("k has to be at least 1")
+        try:
+            results = self.similarity.similar(uid, k)
+        except KeyError as error:
+            raise NotFound(str(error.args[0]))
+        return {"uid": [uid for uid, _ in results], "similarity": [round(score, 4) for _, score in results]}
+
+    def group_store(self) -> GroupStore:
+        if self.groups is None:
+            raise NotFound("Groups are not enabled, start the backend with --groups_path")
+        return self.groups
+
+    def create_group(self, group: str, query: Dict[str, List[str]]) -> bool:
+        separate = query.get("separate", ["0"])[0]
+        if separate not in ("0", "1"):
+            raise BadRequest("separate is 0 or 1")
+        return self.group_store().create_group(group, separate == "1")
+
+    def update_group(self, group: str, uids: Optional[List[str]] = None, remove: bool = False) -> List[str]:
+        """Adds or removes objects, or deletes the group if uids is None."""
+        store = self.group_store()
+        try:
+            if uids is None:
+                removed = store.delete_group(group)
+                self.flags.drop(GROUP_PREFIX + group)
+                return removed
+            changed = store.remove(group, uids) if remove else store.add(group, uids)
+        except KeyError as error:
+            raise NotFound(str(error.args[0]))
+        # the group flag follows the store, only the changed bits are set
+        self.flags.set_rows(GROUP_PREFIX + group, self.table.ordinals(changed), not remove)
+        return changed
+
+
+def make_handler(backend: UIBackend):
+    """Returns the request handler class serving the backend."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # (method, path pattern, handler name), the groups of the pattern are arguments
+        routes = [
+            ("GET", re.compile(r"/columns"), "get_columns"),
+            ("GET", re.compile(r"/flags"), "get_flags"),
+            ("GET", re.compile(r"/annotations/terms"), "get_annotation_terms"),
+            ("GET", re.compile(r"/objects"), "get_objects"),
+            ("GET", re.compile(r"/objects/([0-9a-zA-Z_-]+)"), "get_object"),
+            ("GET", re.compile(r"/thumbnails/([0-9a-zA-Z_-]+)"), "get_thumbnail"),
+            ("GET", re.compile(r"/models/([0-9a-zA-Z_-]+)"), "get_model"),
+            ("GET", re.compile(r"/groups"), "get_groups"),
+            ("POST", re.compile(r"/groups/([^/]+)"), "post_group"),
+            ("DELETE", re.compile(r"/groups/([^/]+)"), "delete_group"),
+            ("POST", re.compile(r"/groups/([^/]+)/objects"), "post_group_objects"),
+            ("DELETE", re.compile(r"/groups/([^/]+)/objects/([0-9a-zA-Z_-]+)"), "delete_group_object"),
+            ("GET", re.compile(r"/objects/([0-9a-zA-Z_-]+)/groups"), "get_object_groups"),
+            ("GET", re.compile(r"/similar/([0-9a-zA-Z_-]+)"), "get_similar"),
+        ]
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def send_data(self, data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+            """Sends data as json, or as msgpack if requested and available."""
+            wants_msgpack = (
+                self.query.get("format", [""])[0] == "msgpack"
+                or "application/x-msgpack" in self.headers.get("Accept", "")
+            )
+            if wants_msgpack and msgpack is not None:
+                body = msgpack.packb(data)
+                content_type = "application/x-msgpack"
+            else:
+                body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+                content_type = "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def send_bytes(self, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def send_file(self, path: str, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+            """Sends a file or the requested range of it, from the page cache to the socket."""
+            headers = headers or {}
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                byte_range = None
+                # a range of an older version of the file would corrupt the client copy
+                if "Range" in self.headers and self.headers.get("If-Range", headers.get("ETag")) == headers.get("ETag"):
+                    byte_range = parse_range(self.headers["Range"], size)
+                start, end = byte_range if byte_range is not None else (0, size - 1)
+                length = end - start + 1
+
+                large = self.command != "HEAD" and length >= LARGE_TRANSFER_BYTES
+                if large and not backend.transfer_slots.acquire(timeout=TRANSFER_SLOT_TIMEOUT):
+                    raise ServiceUnavailable("Too many concurrent model transfers, retry later")
+                try:
+                    self.send_response(200 if byte_range is None else 206)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(length))
+                    self.send_header("Accept-Ranges", "bytes")
+                    if byte_range is not None:
+                        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    if self.command != "HEAD" and length > 0:
+                        self.connection.sendfile(f, start, length)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the viewer went away, e.g. it cancelled a streamed range
+                    self.close_connection = True
+                finally:
+                    if large:
+                        backend.transfer_slots.release()
+
+        def not_modified(self, etag: str) -> bool:
+            """Answers 304 if the client has the current version of the resource."""
+            if etag not in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                return False
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+
+        def dispatch(self) -> None:
+            url = urlparse(self.path)
+            self.query = parse_qs(url.query)
+            try:
+                for method, pattern, name in self.routes:
+                    match = pattern.fullmatch(url.path)
+                    if match and method == ("GET" if self.command == "HEAD" else self.command):
+                        getattr(self, name)(*(unquote(group) for group in match.groups()))
+                        break
+                else:
+                    raise NotFound(f"Unknown path {url.path}")
+            except BadRequest as error:
+                self.send_data({"error": str(error)}, 400)
+            except NotFound as error:
+                self.send_data({"error": str(error)}, 404)
+            except RangeNotSatisfiable as error:
+                self.send_data({"error": str(error)}, 416, {"Content-Range": f"bytes */{error.size}"})
+            except ServiceUnavailable as error:
+                self.send_data({"error": str(error)}, 503, {"Retry-After": "1"})
+
+        do_GET = dispatch
+        do_HEAD = dispatch
+        do_POST = dispatch
+        do_DELETE = dispatch
+
+        def do_OPTIONS(self) -> None:
+            """Answers the CORS preflight of POST and DELETE requests."""
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "GET, HEAD, POST, DELETE")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type, Range, If-None-Match")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def read_json(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise BadRequest("The body is not json")
+
+        def get_columns(self) -> None:
+            self.send_data(backend.columns(self.query))
+
+        def get_flags(self) -> None:
+            self.send_data(backend.flag_counts(self.query))
+
+        def get_annotation_terms(self) -> None:
+            self.send_data(backend.annotation_terms(self.query))
+
+        def get_objects(self) -> None:
+            self.send_data(backend.objects(self.query))
+
+        def get_object(self, uid: str) -> None:
+            self.send_data(backend.object(uid))
+
+        def get_thumbnail(self, uid: str) -> None:
+            digest, png = backend.thumbnail(uid)
+            etag = f'"{digest}"'
+            if not self.not_modified(etag):
+                self.send_bytes(png, "image/png", {"ETag": etag, "Cache-Control": THUMBNAIL_CACHE_CONTROL})
+
+        def get_model(self, uid: str) -> None:
+            path, lod, etag = backend.model(uid, self.query.get("lod", ["preview"])[0])
+            if not self.not_modified(etag):
+                content_type = MODEL_CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+                self.send_file(path, content_type, {
+                    "ETag": etag,
+                    "X-Model-Lod": lod,
+                    "Access-Control-Expose-Headers": "ETag, X-Model-Lod, Content-Range, Accept-Ranges",
+                })
+
+        def get_groups(self) -> None:
+            self.send_data(backend.group_store().groups())
+
+        def post_group(self, group: str) -> None:
+            created = backend.create_group(group, self.query)
+            self.send_data({"group": group, "created": created}, 201 if created else 200)
+
+        def delete_group(self, group: str) -> None:
+            self.send_data({"group": group, "removed": backend.update_group(group)})
+
+        def post_group_objects(self, group: str) -> None:
+            body = self.read_json()
+            uids = body.get("uids") if isinstance(body, dict) else None
+            if not isinstance(uids, list) or not all(isinstance(uid, str) for uid in uids):
+                raise BadRequest('The body has to be {"uids": [...]}')
+            self.send_data({"group": group, "added": backend.update_group(group, uids)})
+
+        def delete_group_object(self, group: str, uid: str) -> None:
+            self.send_data({"group": group, "removed": backend.update_group(group, [uid], remove=True)})
+
+        def get_object_groups(self, uid: str) -> None:
+            self.send_data({"uid": uid, "groups": backend.group_store().membership(uid)})
+
+        def get_similar(self, uid: str) -> None:
+            self.send_data(backend.similar(uid, self.query))
+
+    return Handler
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    lods = LodCache(args.lod_dir, args.lod_max_triangles, args.lod_max_texture_size) if args.lod_dir else None
+    groups = GroupStore(args.groups_path) if args.groups_path else None
+    similarity = SimilarityIndex.load(args.similarity_index) if args.similarity_index else None
+    annotations = AnnotationStore(args.annotations_dir) if args.annotations_dir else None
+    backend = UIBackend(
+        args.metadata_dir, args.objects_dir, args.thumbnail_dir, args.blender, lods, args.max_large_transfers, groups,
+        similarity, annotations,
+    )
+    print(f"Loaded the metadata of {len(backend.table)} objects in {time.perf_counter() - start:.2f}s")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Shared render/metadata task queue with time-limited leases.
+
+The queue is a SQLite file, so it can live on storage shared by several nodes
+and needs no server. Any number of workers (see queue_worker.py) claim tasks:
+    - claim() leases the oldest queued task to a worker for lease_seconds,
+    - heartbeat() extends the lease while the worker is busy,
+    - complete() / fail() finish the task, a failed task is queued again until
+      it used up its max_attempts,
+    - a lease that expired (the worker crashed or lost its node) is re-queued by
+      the next claim(), or by requeue_expired().
+
+Every state change runs in its own BEGIN IMMEDIATE transaction, which SQLite
+serializes across processes. The rollback journal (not WAL) is used because WAL
+does not work on network file systems. Lease times are wall clock times, so the
+clocks of the nodes should be synchronized (NTP).
+
+Usage:
+    python3 scripts/work_queue.py --queue_path /shared/render_queue.sqlite status
+    python3 scripts/work_queue.py --queue_path /shared/render_queue.sqlite requeue
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Generator, Iterable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    task_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+"""
+
+
+@dataclass
+class Task:
+    """A task claimed from the queue."""
+
+    id: int
+    kind: str
+    task_key: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class WorkQueue:
+    """Task queue backed by a SQLite file."""
+
+    def __init__(self, path: str, lease_seconds: float = 300.0) -> None:
+        """Initializes the WorkQueue, creating the database if needed.
+
+        Args:
+            path (str): Path of the SQLite file.
+            lease_seconds (float, optional): Length of a lease, a worker has to
+                heartbeat more often than this. Defaults to 300.0.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.execute("PRAGMA busy_timeout = 60000")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Generator[sqlite3.Connection, None, None]:
+        """Runs the enclosed block in a BEGIN IMMEDIATE transaction."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def enqueue(
+        self, kind: str, task_key: str, payload: Dict[str, Any], max_attempts: int = 3
+    ) -> bool:
+        """Adds a task, returns False if a task with the same key already exists.
+
+        Enqueueing the tasks of a run again only adds the missing ones, tasks that
+        are running or finished are kept.
+
+        Args:
+            kind (str): Kind of the task, e.g. "render" or "metadata".
+            task_key (str): Unique key of the task, it has to identify the output of
+                the task, e.g. the output directory plus the uid or group name.
+            payload (Dict[str, Any]): Json serializable description of the work.
+            max_attempts (int, optional): Number of times the task is tried before it
+                is marked failed. Defaults to 3.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO tasks (kind, task_key, payload, max_attempts, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, task_key, json.dumps(payload), max_attempts, now, now),
+            )
+        return cursor.rowcount == 1
+
+    def _requeue_expired(self, connection: sqlite3.Connection, now: float) -> int:
+        connection.execute(
+            "UPDATE tasks SET status = 'failed', worker = NULL, error = 'lease expired', updated = ?"
+            " WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+            (now, now),
+        )
+        cursor = connection.execute(
+            "UPDATE tasks SET status = 'queued', worker = NULL, updated = ?"
+            " WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """Re-queues the tasks whose lease expired, returns their number."""
+        with self._transaction() as connection:
+            return self._requeue_expired(connection, time.time())
+
+    def claim(self, worker: str, kinds: Optional[Iterable[str]] = None) -> Optional[Task]:
+        """Leases the oldest queued task to the worker.
+
+        Args:
+            worker (str): Id of the worker, e.g. "<hostname>-<pid>".
+            kinds (Optional[Iterable[str]], optional): Only claim tasks of these kinds.
+                Defaults to None, any kind.
+
+        Returns:
+            Optional[Task]: The claimed task, None if no task is queued.
+        """
+        now = time.time()
+        query = "SELECT id, kind, task_key, payload, attempts FROM tasks WHERE status = 'queued'"
+        params: list = []
+        if kinds:
+            kinds = list(kinds)
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += kinds
+        query += " ORDER BY id LIMIT 1"
+
+        with self._transaction() as connection:
+            self._requeue_expired(connection, now)
+            row = connection.execute(query, params).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row[0]),
+            )
+        return Task(id=row[0], kind=row[1], task_key=row[2], payload=json.loads(row[3]), attempts=row[4] + 1)
+
+    def heartbeat(self, task_id: int, worker: str) -> bool:
+        """Extends the lease of a task, returns False if the worker lost the lease."""
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, task_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Marks a leased task done, returns False if the worker lost the lease."""
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = 'done', result = ?, worker = NULL, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), now, task_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Marks a leased task failed, or queues it again if it has attempts left.
+
+        Returns:
+            bool: False if the worker lost the lease.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,"
+                " error = ?, worker = NULL, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (error, now, task_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """Queues the failed tasks again with a fresh number of attempts."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = 'queued', attempts = 0, updated = ? WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of tasks in every status."""
+        rows = self.connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows.fetchall()))
+        return counts
+
+    def is_finished(self) -> bool:
+        """Returns whether no task is queued or leased."""
+        counts = self.counts()
+        return counts["queued"] == 0 and counts["leased"] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or maintain a work queue.")
+    parser.add_argument( #--queue_path
+        "--queue_path",
+        type=str,
+        required=True,
+        help="Path of the SQLite queue file")
+    parser.add_argument( #command
+        "command",
+        choices=["status", "requeue", "failed", "retry_failed"],
+        help="status: task counts, requeue: re-queue expired leases, failed: list failed tasks,"
+             " retry_failed: queue the failed tasks again")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue_path)
+    if args.command == "status":
+        print(json.dumps(queue.counts(), indent=2))
+    elif args.command == "requeue":
+        print(f"Re-queued {queue.requeue_expired()} tasks with expired leases")
+    elif args.command == "retry_failed":
+        print(f"Queued {queue.retry_failed()} failed tasks again")
+    else:
+        rows = queue.connection.execute(
+            "SELECT task_key, attempts, error FROM tasks WHERE status = 'failed' ORDER BY id"
+        )
+        for task_key, attempts, error in rows:
+            print(f"{task_key}: {attempts} attempts, {error}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
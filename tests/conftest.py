@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the scripts are run as files, not installed, so their modules are imported from scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
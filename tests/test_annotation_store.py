@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from metadata_scripts.annotation_store import AnnotationStore, import_annotations, iter_annotations
+from ui_backend import BadRequest, NotFound, UIBackend
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "annotations.json")
+CHAIR = "8476c4170df24cf5bbe6967222d1a42d"
+OFFICE_CHAIR = "0a1c2b9fd8e34c4a9d3a1f5e7b2c6d80"
+ROBOT = "f3b9e1a27c5d4e6f8a0b1c2d3e4f5a6b"
+SCAN = "5d6e7f8091a2b3c4d5e6f708192a3b4c"
+
+
+@pytest.fixture
+def store(tmp_path):
+    manifest = import_annotations(iter_annotations(FIXTURE), str(tmp_path / "annotations"))
+    assert (manifest["objects"], manifest["tag_terms"], manifest["category_terms"]) == (4, 6, 3)
+    return AnnotationStore(str(tmp_path / "annotations"))
+
+
+def test_terms_select_their_postings(store):
+    assert isinstance(store.postings["tag"], np.memmap)
+    assert store.uid_list(store.select(["Chair"])) == [OFFICE_CHAIR, CHAIR]
+    assert store.uid_list(store.select(["lowpoly"], ["furniture-home"])) == [CHAIR]
+    assert store.uid_list(store.select(["chair", "robot"])) == []
+    assert store.uid_list(store.select(["unknown"])) == []
+    assert len(store.select()) == 4
+    assert store.term_counts("tag", limit=2) == [("chair", 2), ("lowpoly", 2)]
+    assert store.term_counts("category", prefix="sci") == [("science-technology", 1)]
+    with pytest.raises(KeyError):
+        store.term_counts("license")
+
+
+def test_counts_are_kept_per_object(store):
+    columns = store.columns(store.ordinals([ROBOT, SCAN]))
+    assert columns == {"uid": [ROBOT, SCAN], "face_count": [18000, -1], "vertex_count": [9400, 500000],
+                       "animation_count": [3, -1]}
+    assert store.ordinals(["missing"]).tolist() == [-1]
+
+
+def test_directories_of_shards_are_imported_once_per_object(tmp_path):
+    with open(FIXTURE) as f:
+        annotations = json.load(f)
+    source = tmp_path / "metadata"
+    source.mkdir()
+    with gzip.open(source / "000-000.json.gz", "wt") as f:
+        json.dump(annotations, f)
+    shutil.copy(FIXTURE, source / "000-001.json")
+    manifest = import_annotations(iter_annotations(str(source)), str(tmp_path / "store"))
+    assert manifest["objects"] == 4
+    assert len(AnnotationStore(str(tmp_path / "store")).term_postings("tag", "chair")) == 2
+
+
+def test_ui_filters_objects_by_tag(tmp_path, store):
+    with open(tmp_path / "poly_count.txt", "w") as f:
+        f.writelines(f"{uid}: {count}\n" for uid, count in [(CHAIR, 2400), (OFFICE_CHAIR, 51200), (ROBOT, 18000)])
+    backend = UIBackend(str(tmp_path), annotations=store)
+    assert backend.objects({"tag": ["chair"], "filter": ["poly_count::10000"]})["objects"]["uid"] == [CHAIR]
+    assert backend.annotation_terms({"kind": ["category"], "prefix": ["char"]}) == {
+        "term": ["characters-creatures"], "count": [1]}
+    with pytest.raises(BadRequest):
+        backend.annotation_terms({"limit": ["-1"]})
+    with pytest.raises(NotFound):
+        UIBackend(str(tmp_path)).objects({"tag": ["chair"]})
@@ -0,0 +1,28 @@
+import pytest
+
+from render_scripts.aov_passes import PassStats, parse_passes, pass_path, supported_passes
+
+
+def test_parse_passes():
+    assert parse_passes("depth, index,depth") == ["depth", "index"]
+    assert parse_passes("") == []
+    with pytest.raises(ValueError):
+        parse_passes("depth,albedo")
+
+
+def test_engines_drop_unsupported_passes():
+    assert supported_passes(["depth", "index"], "CYCLES") == (["depth", "index"], [])
+    assert supported_passes(["depth", "index"], "BLENDER_EEVEE") == (["depth"], ["index"])
+    assert supported_passes(["normal"], "BLENDER_WORKBENCH") == ([], ["normal"])
+
+
+def test_pass_stats_records_the_files(tmp_path):
+    stats = PassStats(["depth", "index"], "png16")
+    path = pass_path(str(tmp_path), "multi_frame3", "depth", "png16")
+    assert path.endswith("multi_frame3_depth.png")
+    with open(path, "wb") as f:
+        f.write(b"x" * 100)
+    stats.add("depth", path)
+    summary = stats.summary()
+    assert summary["passes"] == {"depth": {"files": 1, "bytes": 100}, "index": {"files": 0, "bytes": 0}}
+    assert summary["encoding"]["index"]["scale"] == 1 / 65535
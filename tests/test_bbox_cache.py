@@ -0,0 +1,23 @@
+from render_scripts.bbox_cache import BBoxCache
+
+
+def test_boxes_are_computed_once_until_invalidated():
+    cache = BBoxCache()
+    calls = []
+
+    def compute(box):
+        def run():
+            calls.append(box)
+            return box
+        return run
+
+    assert cache.get((None, False, False), compute(((0, 0, 0), (1, 1, 1)))) == ((0, 0, 0), (1, 1, 1))
+    assert cache.get((None, False, False), compute(((5, 5, 5), (6, 6, 6)))) == ((0, 0, 0), (1, 1, 1))
+    # other queries of the same geometry are cached separately
+    assert cache.get((None, False, True), compute(((0, 0, 0), (2, 2, 2)))) == ((0, 0, 0), (2, 2, 2))
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # after a geometry change, e.g. decimation, the next call recomputes
+    cache.invalidate()
+    assert cache.get((None, False, False), compute(((0, 0, 0), (0.5, 0.5, 0.5)))) == ((0, 0, 0), (0.5, 0.5, 0.5))
+    assert len(calls) == 3
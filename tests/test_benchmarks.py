@@ -0,0 +1,42 @@
+from benchmarks.corpus import corpus_specs, expected_metadata, object_path
+from benchmarks.suite import bench_catalog, compare_results, metadata_mismatches
+from metadata_scripts.metadata_table import MetadataTable
+
+
+def test_corpus_is_deterministic_and_varied():
+    specs = corpus_specs(16, seed=3)
+    assert specs == corpus_specs(16, seed=3)
+    assert {spec.uid for spec in specs}.isdisjoint(spec.uid for spec in corpus_specs(16, seed=4))
+    assert len({(spec.subdivisions, spec.texture_size) for spec in specs}) == 16
+    assert {(spec.armature, spec.animation) for spec in specs} == {
+        (True, True), (True, False), (False, True), (False, False)}
+    assert all(len(spec.uid) == 32 for spec in specs)
+
+
+def test_catalog_finds_the_corpus(tmp_path):
+    specs = corpus_specs(3)
+    for spec in specs:
+        path = tmp_path / object_path("", spec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"glTF")
+    metrics = bench_catalog(str(tmp_path), [spec.uid for spec in specs], repeat=1)
+    assert set(metrics) == {"catalog.scan_seconds", "catalog.find_seconds"}
+
+
+def test_metadata_is_checked_against_the_specs(tmp_path):
+    specs = corpus_specs(2)
+    values = {spec.uid: expected_metadata(spec)["poly_count"] for spec in specs}
+    values[specs[1].uid] += 1
+    with open(tmp_path / "poly_count.txt", "w") as f:
+        f.writelines(f"{uid}: {value}\n" for uid, value in values.items())
+    mismatches = metadata_mismatches(MetadataTable.load(str(tmp_path)), specs)
+    assert [(m["uid"], m["column"]) for m in mismatches] == [(specs[1].uid, "poly_count")]
+
+
+def test_regressions_need_a_relative_and_absolute_slowdown():
+    baseline = {"render.render_seconds": 2.0, "catalog.find_seconds": 0.001, "metadata.seconds_per_object": 1.0}
+    metrics = {"render.render_seconds": 2.5, "catalog.find_seconds": 0.004, "metadata.seconds_per_object": 1.1,
+               "render.import_seconds": 9.0}
+    regressions = compare_results(baseline, metrics, threshold=0.15)
+    assert [r["metric"] for r in regressions] == ["render.render_seconds"]
+    assert regressions[0]["ratio"] == 1.25
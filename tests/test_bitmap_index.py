@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from metadata_scripts.bitmap_index import BitmapIndex, load_flags
+from metadata_scripts.metadata_query import query_mask
+from metadata_scripts.metadata_table import MetadataTable
+
+
+def make_table(uids, version="1"):
+    uids = np.array(uids)
+    return MetadataTable(uids, {
+        "armature_count": np.arange(len(uids)) % 2,
+        "vertex_num": np.where(np.arange(len(uids)) == 0, -1, 10),
+    }, version)
+
+
+def test_flags_combine_on_packed_bits():
+    index = BitmapIndex(np.array(list("abcdefghij")))
+    index.set_rows("x", [0, 3, 9])
+    index.set_rows("y", [3, 4, 9])
+    index.set_rows("y", [9], value=False)
+    assert index.mask(index.combine(["x", "y"])).nonzero()[0].tolist() == [3]
+    assert index.mask(index.combine(any_of=["x", "y"], exclude=["y"])).nonzero()[0].tolist() == [0, 9]
+    # the padding bits of the last byte stay clear, counts only see the 10 rows
+    inverted = index.invert(index.bitmap("x"))
+    assert int(np.unpackbits(inverted).sum()) == 7
+    assert index.count("y") == 2
+    with pytest.raises(KeyError):
+        index.combine(["z"])
+
+
+def test_flags_are_reindexed_for_new_objects(tmp_path):
+    paths = {"a": "objs/a.glb", "c": "objs/c.usdz"}
+    index = load_flags(str(tmp_path), make_table(["a", "c"]), paths=paths, groups={"chairs": [0, ["c"]]})
+    assert index.counts() == {"group:chairs": 1, "has_armature": 1, "has_vertex": 1, "is_glb": 1, "is_usdz": 1}
+
+    # b is new, only its file is looked up, a and c keep their extension flags
+    table = make_table(["a", "b", "c"], version="2")
+    index = load_flags(str(tmp_path), table, paths={"b": "objs/b.usdz"}, groups={})
+    assert table.uids[index.mask(index.bitmap("is_usdz"))].tolist() == ["b", "c"]
+    assert table.uids[index.mask(index.bitmap("is_glb"))].tolist() == ["a"]
+    assert table.uids[index.mask(index.bitmap("has_armature"))].tolist() == ["b"]
+    assert "group:chairs" not in index.bitmaps
+    assert BitmapIndex.load(str(tmp_path / "bitmap_index.npz")).counts() == index.counts()
+
+
+def test_queries_mix_flags_and_comparisons(tmp_path):
+    table = make_table(["a", "b", "c", "d"])
+    index = load_flags(str(tmp_path), table, uid_lists={"quarantine": ["d", "unknown"]})
+    assert table.uids[query_mask(table, "has_vertex and not quarantine", index)].tolist() == ["b", "c"]
+    assert table.uids[query_mask(table, "quarantine or armature_count==0 and vertex_num>5", index)].tolist() == [
+        "c", "d"]
+    with pytest.raises(KeyError):
+        query_mask(table, "has_vertex")
+
+
+def test_extension_flags_are_built_for_an_index_saved_without_paths(tmp_path):
+    table = make_table(["a", "b"])
+    assert "is_usdz" not in load_flags(str(tmp_path), table).bitmaps
+    index = load_flags(str(tmp_path), table, paths={"a": "objs/a.usdz", "b": "objs/b.glb"})
+    assert table.uids[index.mask(index.bitmap("is_usdz"))].tolist() == ["a"]
+    assert BitmapIndex.load(str(tmp_path / "bitmap_index.npz")).has_extensions
@@ -0,0 +1,24 @@
+import numpy as np
+
+from render_scripts.dedup_map import apply_dedup_map
+from render_scripts.geometry_fingerprint import dedup_map, duplicate_clusters, minhash_signature
+
+
+def test_rescaled_reuploads_are_clustered():
+    rng = np.random.default_rng(0)
+    meshes = [rng.random((2000, 3)) for _ in range(50)]
+    uids = [f"uid{i:02d}" for i in range(50)] + ["copy_a", "copy_b"]
+    # a moved and scaled copy of mesh 3, and mesh 7 with split (repeated) vertices
+    copies = [meshes[3] * 2.5 + [1, -4, 0], np.concatenate([meshes[7], meshes[7][:500]])]
+    signatures = np.array([minhash_signature(vertices) for vertices in meshes + copies])
+
+    clusters = duplicate_clusters(uids, signatures)
+    assert clusters == [["copy_a", "uid03"], ["copy_b", "uid07"]]
+    assert dedup_map(clusters) == {"uid03": "copy_a", "uid07": "copy_b"}
+
+
+def test_apply_dedup_map():
+    duplicates = {"b": "a", "c": "a"}
+    assert apply_dedup_map(["a", "b", "c", "d"], duplicates, separate=True) == (["a", "d"], 2)
+    # a group scene keeps its objects, the repeated uid shares the imported mesh
+    assert apply_dedup_map(["b", "d"], duplicates, separate=False) == (["a", "d"], 1)
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from group_store import GroupStore
+
+
+def test_export_writes_only_the_changes_since_the_previous_export(tmp_path):
+    store = GroupStore(str(tmp_path / "groups.sqlite"))
+    store.create_group("chairs", separate=True)
+    store.create_group("kitchen")
+    store.add("chairs", ["c1", "c2"])
+    store.add("kitchen", ["k1", "k2"])
+    id_file = str(tmp_path / "ids.json")
+    summary = store.export(id_file)
+    assert json.load(open(id_file)) == {"chairs": [1, ["c1", "c2"]], "kitchen": [0, ["k1", "k2"]]}
+    assert summary["changed_groups"] == 2
+
+    store.add("chairs", ["c3", "c4"])
+    store.remove("chairs", ["c4", "c1"])
+    store.remove("kitchen", ["k1"])
+    assert store.membership("k2") == ["kitchen"]
+    summary = store.export(id_file)
+    # separate groups only render the new objects, group scenes render again
+    assert json.load(open(tmp_path / "ids_changes.json")) == {"chairs": [1, ["c3"]], "kitchen": [0, ["k2"]]}
+    assert summary["removed"] == {"chairs": ["c1"], "kitchen": ["k1"]}
+
+    store.export(id_file)
+    assert json.load(open(tmp_path / "ids_changes.json")) == {}
+    with pytest.raises(KeyError):
+        store.add("tables", ["t1"])
+
+
+def test_failed_export_keeps_the_changes(tmp_path):
+    store = GroupStore(str(tmp_path / "groups.sqlite"))
+    store.create_group("chairs", separate=True)
+    store.add("chairs", ["c1"])
+    (tmp_path / "blocker").write_text("")
+    with pytest.raises(OSError):
+        store.export(str(tmp_path / "ids.json"), str(tmp_path / "blocker" / "changes.json"))
+    assert store.export(str(tmp_path / "ids.json"))["added"] == {"chairs": ["c1"]}
@@ -0,0 +1,28 @@
+import struct
+import zlib
+
+from render_scripts.image_header import image_header_size, read_image_header_size
+
+
+def png_bytes(width, height, bit_depth=8):
+    ihdr = struct.pack(">IIBBBBB", width, height, bit_depth, 6, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + chunk
+
+
+def jpeg_bytes(width, height, exif_bytes=0):
+    app1 = b"\xff\xe1" + struct.pack(">H", exif_bytes + 2) + b"\0" * exif_bytes
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app1 + sof + b"\xff\xd9"
+
+
+def test_png_and_jpeg_sizes():
+    assert image_header_size(png_bytes(4096, 2048, 16)) == (4096, 2048, 16)
+    assert image_header_size(jpeg_bytes(640, 480)) == (640, 480, 8)
+    assert image_header_size(b"GIF89a") is None
+
+
+def test_jpeg_header_after_large_exif(tmp_path):
+    path = tmp_path / "texture.jpg"
+    path.write_bytes(jpeg_bytes(8192, 8192, exif_bytes=65000))
+    assert read_image_header_size(str(path)) == (8192, 8192, 8)
@@ -0,0 +1,26 @@
+import os
+
+from render_scripts.import_cache import ImportCache
+
+
+def test_conversions_are_keyed_by_content_version_and_options(tmp_path):
+    source = tmp_path / "a.glb"
+    source.write_bytes(b"glb data")
+    copy = tmp_path / "b.glb"
+    copy.write_bytes(b"glb data")
+    cache = ImportCache(str(tmp_path / "cache"), "3.2.2")
+    assert cache.get(str(source)) is None
+
+    tmp_blend = cache.temporary_path()
+    with open(tmp_blend, "wb") as f:
+        f.write(b"blend")
+    path = cache.put(str(source), tmp_blend, "merged")
+    assert not os.path.exists(tmp_blend)
+    assert "blender-3.2.2" in path and path.endswith("_merged.blend")
+    # identical files share the conversion, other options and versions do not
+    assert cache.get(str(copy), "merged") == path
+    assert cache.get(str(source)) is None
+    assert ImportCache(str(tmp_path / "cache"), "4.1.0").get(str(source), "merged") is None
+
+    source.write_bytes(b"changed glb data")
+    assert cache.get(str(source), "merged") is None
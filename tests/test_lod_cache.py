@@ -0,0 +1,33 @@
+from render_scripts.lod_cache import LodCache
+
+
+def test_previews_are_keyed_by_source_hash_and_budget(tmp_path):
+    objects = tmp_path / "objects"
+    objects.mkdir()
+    (objects / "a.glb").write_bytes(b"same object")
+    (objects / "b.glb").write_bytes(b"same object")
+    cache = LodCache(str(tmp_path / "lods"))
+    assert cache.missing([str(objects / "a.glb")]) == [str(objects / "a.glb")]
+
+    preview = tmp_path / "lods" / "a_preview.glb"
+    preview.write_bytes(b"preview")
+    cache.put(str(objects / "a.glb"), str(preview))
+    digest, path = cache.get(str(objects / "b.glb"))
+    assert digest == cache.source_hash(str(objects / "a.glb"))
+    assert open(path, "rb").read() == b"preview"
+
+    # a changed object or budget has no preview
+    (objects / "b.glb").write_bytes(b"edited object")
+    assert cache.get(str(objects / "b.glb")) is None
+    assert LodCache(str(tmp_path / "lods"), max_triangles=1000).get(str(objects / "a.glb")) is None
+
+
+def test_cached_hash_never_hashes(tmp_path):
+    source = tmp_path / "a.glb"
+    source.write_bytes(b"object")
+    cache = LodCache(str(tmp_path / "lods"))
+    assert cache.cached_hash(str(source)) is None
+    digest = cache.source_hash(str(source))
+    assert cache.cached_hash(str(source)) == digest
+    source.write_bytes(b"changed object")
+    assert cache.cached_hash(str(source)) is None
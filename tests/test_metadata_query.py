@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+import pytest
+
+from metadata_scripts.metadata_query import parse_query, query_columns, query_mask
+from metadata_scripts.metadata_table import MetadataTable
+from query_objects import id_file, make_groups
+
+
+def make_table():
+    uids = np.array(["a", "b", "c", "d", "e"])
+    return MetadataTable(uids, {
+        "poly_count": np.array([100, 60000, 2000, -1, 40000]),
+        "armature_count": np.array([1, 1, 0, 2, 0]),
+        "material_count": np.array([1, 3, 0, 1, 2]),
+    })
+
+
+def test_predicates_follow_precedence():
+    table = make_table()
+    mask = query_mask(table, "poly_count<50000 and armature_count>0 and material_count>=1")
+    assert table.uids[mask].tolist() == ["a"]
+    mask = query_mask(table, "armature_count==0 or poly_count>50000 and material_count!=3")
+    assert table.uids[mask].tolist() == ["c", "e"]
+    # missing values never match a comparison, so not matches them
+    assert table.uids[query_mask(table, "not (poly_count<=40000)")].tolist() == ["b", "d"]
+    assert query_mask(table, " ").all()
+    assert query_columns(parse_query("(poly_count>1 or mesh_count=2) and not armature_count<1")) == [
+        "poly_count", "mesh_count", "armature_count"]
+
+
+def test_invalid_queries():
+    table = make_table()
+    for query in ("poly_count <", "poly_count > 5 and", "(poly_count > 5", "poly_count ~ 3", "5 < poly_count"):
+        with pytest.raises(ValueError):
+            query_mask(table, query)
+    with pytest.raises(KeyError):
+        query_mask(table, "edge_count > 1")
+
+
+def test_groups_are_random_and_disjoint():
+    uids = np.array([f"u{i}" for i in range(20)])
+    groups = make_groups(uids, group_size=4, num_groups=3, seed=1)
+    assert [len(group) for group in groups] == [4, 4, 4]
+    assert len({uid for group in groups for uid in group}) == 12
+    assert groups == make_groups(uids, group_size=4, num_groups=3, seed=1)
+    assert len(make_groups(uids, group_size=6)) == 3
+    assert make_groups(uids) == [uids.tolist()]
+    with pytest.raises(ValueError):
+        make_groups(uids, group_size=7, num_groups=3)
+    with pytest.raises(ValueError):
+        make_groups(uids, num_groups=3)
+    assert id_file([["a"], ["b", "c"]], 1, "rigged") == {"rigged_1": [1, ["a"]], "rigged_2": [1, ["b", "c"]]}
+
+
+def test_query_over_800k_objects_is_fast():
+    rng = np.random.default_rng(0)
+    n = 800_000
+    table = MetadataTable(np.arange(n).astype(str), {
+        name: rng.integers(-1, 100_000, n) for name in ("poly_count", "armature_count", "material_count")
+    })
+    start = time.perf_counter()
+    query_mask(table, "poly_count<50000 and armature_count>0 and material_count>=1")
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,45 @@
+import numpy as np
+
+from metadata_scripts.metadata_table import MetadataTable
+
+POLY_COUNTS = {"a1": 500, "b2": 100, "c3": 100, "d4": 9000, "e5": 40}
+ARMATURES = {"a1": 1, "b2": 0, "c3": 2, "d4": 1}
+
+
+def write_metadata(directory):
+    for name, values in (("poly_count", POLY_COUNTS), ("armature_count", ARMATURES)):
+        with open(directory / f"{name}.txt", "w") as f:
+            f.writelines(f"{uid}: {value}\n" for uid, value in values.items())
+
+
+def test_load_builds_and_reuses_cache(tmp_path):
+    write_metadata(tmp_path)
+    table = MetadataTable.load(str(tmp_path))
+    assert table.uids.tolist() == ["a1", "b2", "c3", "d4", "e5"]
+    # e5 has no armature_count line
+    assert table.column("armature_count").tolist() == [1, 0, 2, 1, -1]
+    assert (tmp_path / "metadata_table.npz").exists()
+
+    cached = MetadataTable.load(str(tmp_path))
+    assert cached.version == table.version
+    assert np.array_equal(cached.column("poly_count"), table.column("poly_count"))
+    assert cached.ordinals(["c3", "zz"]).tolist() == [2, -1]
+
+
+def test_pages_follow_the_sort_order(tmp_path):
+    write_metadata(tmp_path)
+    table = MetadataTable.load(str(tmp_path))
+    mask = table.range_mask("poly_count", 50, None) & table.range_mask("armature_count", 0, None)
+
+    def all_pages(descending):
+        uids, after = [], None
+        while True:
+            ordinals, after = table.page(mask, "poly_count", descending, after, limit=1)
+            uids += table.uids[ordinals].tolist()
+            if after is None:
+                return uids
+
+    assert all_pages(False) == ["b2", "c3", "a1", "d4"]
+    assert all_pages(True) == ["d4", "a1", "c3", "b2"]
+    ordinals, after = table.page(mask, None, False, None, limit=10)
+    assert table.uids[ordinals].tolist() == ["a1", "b2", "c3", "d4"] and after is None
@@ -0,0 +1,48 @@
+import math
+import urllib.request
+
+from render_scripts.metrics import MetricsExporter, RunMetrics, format_labels
+
+
+def test_progress_and_eta():
+    metrics = RunMetrics("render", total=10)
+    metrics.start = 0.0
+    metrics.task_done(30.0, completed=3, device="gpu0")
+    metrics.task_done(20.0, completed=0, failed=1, device="gpu1")
+    snapshot = metrics.snapshot(now=40.0)
+    assert snapshot["queue_depth"] == 6
+    assert snapshot["throughput"] == 0.1
+    assert snapshot["eta"] == 60.0
+    assert snapshot["busy_fraction"] == {"gpu0": 0.75, "gpu1": 0.5}
+    assert math.isnan(RunMetrics("render", total=5).snapshot()["eta"])
+
+
+def test_text_format():
+    metrics = RunMetrics("metadata", total=4, buckets=(1, 10))
+    metrics.start = 0.0
+    metrics.task_done(2.0, completed=2)
+    for seconds in (0.5, 5.0, 50.0):
+        metrics.observe("object", seconds)
+    lines = metrics.render(now=4.0).splitlines()
+    assert 'piquick_objects_completed_total{stage="metadata"} 2' in lines
+    assert 'piquick_step_seconds_bucket{le="1",stage="metadata",step="object"} 1' in lines
+    assert 'piquick_step_seconds_bucket{le="10",stage="metadata",step="object"} 2' in lines
+    assert 'piquick_step_seconds_bucket{le="+Inf",stage="metadata",step="object"} 3' in lines
+    assert 'piquick_step_seconds_sum{stage="metadata",step="object"} 55.5' in lines
+    assert 'piquick_eta_seconds{stage="metadata"} 4' in lines
+    assert "# TYPE piquick_objects_failed_total counter" in lines
+    assert "# TYPE piquick_objects gauge" in lines
+    assert format_labels({"a": 'x"y'}) == '{a="x\\"y"}'
+
+
+def test_endpoint_and_textfile(tmp_path):
+    metrics = RunMetrics("download", total=2)
+    metrics.task_done(1.0)
+    textfile = tmp_path / "download.prom"
+    exporter = MetricsExporter(metrics, port=0, textfile=str(textfile), interval=60.0)
+    port = exporter.server.server_address[1]
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        body = response.read().decode()
+    exporter.close()
+    assert 'piquick_objects_completed_total{stage="download"} 1' in body
+    assert 'piquick_queue_depth{stage="download"} 1' in textfile.read_text()
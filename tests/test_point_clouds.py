@@ -0,0 +1,47 @@
+import numpy as np
+
+from render_scripts.point_clouds import PointCloudStore, index_shards, unpack_voxels, voxel_grid, write_shard
+from render_scripts.shape_descriptors import sample_surface
+
+CUBE_VERTICES = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32) - 0.5
+CUBE_TRIANGLES = np.array([
+    [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+    [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],
+])
+
+
+def test_samples_lie_on_the_surface_with_its_normals():
+    points, normals = sample_surface(CUBE_VERTICES, CUBE_TRIANGLES, 1000)
+    assert points.shape == normals.shape == (1000, 3)
+    assert np.allclose(np.abs(points).max(axis=1), 0.5, atol=1e-6)
+    # every normal is the axis of the face its point lies on
+    assert np.allclose(np.abs(normals).sum(axis=1), 1)
+    axes = np.abs(normals).argmax(axis=1)
+    assert np.allclose(np.abs(points[np.arange(1000), axes]), 0.5)
+    assert len(sample_surface(CUBE_VERTICES, CUBE_TRIANGLES[:0], 10)[0]) == 0
+
+
+def test_voxel_grid_marks_the_surface_cells():
+    points, _ = sample_surface(CUBE_VERTICES, CUBE_TRIANGLES, 20000)
+    occupied = unpack_voxels(voxel_grid(points, 8))
+    assert occupied.shape == (8, 8, 8)
+    assert occupied[0].all() and occupied[:, :, 7].all()
+    assert not occupied[1:7, 1:7, 1:7].any()
+
+
+def test_store_reads_the_newest_shards(tmp_path):
+    points = np.arange(2 * 4 * 3, dtype=np.float32).reshape(2, 4, 3)
+    voxels = np.zeros((2, 8, 8, 1), dtype=np.uint8)
+    voxels[1, 0, 0, 0] = 0x80
+    write_shard(str(tmp_path / "a"), ["x", "y"], points, -points, voxels)
+    write_shard(str(tmp_path / "b"), ["y"], points[:1] + 100, points[:1])
+    assert index_shards(str(tmp_path)) == {"x": ("a", 0), "y": ("b", 0)}
+
+    store = PointCloudStore(str(tmp_path))
+    assert len(store) == 2 and "x" in store
+    x_points, x_normals = store.get("x")
+    assert isinstance(x_points, np.memmap)
+    assert np.array_equal(x_points, points[0]) and np.array_equal(x_normals, -points[0])
+    assert np.array_equal(store.get("y")[0], points[0] + 100)
+    assert store.voxels("x").shape == (8, 8, 8) and not store.voxels("x").any()
+    assert store.voxels("y") is None
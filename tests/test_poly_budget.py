@@ -0,0 +1,22 @@
+from render_scripts.poly_budget import TRIANGLE_BYTES, decimation_ratios, triangle_budget
+
+
+def test_budget_takes_the_lower_ceiling():
+    assert triangle_budget() is None
+    assert triangle_budget(max_triangles=5000, max_memory_mb=100) == 5000
+    assert triangle_budget(max_memory_mb=1) == 2**20 // TRIANGLE_BYTES
+
+
+def test_large_meshes_are_reduced_by_the_same_ratio():
+    counts = {"screw": 500, "handle": 2000, "chair": 1_000_000, "statue": 5_000_000}
+    ratios = decimation_ratios(counts, 600_000)
+    assert ratios["screw"] == 1.0
+    # reduced to min_triangles only, the others make up for it
+    assert ratios["handle"] == 0.5
+    assert ratios["chair"] == ratios["statue"] < 0.1
+    assert round(sum(counts[name] * ratios[name] for name in counts)) == 600_000
+
+
+def test_scenes_under_budget_and_tiny_budgets():
+    assert decimation_ratios({"a": 10_000}, 20_000) == {"a": 1.0}
+    assert decimation_ratios({"a": 1_000_000}, 10, min_ratio=0.02) == {"a": 0.02}
@@ -0,0 +1,57 @@
+import json
+import os
+import tarfile
+
+import pytest
+
+from render_scripts.render_output import TarShardOutput, iter_index_members, read_member
+
+
+def test_index_offsets_point_to_member_data(tmp_path):
+    output = TarShardOutput(str(tmp_path), "uid", max_shard_bytes=4096)
+    files = {
+        "multi_frame0": {"png": os.urandom(1000), "json": b'{"a": 1}'},
+        "multi_frame1": {"png": os.urandom(3000), "json": b'{"a": 2}'},
+        "multi_frame2": {"png": b"", "json": b"x" * 512},
+    }
+    for key, sample in files.items():
+        output.add_sample(key, sample)
+    output.add_record("render_cost", "json", {"total_seconds": 1.5})
+    output.close()
+
+    members = list(iter_index_members(str(tmp_path / "uid.index.json")))
+    assert len(members) == 7
+    assert len({member["shard_path"] for member in members}) > 1
+    for member in members:
+        sample, ext = member["name"].rsplit(".", 1)
+        key = sample.split("__", 1)[1]
+        expected = json.dumps({"total_seconds": 1.5}).encode() if key == "render_cost" else files[key][ext]
+        assert read_member(member) == expected
+        # the offsets agree with the tar headers
+        with tarfile.open(member["shard_path"]) as tar:
+            assert tar.getmember(member["name"]).offset_data == member["offset"]
+
+
+def test_add_job_moves_members_into_run_shards(tmp_path):
+    job_dir = tmp_path / "three_groups" / "group1"
+    job = TarShardOutput(str(job_dir), "uid", max_shard_bytes=1 << 20)
+    job.add_sample("front_frame0", {"png": b"png data", "json": b"{}", "depth.exr": b"exr data"})
+    job.add_record("render_cost", "json", {"total_seconds": 2.0})
+    job.close()
+
+    run = TarShardOutput(str(tmp_path), "run", max_shard_bytes=1 << 20)
+    assert run.add_job(str(job_dir), "uid", "three_groups/group1") == 4
+    run.close()
+
+    assert os.listdir(job_dir) == []
+    members = {member["name"]: member for member in iter_index_members(str(tmp_path / "run.index.json"))}
+    assert read_member(members["three_groups/group1/uid__front_frame0.png"]) == b"png data"
+    assert read_member(members["three_groups/group1/uid__front_frame0.depth.exr"]) == b"exr data"
+    assert json.loads(read_member(members["three_groups/group1/uid__render_cost.json"])) == {"total_seconds": 2.0}
+
+
+def test_duplicate_sample_is_rejected(tmp_path):
+    output = TarShardOutput(str(tmp_path), "uid", max_shard_bytes=1 << 20)
+    output.add_sample("front_frame0", {"png": b"1"})
+    with pytest.raises(ValueError):
+        output.add_sample("front_frame0", {"png": b"2"})
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pytest
+
+from render_scripts.scene_layout import compute_layout
+
+
+def overlaps(positions, sizes):
+    """Returns the pairs of boxes whose XY footprints overlap."""
+    pairs = []
+    for i in range(len(sizes)):
+        for j in range(i + 1, len(sizes)):
+            low = np.maximum(positions[i, :2], positions[j, :2])
+            high = np.minimum(positions[i, :2] + sizes[i, :2], positions[j, :2] + sizes[j, :2])
+            if np.all(high - low > 1e-9):
+                pairs.append((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize("layout", ["shelf", "grid"])
+def test_layouts_do_not_overlap_and_stay_compact(layout):
+    rng = np.random.default_rng(0)
+    sizes = rng.uniform(0.1, 2.0, size=(17, 3))
+    sizes[3] = (5.0, 0.2, 1.0)
+    positions = compute_layout(sizes, layout)
+    assert positions.shape == (17, 3)
+    assert not overlaps(positions, sizes)
+    # the boxes stand on the ground and start at the origin
+    assert np.all(positions[:, 2] == 0)
+    assert np.all(positions[:, :2] >= 0)
+    extent = (positions[:, :2] + sizes[:, :2]).max(axis=0)
+    if layout == "shelf":
+        # the footprint is roughly square, not a line
+        assert extent.max() / extent.min() < 3
+    else:
+        # a square of cells as large as the largest box and its gap
+        columns = math.ceil(math.sqrt(len(sizes)))
+        cell = sizes[:, :2].max(axis=0) + 0.1 * np.median(sizes.max(axis=1))
+        assert np.all(extent <= cell * columns + 1e-9)
+
+
+def test_single_box_and_unknown_layout():
+    assert compute_layout(np.ones((1, 3))).tolist() == [[0.0, 0.0, 0.0]]
+    with pytest.raises(ValueError):
+        compute_layout(np.ones((2, 3)), "spiral")
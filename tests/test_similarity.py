@@ -0,0 +1,33 @@
+import numpy as np
+
+from metadata_scripts.similarity_index import SimilarityIndex
+from render_scripts.shape_descriptors import DESCRIPTOR_SIZE, shape_descriptor
+
+CUBE_VERTICES = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32)
+CUBE_TRIANGLES = np.array([
+    [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+    [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],
+])
+
+
+def test_descriptor_ignores_scale_and_rotation():
+    cube = shape_descriptor(CUBE_VERTICES, CUBE_TRIANGLES)
+    rotation = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]], dtype=np.float32)
+    moved = shape_descriptor(5 * CUBE_VERTICES @ rotation.T + 3, CUBE_TRIANGLES)
+    plank = shape_descriptor(CUBE_VERTICES * [8, 1, 0.1], CUBE_TRIANGLES)
+    assert cube.shape == (DESCRIPTOR_SIZE,)
+    assert cube @ moved > 0.99
+    assert cube @ plank < cube @ moved
+    assert shape_descriptor(CUBE_VERTICES, CUBE_TRIANGLES[:0]) is None
+
+
+def test_ivf_query_finds_the_exact_neighbours():
+    rng = np.random.default_rng(1)
+    centers = rng.random((50, 8), dtype=np.float32)
+    vectors = centers[rng.integers(0, 50, 5000)] + rng.normal(0, 0.01, (5000, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = SimilarityIndex(np.array([f"uid{i}" for i in range(5000)]), vectors)
+    exact = index.similar("uid7", 5, n_probe=None)
+    index.build_ivf(n_lists=20)
+    assert [uid for uid, _ in index.similar("uid7", 5, n_probe=4)] == [uid for uid, _ in exact]
+    assert "uid7" not in dict(exact)
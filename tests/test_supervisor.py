@@ -0,0 +1,50 @@
+import json
+import sys
+
+from render_scripts import supervisor
+from render_scripts.supervisor import run_task, summarize_tasks
+
+# fails until it ran --failures times, counting its runs in a file
+FLAKY = """
+import sys
+path, failures = sys.argv[1], int(sys.argv[2])
+with open(path, "a") as f:
+    f.write("x")
+runs = len(open(path).read())
+print(f"run {runs}")
+sys.exit(3 if runs <= failures else 0)
+"""
+
+
+def flaky_command(tmp_path, failures):
+    return [sys.executable, "-c", FLAKY, str(tmp_path / f"runs_{failures}"), str(failures)]
+
+
+def test_failed_runs_are_retried_with_backoff(tmp_path, monkeypatch):
+    delays = []
+    monkeypatch.setattr(supervisor.time, "sleep", delays.append)
+    result = run_task(flaky_command(tmp_path, 2), "flaky", retries=3, retry_backoff=5.0)
+    assert (result["returncode"], result["attempts"]) == (0, 3)
+    assert delays == [5.0, 10.0]
+    assert [run["returncode"] for run in result["attempt_runs"]] == [3, 3, 0]
+
+    delays.clear()
+    result = run_task(flaky_command(tmp_path, 5), "broken", retries=1, retry_backoff=1.0)
+    assert (result["returncode"], result["attempts"]) == (3, 2)
+    assert delays == [1.0]
+
+    result = run_task([str(tmp_path / "missing_binary")], "missing")
+    assert (result["returncode"], result["attempts"]) == (-1, 1)
+
+
+def test_summary_counts_failed_and_retried_tasks(tmp_path):
+    results = [
+        {"task": "a", "returncode": 0, "attempts": 1, "duration_s": 2.0},
+        {"task": "b", "returncode": 0, "attempts": 2, "duration_s": 6.0},
+        {"task": "c", "returncode": 1, "attempts": 3, "duration_s": 10.0},
+    ]
+    summary = summarize_tasks(results, str(tmp_path / "summary.json"))
+    assert (summary["succeeded"], summary["failed"], summary["retried"]) == (2, 1, 2)
+    assert (summary["mean_duration_s"], summary["max_duration_s"]) == (6.0, 10.0)
+    assert json.load(open(tmp_path / "summary.json"))["failed_tasks"][0]["task"] == "c"
+    assert summarize_tasks([])["mean_duration_s"] == 0.0
@@ -0,0 +1,36 @@
+import numpy as np
+
+from render_scripts.texture_cache import TextureCache, downscale_pixels, scaled_size, texture_size_for_resolution
+
+
+def test_texture_size_follows_the_resolution():
+    assert texture_size_for_resolution(256) == 512
+    assert texture_size_for_resolution(300) == 1024
+    assert scaled_size(4096, 2048, 512) == (512, 256)
+    assert scaled_size(512, 300, 512) is None
+
+
+def test_downscale_keeps_the_average_color():
+    pixels = np.random.default_rng(0).random((64, 48, 4), dtype=np.float32)
+    blocks = downscale_pixels(pixels, 12, 16)
+    assert blocks.shape == (16, 12, 4)
+    assert np.allclose(blocks[0, 0], pixels[:4, :4].mean(axis=(0, 1)))
+    uneven = downscale_pixels(pixels, 7, 10)
+    assert uneven.shape == (10, 7, 4)
+    assert np.allclose(uneven.mean(axis=(0, 1)), pixels.mean(axis=(0, 1)), atol=1e-5)
+
+
+def test_cache_records_kept_and_downscaled_textures(tmp_path):
+    cache = TextureCache(str(tmp_path), 512)
+    assert cache.get("a" * 64) is None
+    kept = cache.put("a" * 64, 256, 256, 1000)
+    assert kept.path is None and cache.get("a" * 64) == kept
+
+    scaled_file = cache.temporary_path(".png")
+    with open(scaled_file, "wb") as f:
+        f.write(b"x" * 300)
+    entry = cache.put("b" * 64, 4096, 4096, 50000, scaled_file, 512, 512)
+    assert entry.bytes == 300 and entry.path.endswith(".png")
+    assert TextureCache(str(tmp_path), 512).get("b" * 64) == entry
+    # other texture sizes have their own copies
+    assert TextureCache(str(tmp_path), 1024).get("b" * 64) is None
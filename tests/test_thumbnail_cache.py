@@ -0,0 +1,19 @@
+from render_scripts.thumbnail_cache import ThumbnailCache
+
+
+def test_identical_thumbnails_are_stored_once(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    first = cache.put("a", b"png-a")
+    assert cache.put("b", b"png-a") == first
+    cache.put("c", b"png-c")
+
+    assert cache.get("b") == (first, b"png-a")
+    assert cache.get("c")[1] == b"png-c"
+    assert cache.get("d") is None
+    assert cache.missing(["a", "d", "c"]) == ["d"]
+    assert cache.stats() == {"thumbnails": 3, "blobs": 2, "blob_bytes": 10, "pack_bytes": 10}
+    cache.close()
+
+    reopened = ThumbnailCache(str(tmp_path))
+    assert reopened.get("a") == (first, b"png-a")
+    reopened.close()
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from timings_report import load_records, percentile, slowest_tasks, stage_percentiles
+
+TIMINGS_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "timings")
+
+
+def test_stage_percentiles():
+    records = load_records(TIMINGS_DIR)
+    # the line of a killed task is skipped
+    assert len(records) == 11
+    stages = stage_percentiles(records)
+    assert list(stages) == ["download", "render", "blender_task", "import"]
+    assert stages["render"] == {"count": 3, "total_s": 60.0, "p50_s": 20.0, "p90_s": 28.0,
+                                "p99_s": pytest.approx(29.8), "max_s": 30.0}
+    assert percentile([1.0], 99) == 1.0
+
+
+def test_slowest_tasks_use_their_attempts():
+    slowest = slowest_tasks(load_records(TIMINGS_DIR), top=2)
+    # attempts of render.py count over the stage spans, render_py is not a task
+    assert [(task["task"], task["total_s"]) for task in slowest] == [("uid_c", 36.0), ("uid_b", 35.0)]
+    assert (slowest[1]["attempts"], slowest[1]["returncode"]) == (2, 0)
+    uid_a = slowest_tasks(load_records(TIMINGS_DIR), top=3)[2]
+    assert (uid_a["total_s"], uid_a["poly_count"], uid_a["peak_rss_mb"]) == (14.0, 120000, 1200.0)
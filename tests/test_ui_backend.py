@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from metadata_scripts.similarity_index import SimilarityIndex
+from ui_backend import BadRequest, RangeNotSatisfiable, UIBackend, parse_range
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=990-2000", 1000) == (990, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    # not a single byte range, the whole file is sent
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=a-b", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=5-2", 1000)
+
+
+def test_page_limits_are_positive(tmp_path):
+    (tmp_path / "poly_count.txt").write_text("a: 10\nb: 20\n")
+    backend = UIBackend(str(tmp_path))
+    assert backend.objects({"limit": ["1"]})["objects"]["uid"] == ["a"]
+    for limit in ("0", "-1"):
+        with pytest.raises(BadRequest):
+            backend.objects({"limit": [limit]})
+
+
+def test_similar_needs_a_positive_k(tmp_path):
+    (tmp_path / "poly_count.txt").write_text("a: 10\nb: 20\n")
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    backend = UIBackend(str(tmp_path), similarity=SimilarityIndex(np.array(["a", "b"]), vectors))
+    assert backend.similar("a", {"k": ["1"]})["uid"] == ["b"]
+    with pytest.raises(BadRequest):
+        backend.similar("a", {"k": ["0"]})
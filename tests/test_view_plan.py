@@ -0,0 +1,38 @@
+import os
+from argparse import Namespace
+
+from render_scripts.view_plan import RenderSavings, count_views, link_view_files, view_file_pairs
+
+
+def modes(multi=1, front=0, four_view=0, static=1):
+    return Namespace(mode_multi=multi, mode_front=front, mode_four_view=four_view, mode_static=static)
+
+
+def test_static_scenes_render_the_multi_views_once():
+    assert count_views(modes(), 12, animated=True) == 24
+    assert count_views(modes(), 12, animated=False) == 12
+    # without multi views the static views are rendered
+    assert count_views(modes(multi=0), 12, animated=False) == 12
+    assert count_views(modes(front=1, four_view=1), 2, animated=False) == 2 * (1 + 1 + 4)
+
+
+def test_linked_views_share_the_files_of_their_source(tmp_path):
+    for name in ("multi_frame0.png", "multi0.json", "multi_frame0_depth.exr"):
+        (tmp_path / name).write_bytes(name.encode())
+    (tmp_path / "static0.json").write_text("stale")
+    pairs = view_file_pairs("multi_static_frame0", "static0", "multi_frame0", "multi0", ["depth", "normal"], "exr")
+    assert pairs[:2] == [("multi_frame0.png", "multi_static_frame0.png"), ("multi0.json", "static0.json")]
+    # the normal pass was not written, it is skipped
+    assert link_view_files(str(tmp_path), pairs) == 3
+    assert (tmp_path / "static0.json").read_text() == "multi0.json"
+    assert os.path.samefile(tmp_path / "multi_frame0_depth.exr", tmp_path / "multi_static_frame0_depth.exr")
+
+
+def test_savings_summary():
+    savings = RenderSavings()
+    for frame in range(3):
+        savings.frame_skipped()
+        savings.view_linked(f"multi_static_frame{frame}", f"multi_frame{frame}")
+    summary = savings.summary()
+    assert (summary["renders_saved"], summary["frame_sets_skipped"]) == (3, 3)
+    assert summary["view_links"]["multi_static_frame2"] == "multi_frame2"
@@ -0,0 +1,105 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from work_queue import WorkQueue
+
+QUEUE_WORKER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "queue_worker.py")
+
+
+def task_command(done_dir, key, seconds=1.0, returncode=0):
+    """Command that works for a while, then appends a line to <done_dir>/<key>.done."""
+    code = (
+        f"import sys, time; time.sleep({seconds}); "
+        f"open({os.path.join(done_dir, key + '.done')!r}, 'a').write('done\\n'); "
+        f"sys.exit({returncode})"
+    )
+    return [sys.executable, "-c", code]
+
+
+def start_worker(queue_path, worker_id, log_dir):
+    # own session, so the simulated crash can kill the worker with its task like a lost node
+    return subprocess.Popen(
+        [sys.executable, QUEUE_WORKER,
+         "--queue_path", queue_path,
+         "--worker_id", worker_id,
+         "--lease_seconds", "2",
+         "--heartbeat_interval", "0.5",
+         "--poll_interval", "0.2",
+         "--log_dir", log_dir],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def test_enqueue_ignores_existing_key(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    assert queue.enqueue("render", "out/a/uid", {"command": ["true"]})
+    assert not queue.enqueue("render", "out/a/uid", {"command": ["true"]})
+    assert queue.enqueue("render", "out/b/uid", {"command": ["true"]})
+    assert queue.counts()["queued"] == 2
+
+
+def test_expired_lease_is_requeued_then_failed(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.1)
+    queue.enqueue("render", "uid", {"command": ["true"]}, max_attempts=2)
+    assert queue.claim("w0").attempts == 1
+    time.sleep(0.2)
+    # the lease of w0 expired, the task is claimed again and w0 cannot finish it
+    task = queue.claim("w1")
+    assert task.attempts == 2
+    assert not queue.complete(task.id, "w0")
+    time.sleep(0.2)
+    assert queue.requeue_expired() == 0
+    assert queue.counts()["failed"] == 1
+
+
+def test_workers_recover_from_crash(tmp_path):
+    queue_path = str(tmp_path / "queue.sqlite")
+    done_dir = str(tmp_path)
+    queue = WorkQueue(queue_path)
+    keys = [f"t{i}" for i in range(6)]
+    for key in keys:
+        queue.enqueue("render", key, {"command": task_command(done_dir, key)})
+    queue.enqueue("render", "flaky", {"command": task_command(done_dir, "flaky", 0.1, 1)}, max_attempts=2)
+
+    workers = {f"w{i}": start_worker(queue_path, f"w{i}", str(tmp_path / "logs")) for i in range(3)}
+    try:
+        # crash w0 while it holds a lease
+        deadline = time.time() + 30
+        crashed_task = None
+        while crashed_task is None and time.time() < deadline:
+            row = queue.connection.execute(
+                "SELECT task_key FROM tasks WHERE status = 'leased' AND worker = 'w0'"
+            ).fetchone()
+            if row:
+                crashed_task = row[0]
+            else:
+                time.sleep(0.05)
+        assert crashed_task is not None
+        os.killpg(workers["w0"].pid, signal.SIGKILL)
+        workers["w0"].wait()
+
+        for worker_id in ("w1", "w2"):
+            assert workers[worker_id].wait(timeout=60) == 0
+    finally:
+        for worker in workers.values():
+            if worker.poll() is None:
+                os.killpg(worker.pid, signal.SIGKILL)
+
+    assert queue.counts() == {"queued": 0, "leased": 0, "done": len(keys), "failed": 1}
+    rows = dict(queue.connection.execute("SELECT task_key, attempts FROM tasks WHERE status = 'done'").fetchall())
+    if crashed_task in rows:
+        assert rows[crashed_task] == 2
+    # every task finished exactly once, the crashed attempt was killed before it finished
+    for key in keys:
+        with open(os.path.join(done_dir, key + ".done")) as f:
+            assert f.read() == "done\n"
+
+    status, attempts, max_attempts = queue.connection.execute(
+        "SELECT status, attempts, max_attempts FROM tasks WHERE task_key = 'flaky'"
+    ).fetchone()
+    assert (status, attempts, max_attempts) == ("failed", 2, 2)